@@ -1,9 +1,14 @@
 """Analyze user drop-off within first 30 days of enrollment."""
 
 import pandas as pd
-import matplotlib.pyplot as plt
 import os
 from config import DATA_DIR, OUTPUT_DIR, load_tables
+from metrics.billing_curves import count_reaching_thresholds
+from visualizations.chart_cache import (
+    chart_digest,
+    is_chart_current,
+    record_chart_digest,
+)
 
 
 def get_active_days_in_first_30(patients: pd.DataFrame, fact_patient_day: pd.DataFrame) -> pd.DataFrame:
@@ -61,17 +66,15 @@ def get_retention_by_active_days(patient_active_days: pd.DataFrame) -> pd.DataFr
     """
     total_users = len(patient_active_days)
 
-    results = []
-    for threshold in range(0, 31):
-        users_reached = (patient_active_days["active_days_in_first_30"] >= threshold).sum()
-        pct_reached = users_reached / total_users * 100
-        results.append({
-            "active_days_threshold": threshold,
-            "users_reached": users_reached,
-            "pct_reached": pct_reached,
-        })
-
-    df = pd.DataFrame(results)
+    # Users reaching each threshold 0..30 in one histogram pass
+    users_reached = count_reaching_thresholds(
+        patient_active_days["active_days_in_first_30"].to_numpy(), 30
+    )
+    df = pd.DataFrame({
+        "active_days_threshold": range(0, 31),
+        "users_reached": users_reached,
+        "pct_reached": users_reached / total_users * 100,
+    })
 
     # Calculate drop from previous threshold
     df["drop_from_previous"] = df["users_reached"].shift(1) - df["users_reached"]
@@ -81,14 +84,26 @@ def get_retention_by_active_days(patient_active_days: pd.DataFrame) -> pd.DataFr
     return df
 
 
-def plot_30day_retention(retention_df: pd.DataFrame, show_plot: bool = True) -> str:
+def plot_30day_retention(
+    retention_df: pd.DataFrame, show_plot: bool = True, force: bool = False
+) -> str:
     """
     Create bar plot showing user retention by active days threshold.
     Shows where the biggest drop-off occurs.
+
+    Rendering is skipped when the saved chart was made from the same data,
+    unless show_plot or force is set.
     """
     os.makedirs(OUTPUT_DIR, exist_ok=True)
     output_path = os.path.join(OUTPUT_DIR, "30day_retention_dropoff.png")
 
+    digest = chart_digest(retention_df, chart="30day_retention")
+    if not force and not show_plot and is_chart_current(output_path, digest):
+        return output_path
+
+    # Imported here so numeric-only runs never load matplotlib
+    import matplotlib.pyplot as plt
+
     fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(14, 10))
 
     # Top plot: Cumulative users who reached each threshold
@@ -157,6 +172,7 @@ def plot_30day_retention(retention_df: pd.DataFrame, show_plot: bool = True) ->
 
     plt.tight_layout()
     plt.savefig(output_path, dpi=150, bbox_inches="tight")
+    record_chart_digest(output_path, digest)
 
     if show_plot:
         plt.show()
@@ -18,6 +18,9 @@ ANALYSIS_DATE = pd.to_datetime("2026-01-08")
 # Data directories
 DATA_DIR = "data/cleaned data"
 OUTPUT_DIR = "output"
+COLUMN_STORE_DIR = "data/column_store"
+PARTITIONED_STORE_DIR = "data/partitioned/fact_patient_day"
+INGESTION_MANIFEST_PATH = "data/ingestion_manifest.json"
 
 # Billing and compliance thresholds
 BILLING_THRESHOLD = 16  # Days required for 16/30 compliance
@@ -28,6 +31,9 @@ ACTIVE_BIWEEK_THRESHOLD = 8  # Active days per bi-week
 FALL_RISK_THRESHOLD = 70
 FALL_RISK_LOOKBACK_DAYS = 7
 
+# Drop-off risk (KPI 4): consecutive inactive days
+DROPOFF_INACTIVE_DAYS = 3
+
 # Date ranges - default to last 30 days
 DATE_END = (pd.Timestamp.today() - pd.Timedelta(days=1)).strftime("%Y-%m-%d")  # Yesterday
 DATE_START = (pd.Timestamp.today() - pd.Timedelta(days=31)).strftime("%Y-%m-%d")  # 30 days before end
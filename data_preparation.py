@@ -4,13 +4,35 @@ from datetime import datetime, timedelta
 
 import pandas as pd
 
-from config import load_tables
+from config import COLUMN_STORE_DIR, PARTITIONED_STORE_DIR, load_tables
+from storage import (
+    apply_ingestion_delta,
+    build_patient_features,
+    load_patient_features,
+    save_patient_features,
+    write_column_store,
+    write_partitioned_dataset,
+)
+from storage.ingestion import (
+    MISSING_PARTITION,
+    detect_changes,
+    load_manifest,
+    print_changes,
+    save_manifest,
+)
+from storage.patient_features import PATIENT_FEATURES_DIR
 
 ##* loading all 7 tabels into a dictionary 'alerts', 'assessment_assignments',
 ##*'clinics', 'fact_patient_day', 'patients', 'providers', 'rtm_monthly'
 tables = load_tables("data/raw")
 tables.keys()  # view the loaded raw tabels
 
+## checking which partitions (days / clinics) changed since the last data drop
+previous_manifest = load_manifest()
+delta = detect_changes(tables, previous_manifest)
+print_changes(delta)
+day_changes = delta["tables"]["fact_patient_day"]
+
 for name, table in tables.items():
     print(f"{name},  {table.shape}")  # view the shape of each table
 
@@ -93,6 +115,38 @@ for name, table in tables.items():
         os.path.join(cleaned_data_dir, f"{name}.csv"), index=False
     )  # saving the scv files in the path
 
+## saving fact_patient_day as a memory-mapped column store (shared between processes)
+write_column_store(day, os.path.join(COLUMN_STORE_DIR, "fact_patient_day"))
+
+## archiving fact_patient_day by month and clinic (loaders read only matching partitions)
+## after the first drop only months with added or changed days are rewritten
+if not previous_manifest or day_changes["removed"] or not os.path.isdir(
+    PARTITIONED_STORE_DIR
+):
+    write_partitioned_dataset(day, replace=True)
+else:
+    changed_months = {
+        "missing" if label == MISSING_PARTITION else label[:7]
+        for label in day_changes["added"] + day_changes["changed"]
+    }
+    day_months = day["date"].dt.strftime("%Y-%m").fillna("missing")
+    if changed_months:
+        write_partitioned_dataset(day[day_months.isin(changed_months).to_numpy()])
+
+## keeping the per-patient feature table in step with the drop, as of its latest
+## day (new days are folded in, only patients in changed days are rebuilt)
+drop_as_of = day["date"].max()
+if previous_manifest and os.path.isdir(PATIENT_FEATURES_DIR):
+    features = apply_ingestion_delta(
+        load_patient_features(), delta, day, patients, drop_as_of
+    )
+else:
+    features = build_patient_features(patients, day, drop_as_of)
+save_patient_features(features)
+
+## recording partition hashes so the next drop only reports what changed
+save_manifest(delta["manifest"])
+
 ## checking quality of date columns
 print("\nParse quality:")
 
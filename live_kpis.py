@@ -0,0 +1,325 @@
+"""Live KPI consumer over a stream of patient-day events.
+
+Usage:
+    python live_kpis.py --file events.jsonl            # tail a JSONL file
+    python live_kpis.py --file events.jsonl --from-start
+    python live_kpis.py --port 8765                    # listen on a local socket
+
+Each event is one JSON object per line with the fact_patient_day columns
+(patient_id, clinic_id, date and is_active_day, or the raw minutes/steps it
+is derived from, plus fall_risk_score). Events for a patient-day that was
+already seen are treated as updates, so re-sent records are not counted
+twice.
+
+All counters are kept in plain dicts and updated in O(1) per event; only
+snapshot() walks the fall-risk table. Each event's date is validated once
+(date.fromisoformat) and then handled as an ISO string.
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+from collections import defaultdict
+
+from config import BILLING_THRESHOLD, FALL_RISK_LOOKBACK_DAYS, FALL_RISK_THRESHOLD
+
+# KPI 1: active day = background minutes >= 10 OR steps >= 300
+ACTIVE_MINUTES = 10
+ACTIVE_STEPS = 300
+
+# Days of per-day counters kept in memory
+RETAINED_DAYS = 31
+
+
+class LiveKPIState:
+    """In-memory KPI counters updated one patient-day event at a time."""
+
+    def __init__(
+        self,
+        billing_threshold: int = BILLING_THRESHOLD,
+        fall_risk_threshold: float = FALL_RISK_THRESHOLD,
+        fall_risk_lookback_days: int = FALL_RISK_LOOKBACK_DAYS,
+    ):
+        self.billing_threshold = billing_threshold
+        self.fall_risk_threshold = fall_risk_threshold
+        self.fall_risk_lookback_days = fall_risk_lookback_days
+
+        self.today = ""
+        self.events_processed = 0
+        self.bad_events = 0
+
+        self._status = {}  # (patient_id, date) -> is active
+        self._clinic = {}  # patient_id -> clinic_id
+        self._day_counts = defaultdict(dict)  # date -> clinic -> [reporting, active]
+        self._month_active = defaultdict(int)  # (patient_id, month) -> active days
+        self._billable = defaultdict(int)  # month -> patients at threshold
+        self._high_risk = {}  # patient_id -> last high fall-risk date
+
+    @staticmethod
+    def _is_active(event: dict) -> bool:
+        """Active flag from the event, or derived from minutes/steps (KPI 1)."""
+        flag = event.get("is_active_day")
+        if flag is not None:
+            return bool(flag)
+        return (event.get("background_data_minutes") or 0) >= ACTIVE_MINUTES or (
+            event.get("steps_count") or 0
+        ) >= ACTIVE_STEPS
+
+    def _add_active_day(self, patient_id: str, month: str, delta: int) -> None:
+        """Move a patient's monthly active-day count and the billable counter."""
+        key = (patient_id, month)
+        before = self._month_active[key]
+        after = before + delta
+        self._month_active[key] = after
+        if before < self.billing_threshold <= after:
+            self._billable[month] += 1
+        elif after < self.billing_threshold <= before:
+            self._billable[month] -= 1
+
+    def update(self, event: dict) -> None:
+        """
+        Apply one patient-day event.
+
+        The event is fully validated before any counter changes, so a
+        malformed event (ValueError, KeyError or TypeError) leaves the state
+        untouched.
+        """
+        patient_id = event["patient_id"]
+        date = datetime.date.fromisoformat(str(event["date"])[:10]).isoformat()
+        active = self._is_active(event)
+        score = event.get("fall_risk_score")
+        high_risk = score is not None and float(score) >= self.fall_risk_threshold
+
+        clinic_id = event.get("clinic_id")
+        if clinic_id is None:
+            clinic_id = self._clinic.get(patient_id)
+        else:
+            self._clinic[patient_id] = clinic_id
+
+        key = (patient_id, date)
+        previous = self._status.get(key)
+        if previous is None or previous != active:
+            counts = self._day_counts[date].get(clinic_id)
+            if counts is None:
+                counts = self._day_counts[date][clinic_id] = [0, 0]
+            if previous is None:
+                counts[0] += 1
+            delta = 1 if active else (-1 if previous else 0)
+            if delta:
+                counts[1] += delta
+                self._add_active_day(patient_id, date[:7], delta)
+            self._status[key] = active
+
+        if high_risk and date > self._high_risk.get(patient_id, ""):
+            self._high_risk[patient_id] = date
+
+        if date > self.today:
+            self._advance(date)
+        self.events_processed += 1
+
+    def update_line(self, line) -> None:
+        """Parse and apply one JSONL line (malformed lines are counted, not raised)."""
+        try:
+            self.update(json.loads(line))
+        except (ValueError, KeyError, TypeError):
+            self.bad_events += 1
+
+    def _advance(self, date: str) -> None:
+        """Move "today" forward and drop state that fell out of retention."""
+        new_month = date[:7] != self.today[:7]
+        self.today = date
+        cutoff = _shift(date, -(RETAINED_DAYS - 1))
+        for old in [day for day in self._day_counts if day < cutoff]:
+            del self._day_counts[old]
+
+        if new_month:
+            # Keep the current and previous month (late events still land)
+            keep_from = _shift(date[:7] + "-01", -1)[:7]
+            self._status = {k: v for k, v in self._status.items() if k[1] >= keep_from}
+            self._month_active = defaultdict(
+                int,
+                {k: v for k, v in self._month_active.items() if k[1] >= keep_from},
+            )
+            for month in [m for m in self._billable if m < keep_from]:
+                del self._billable[month]
+
+    def snapshot(self) -> dict:
+        """
+        Current KPI values.
+
+        Returns dict with:
+            - as_of: latest event date seen
+            - events_processed, bad_events
+            - reporting_patients, active_patients: patients with a record /
+              an active day today
+            - clinic_active_rates: {clinic_id: {"reporting", "active",
+              "active_rate"}} for today
+            - month: current month
+            - billable_patients: patients with >= billing_threshold active
+              days this month
+            - billing_progress: {active days: patients} this month
+            - high_fall_risk_patients: patients with a high fall-risk score in
+              the last fall_risk_lookback_days days
+        """
+        today_counts = self._day_counts.get(self.today, {})
+        clinic_rates = {
+            clinic: {
+                "reporting": reporting,
+                "active": active,
+                "active_rate": active / reporting * 100 if reporting else 0,
+            }
+            for clinic, (reporting, active) in sorted(
+                today_counts.items(), key=lambda item: str(item[0])
+            )
+        }
+
+        month = self.today[:7]
+        progress = defaultdict(int)
+        for (_, key_month), days in self._month_active.items():
+            if key_month == month and days > 0:
+                progress[days] += 1
+
+        cutoff = (
+            _shift(self.today, -(self.fall_risk_lookback_days - 1))
+            if self.today
+            else ""
+        )
+
+        return {
+            "as_of": self.today or None,
+            "events_processed": self.events_processed,
+            "bad_events": self.bad_events,
+            "reporting_patients": sum(c[0] for c in today_counts.values()),
+            "active_patients": sum(c[1] for c in today_counts.values()),
+            "clinic_active_rates": clinic_rates,
+            "month": month or None,
+            "billable_patients": self._billable.get(month, 0),
+            "billing_progress": dict(sorted(progress.items())),
+            "high_fall_risk_patients": sum(
+                1 for day in self._high_risk.values() if day >= cutoff
+            ),
+        }
+
+
+def _shift(date: str, days: int) -> str:
+    """ISO date string shifted by a number of days."""
+    return (
+        datetime.date.fromisoformat(date) + datetime.timedelta(days=days)
+    ).isoformat()
+
+
+async def tail_jsonl(
+    path: str,
+    state: LiveKPIState,
+    from_start: bool = False,
+    poll_interval: float = 0.2,
+    chunk_size: int = 1 << 20,
+) -> None:
+    """
+    Follow a JSONL file and feed every complete line to the state.
+
+    Reads in large chunks and yields to the event loop between chunks, so a
+    concurrent snapshot task stays responsive during a backlog catch-up.
+    """
+    with open(path, "rb") as f:
+        if not from_start:
+            f.seek(0, 2)
+        pending = b""
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                await asyncio.sleep(poll_interval)
+                continue
+            lines = (pending + chunk).split(b"\n")
+            pending = lines.pop()
+            update_line = state.update_line
+            for line in lines:
+                if line:
+                    update_line(line)
+            await asyncio.sleep(0)
+
+
+async def serve_socket(
+    state: LiveKPIState, host: str = "127.0.0.1", port: int = 8765
+) -> None:
+    """Accept JSONL event streams on a local TCP socket."""
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        processed = 0
+        async for line in reader:
+            state.update_line(line)
+            processed += 1
+            if processed % 10000 == 0:
+                await asyncio.sleep(0)
+        writer.close()
+
+    server = await asyncio.start_server(handle, host, port, limit=1 << 20)
+    async with server:
+        await server.serve_forever()
+
+
+def print_snapshot(snapshot: dict) -> None:
+    """Print a compact one-screen snapshot."""
+    print("\n" + "=" * 60)
+    print(
+        f"LIVE KPIs as of {snapshot['as_of']} "
+        f"({snapshot['events_processed']:,} events, {snapshot['bad_events']} bad)"
+    )
+    print("=" * 60)
+    reporting = snapshot["reporting_patients"]
+    active = snapshot["active_patients"]
+    rate = active / reporting * 100 if reporting else 0
+    print(f"Active today: {active:,} / {reporting:,} reporting ({rate:.1f}%)")
+    print(
+        f"Billable in {snapshot['month']}: {snapshot['billable_patients']:,} patients"
+    )
+    print(f"High fall risk (lookback): {snapshot['high_fall_risk_patients']:,}")
+    for clinic, row in snapshot["clinic_active_rates"].items():
+        print(
+            f"   {clinic}: {row['active']:,}/{row['reporting']:,} "
+            f"({row['active_rate']:.1f}%)"
+        )
+
+
+async def report_periodically(state: LiveKPIState, interval: float) -> None:
+    """Print a snapshot every interval seconds."""
+    while True:
+        await asyncio.sleep(interval)
+        print_snapshot(state.snapshot())
+
+
+async def run(args: argparse.Namespace) -> None:
+    """Run the consumer and the reporter until interrupted."""
+    state = LiveKPIState()
+    if args.file:
+        source = tail_jsonl(args.file, state, from_start=args.from_start)
+    else:
+        source = serve_socket(state, args.host, args.port)
+    await asyncio.gather(source, report_periodically(state, args.interval))
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--file", help="JSONL file to tail")
+    source.add_argument("--port", type=int, help="local TCP port to listen on")
+    parser.add_argument("--host", default="127.0.0.1", help="socket host")
+    parser.add_argument(
+        "--from-start",
+        action="store_true",
+        help="read the file from the beginning instead of only new lines",
+    )
+    parser.add_argument(
+        "--interval", type=float, default=5.0, help="seconds between snapshots"
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        asyncio.run(run(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
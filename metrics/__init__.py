@@ -1,23 +1,98 @@
-"""Metrics module for RTM analysis."""
+"""Metrics module for RTM analysis.
 
-from .overall import (
-    get_patient_count,
-    get_billable_patients,
-    get_active_patients,
-    get_high_fall_risk_patients,
-)
-from .kpis import (
-    get_active_users_biweekly,
-    get_enrollments_biweekly,
-    calculate_period_changes,
-)
-from .active_days import (
-    get_total_active_rate,
-    get_active_rate_by_clinic,
-    get_patient_active_distribution,
-    get_active_rate_by_day_since_enrollment,
-)
-from .onboarding_funnel import (
-    get_patient_funnel,
-    print_funnel,
-)
+Metric functions are imported lazily from their submodules on first access,
+so scripts only pay for the modules they actually use.
+"""
+
+import importlib
+
+_LAZY_IMPORTS = {
+    # overall
+    "get_patient_count": ".overall",
+    "get_billable_patients": ".overall",
+    "get_active_patients": ".overall",
+    "get_high_fall_risk_patients": ".overall",
+    # kpis
+    "get_active_users_biweekly": ".kpis",
+    "get_enrollments_biweekly": ".kpis",
+    "calculate_period_changes": ".kpis",
+    # active_days
+    "get_total_active_rate": ".active_days",
+    "get_active_rate_by_clinic": ".active_days",
+    "get_patient_active_distribution": ".active_days",
+    "get_active_rate_by_day_since_enrollment": ".active_days",
+    # onboarding_funnel
+    "get_patient_funnel": ".onboarding_funnel",
+    "print_funnel": ".onboarding_funnel",
+    # providers
+    "get_active_rate_by_provider": ".providers",
+    "get_billable_patients_by_provider": ".providers",
+    "get_patient_funnel_by_provider": ".providers",
+    "get_alert_load_by_provider": ".providers",
+    "get_provider_caseload": ".providers",
+    # hyperloglog
+    "approx_nunique": ".hyperloglog",
+    "build_patient_sketches": ".hyperloglog",
+    "count_distinct_patients": ".hyperloglog",
+    "build_activity_sketches": ".hyperloglog",
+    # quantile_sketch
+    "KLLSketch": ".quantile_sketch",
+    "build_quantile_sketches": ".quantile_sketch",
+    "merge_sketches": ".quantile_sketch",
+    # alerts
+    "get_time_to_ack_quantiles": ".alerts",
+    # billing_curves
+    "count_reaching_thresholds": ".billing_curves",
+    "get_billable_counts_by_threshold": ".billing_curves",
+    # billing_periods
+    "get_billing_periods": ".billing_periods",
+    # survival
+    "get_time_to_dropout": ".survival",
+    "kaplan_meier": ".survival",
+    "get_engagement_survival": ".survival",
+    # streaks
+    "get_activity_streaks": ".streaks",
+    # anomalies
+    "detect_anomalies": ".anomalies",
+    "anomalies_to_alerts": ".anomalies",
+    "compare_with_alerts": ".anomalies",
+    # sampling
+    "stratified_patient_sample": ".sampling",
+    "sample_tables": ".sampling",
+    "estimate_total": ".sampling",
+    "estimate_ratio": ".sampling",
+    # bootstrap
+    "get_patient_day_counts": ".bootstrap",
+    "get_clinic_bootstrap_cis": ".bootstrap",
+    # risk_ranking
+    "compute_risk_scores": ".risk_ranking",
+    "rank_patients": ".risk_ranking",
+    "get_risk_ranking": ".risk_ranking",
+    # alert_response
+    "get_alert_response": ".alert_response",
+    "summarize_alert_response": ".alert_response",
+    # monthly
+    "split_period": ".monthly",
+    "get_period_active_days": ".monthly",
+    "get_billable_patients_routed": ".monthly",
+    # reconciliation
+    "compute_monthly_active_days": ".reconciliation",
+    "reconcile_rtm_monthly": ".reconciliation",
+    "print_reconciliation": ".reconciliation",
+    # threshold_sweep
+    "sweep_active_day_thresholds": ".threshold_sweep",
+    # context
+    "RunContext": ".context",
+    "run_context": ".context",
+}
+
+__all__ = list(_LAZY_IMPORTS)
+
+
+def __getattr__(name):
+    if name not in _LAZY_IMPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module = importlib.import_module(_LAZY_IMPORTS[name], __name__)
+    value = getattr(module, name)
+    globals()[name] = value
+    return value
@@ -2,6 +2,7 @@
 
 import pandas as pd
 from config import DATE_START, DATE_END
+from .context import period_activity, active_days_per_patient
 
 
 def get_total_active_rate(
@@ -18,13 +19,10 @@ def get_total_active_rate(
         - active_days_rate: percentage of days that are active
     """
     # Filter to date range
-    period_activity = fact_patient_day[
-        (fact_patient_day["date"] >= start_date)
-        & (fact_patient_day["date"] < end_date)
-    ]
+    period = period_activity(fact_patient_day, start_date, end_date)
 
-    total_patient_days = len(period_activity)
-    total_active_days = int(period_activity["is_active_day"].sum())
+    total_patient_days = len(period)
+    total_active_days = int(period["is_active_day"].sum())
     active_days_rate = (
         (total_active_days / total_patient_days * 100) if total_patient_days > 0 else 0
     )
@@ -52,13 +50,10 @@ def get_active_rate_by_clinic(
         - active_rate: percentage active
     """
     # Filter to date range
-    period_activity = fact_patient_day[
-        (fact_patient_day["date"] >= start_date)
-        & (fact_patient_day["date"] < end_date)
-    ]
+    period = period_activity(fact_patient_day, start_date, end_date)
 
     # Merge clinic info
-    period_with_clinic = period_activity.merge(
+    period_with_clinic = period.merge(
         clinics[["clinic_id", "clinic_name"]], on="clinic_id", how="left"
     )
 
@@ -98,21 +93,15 @@ def get_patient_active_distribution(
         - max: maximum active days
     """
     # Filter to date range
-    period_activity = fact_patient_day[
-        (fact_patient_day["date"] >= start_date)
-        & (fact_patient_day["date"] < end_date)
-    ]
+    period = period_activity(fact_patient_day, start_date, end_date)
 
     # Count active days per patient
-    patient_active_days = (
-        period_activity[period_activity["is_active_day"] == 1]
-        .groupby("patient_id")
-        .size()
-        .reset_index(name="active_days")
+    patient_active_days = active_days_per_patient(period).reset_index(
+        name="active_days"
     )
 
     # Include patients with 0 active days
-    all_patients = period_activity[["patient_id"]].drop_duplicates()
+    all_patients = period[["patient_id"]].drop_duplicates()
     patient_active_days = all_patients.merge(
         patient_active_days, on="patient_id", how="left"
     ).fillna(0)
@@ -181,9 +170,7 @@ def get_active_rate_by_day_since_enrollment(
     )
 
     # Ensure all days 0-30 are represented (fill missing with 0)
-    all_days = pd.DataFrame(
-        {"day_since_enrollment": range(days_after_enrollment + 1)}
-    )
+    all_days = pd.DataFrame({"day_since_enrollment": range(days_after_enrollment + 1)})
     distribution_df = all_days.merge(daily_stats, on="day_since_enrollment", how="left")
     distribution_df = distribution_df.fillna(0)
 
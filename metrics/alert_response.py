@@ -0,0 +1,163 @@
+"""Alert response analysis: patient activity before and after each alert.
+
+Every alert is joined to the patient-days in a window of N days before and
+N days after its creation day, without materializing the alert x day pairs:
+
+    1. patient-days are keyed as patient_code * span + day_offset (int64)
+       and sorted once; prefix sums are taken over the measures
+    2. each alert's window edges are turned into the same keys and located
+       with np.searchsorted
+    3. window aggregates are differences of prefix sums at those positions
+
+Memory is one int64 key and one prefix array per measure for the
+patient-days, plus a few arrays per alert, so it grows linearly with both
+tables. The as-of lookup (last active day before the alert) uses the same
+sorted keys.
+
+The alert's own day is in neither window: pre = [d - N, d - 1],
+post = [d + 1, d + N].
+"""
+
+import numpy as np
+import pandas as pd
+
+WINDOW_DAYS = 7
+
+MEASURES = ["is_active_day", "fall_risk_score", "walk_score"]
+
+
+def _prefix(values: np.ndarray) -> tuple:
+    """Prefix sums of non-missing values and of their counts."""
+    present = ~np.isnan(values)
+    zero = np.zeros(1)
+    return (
+        np.concatenate([zero, np.cumsum(np.where(present, values, 0.0))]),
+        np.concatenate([zero, np.cumsum(present)]),
+    )
+
+
+def get_alert_response(
+    alerts: pd.DataFrame,
+    fact_patient_day: pd.DataFrame,
+    window_days: int = WINDOW_DAYS,
+) -> pd.DataFrame:
+    """
+    Get activity and risk in the window before and after every alert.
+
+    Args:
+        alerts: DataFrame with alert_id, patient_id, created_ts (and alert_type)
+        fact_patient_day: DataFrame with patient_id, date, is_active_day,
+            fall_risk_score, walk_score
+        window_days: N, days on each side of the alert day
+
+    Returns DataFrame with one row per alert:
+        - alert_id, patient_id, alert_type (if present), alert_date
+        - pre_days, post_days: patient-days with data in each window
+        - pre_active_days, post_active_days
+        - pre_active_rate, post_active_rate: active days / window_days (%)
+        - pre_fall_risk, post_fall_risk: mean fall_risk_score
+        - pre_walk_score, post_walk_score: mean walk_score
+        - active_rate_change, fall_risk_change, walk_score_change: post - pre
+        - days_since_last_active: days from the last active day before the
+          alert day to the alert day (NaN if none)
+
+    Alerts with no created_ts or an unknown patient get 0 days and NaN
+    measures; patient-days with no date are ignored.
+    """
+    # Shared patient codes and day offsets for both tables
+    fact = fact_patient_day[fact_patient_day["date"].notna().to_numpy()]
+    patient_index = pd.Index(pd.unique(fact["patient_id"]))
+    fact_codes = patient_index.get_indexer(fact["patient_id"])
+    fact_days = fact["date"].to_numpy(dtype="datetime64[D]").astype(np.int64)
+    alert_dates = pd.to_datetime(alerts["created_ts"]).dt.normalize()
+    dated = alert_dates.notna().to_numpy()
+    alert_codes = np.where(dated, patient_index.get_indexer(alerts["patient_id"]), -1)
+    alert_days = np.where(
+        dated, alert_dates.to_numpy(dtype="datetime64[D]").astype(np.int64), 0
+    )
+
+    all_days = np.concatenate([fact_days, alert_days[dated]])
+    first_day, last_day = (all_days.min(), all_days.max()) if len(all_days) else (0, 0)
+    base = first_day - window_days - 1
+    span = last_day - base + window_days + 2
+
+    # Sorted patient-day keys and prefix sums of every measure
+    keys = fact_codes * span + (fact_days - base)
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+    prefixes = {
+        col: _prefix(fact[col].to_numpy(dtype=float)[order]) for col in MEASURES
+    }
+
+    # Window edges as positions in the sorted keys
+    alert_keys = alert_codes * span + (alert_days - base)
+    pre_lo = np.searchsorted(keys, alert_keys - window_days, "left")
+    day_lo = np.searchsorted(keys, alert_keys, "left")
+    day_hi = np.searchsorted(keys, alert_keys, "right")
+    post_hi = np.searchsorted(keys, alert_keys + window_days, "right")
+    known = alert_codes >= 0
+
+    def window(col: str, lo: np.ndarray, hi: np.ndarray) -> tuple:
+        sums, counts = prefixes[col]
+        window_sums = np.where(known, sums[hi] - sums[lo], 0)
+        window_counts = np.where(known, counts[hi] - counts[lo], 0)
+        return window_sums, window_counts
+
+    result = pd.DataFrame(
+        {
+            "alert_id": alerts["alert_id"].to_numpy(),
+            "patient_id": alerts["patient_id"].to_numpy(),
+        }
+    )
+    if "alert_type" in alerts.columns:
+        result["alert_type"] = alerts["alert_type"].to_numpy()
+    result["alert_date"] = alert_dates.to_numpy()
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for side, lo, hi in (("pre", pre_lo, day_lo), ("post", day_hi, post_hi)):
+            active, _ = window("is_active_day", lo, hi)
+            result[f"{side}_days"] = np.where(known, hi - lo, 0)
+            result[f"{side}_active_days"] = active.astype(int)
+            result[f"{side}_active_rate"] = active / window_days * 100
+            for col, name in (
+                ("fall_risk_score", "fall_risk"),
+                ("walk_score", "walk_score"),
+            ):
+                sums, counts = window(col, lo, hi)
+                result[f"{side}_{name}"] = np.where(counts > 0, sums / counts, np.nan)
+
+    for name in ("active_rate", "fall_risk", "walk_score"):
+        result[f"{name}_change"] = result[f"post_{name}"] - result[f"pre_{name}"]
+
+    # As-of lookup: last active day strictly before the alert day
+    active_keys = keys[fact["is_active_day"].to_numpy()[order] == 1]
+    position = np.searchsorted(active_keys, alert_keys, "left") - 1
+    previous = active_keys[np.maximum(position, 0)] if len(active_keys) else position
+    same_patient = known & (position >= 0) & (previous // span == alert_codes)
+    result["days_since_last_active"] = np.where(
+        same_patient, alert_keys - previous, np.nan
+    )
+
+    return result
+
+
+def summarize_alert_response(response: pd.DataFrame, by: str = None) -> pd.DataFrame:
+    """
+    Average pre/post window metrics over alerts, optionally per group.
+
+    Returns DataFrame with alerts and the mean of every pre_, post_ and
+    _change column (one row, or one per group).
+    """
+    columns = [
+        col
+        for col in response.columns
+        if col.startswith(("pre_", "post_")) or col.endswith("_change")
+    ]
+    if by:
+        grouped = response.groupby(by, observed=True)
+        summary = grouped[columns].mean()
+        summary.insert(0, "alerts", grouped.size())
+        return summary.reset_index()
+    summary = response[columns].mean().to_frame().T
+    summary.insert(0, "alerts", len(response))
+    return summary
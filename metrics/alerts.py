@@ -0,0 +1,60 @@
+"""Alert metrics for RTM analysis (KPI 6)."""
+
+import numpy as np
+import pandas as pd
+from .quantile_sketch import build_quantile_sketches, summarize_sketch
+
+
+def get_time_to_ack_quantiles(
+    alerts: pd.DataFrame,
+    by: str = None,
+    quantiles: tuple = (0.5, 0.9),
+    quantile_backend: str = "exact",
+) -> pd.DataFrame:
+    """
+    Get time-to-acknowledge quantiles in hours (KPI 6).
+
+    Alerts without ack_ts are not acked and are excluded from the quantiles.
+
+    Args:
+        alerts: DataFrame with created_ts, ack_ts (and the `by` column)
+        by: optional column to group by (e.g. "clinic_id")
+        quantiles: quantiles to report
+        quantile_backend: "exact", or "kll" to use mergeable KLL sketches
+
+    Returns DataFrame with one row per group (a single row if by is None):
+        - acked_alerts: number of acked alerts
+        - p50, p90, ...: time-to-ack quantiles in hours
+    """
+    hours = (
+        pd.to_datetime(alerts["ack_ts"]) - pd.to_datetime(alerts["created_ts"])
+    ).dt.total_seconds() / 3600
+    acked = hours.notna()
+    groups = alerts.loc[acked, by] if by else np.zeros(acked.sum(), dtype=int)
+    quantile_cols = [f"p{round(q * 100):g}" for q in quantiles]
+
+    if quantile_backend not in ("exact", "kll"):
+        raise ValueError(f"Unknown quantile_backend: {quantile_backend!r}")
+    if not acked.any():
+        columns = ([by] if by else []) + ["acked_alerts"] + quantile_cols
+        return pd.DataFrame(columns=columns)
+
+    if quantile_backend == "exact":
+        grouped = hours[acked].groupby(np.asarray(groups), sort=True)
+        result = grouped.quantile(list(quantiles)).unstack()
+        result.columns = quantile_cols
+        result.insert(0, "acked_alerts", grouped.size())
+    elif quantile_backend == "kll":
+        sketches = build_quantile_sketches(hours[acked], groups)
+        rows = {
+            group: summarize_sketch(sketch, quantiles)
+            for group, sketch in sketches.items()
+        }
+        result = pd.DataFrame.from_dict(rows, orient="index")
+        result = result.rename(columns={"count": "acked_alerts"})[
+            ["acked_alerts"] + quantile_cols
+        ]
+
+    if not by:
+        return result.reset_index(drop=True)
+    return result.rename_axis(by).reset_index()
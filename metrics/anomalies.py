@@ -0,0 +1,222 @@
+"""Walk-score / fall-risk anomaly detection for RTM analysis.
+
+Every patient's series is compared against its own rolling baseline (mean
+and standard deviation of the previous `baseline_days` observations):
+
+    - fall_risk_spike: fall_risk_score is at least `spike_z` standard
+      deviations above the patient's baseline
+    - walk_score_decline: the mean walk_score of the last `decline_days`
+      observations is at least `decline_z` standard deviations below the
+      baseline that precedes them
+
+All patients are processed together: rows are sorted by (patient, date)
+once, and every rolling window is read from global prefix sums, clipped at
+the patient's first row. Missing scores are skipped, not treated as 0.
+
+Detections are returned in the same shape as the alerts table
+(patient_id, created_ts, alert_type) so they can be compared directly.
+"""
+
+import numpy as np
+import pandas as pd
+
+BASELINE_DAYS = 28
+MIN_BASELINE_DAYS = 7
+SPIKE_Z = 3.0
+DECLINE_DAYS = 7
+DECLINE_Z = 2.0
+
+
+def _prefix_sums(values: np.ndarray) -> tuple:
+    """Prefix sums of values, squared values and non-missing counts."""
+    present = ~np.isnan(values)
+    filled = np.where(present, values, 0.0)
+    zero = np.zeros(1)
+    return (
+        np.concatenate([zero, np.cumsum(filled)]),
+        np.concatenate([zero, np.cumsum(filled * filled)]),
+        np.concatenate([zero, np.cumsum(present)]),
+    )
+
+
+def _window_stats(prefix: tuple, start: np.ndarray, end: np.ndarray) -> tuple:
+    """Mean, sample std and count of values in rows [start, end)."""
+    total, squares, count = (p[end] - p[start] for p in prefix)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = total / count
+        variance = (squares - count * mean * mean) / (count - 1)
+    return mean, np.sqrt(np.maximum(variance, 0)), count
+
+
+def detect_anomalies(
+    fact_patient_day: pd.DataFrame,
+    baseline_days: int = BASELINE_DAYS,
+    min_baseline_days: int = MIN_BASELINE_DAYS,
+    spike_z: float = SPIKE_Z,
+    decline_days: int = DECLINE_DAYS,
+    decline_z: float = DECLINE_Z,
+) -> pd.DataFrame:
+    """
+    Flag fall-risk spikes and walk-score declines for every patient and date.
+
+    Args:
+        fact_patient_day: DataFrame with patient_id, clinic_id, date,
+            walk_score, fall_risk_score
+        baseline_days: observations in the rolling baseline
+        min_baseline_days: minimum baseline observations before flagging
+        spike_z: z-score above baseline that counts as a fall-risk spike
+        decline_days: observations in the recent walk-score window
+        decline_z: baseline std-devs below baseline that count as a decline
+
+    Returns DataFrame with one row per flagged patient-day:
+        - patient_id, clinic_id, date
+        - alert_type: "fall_risk_spike" or "walk_score_decline"
+        - value: the flagged value (recent mean for declines)
+        - baseline_mean, baseline_std: the patient's baseline
+        - z_score: (value - baseline_mean) / baseline_std
+    """
+    patient_codes, _ = pd.factorize(fact_patient_day["patient_id"])
+    days = fact_patient_day["date"].to_numpy(dtype="datetime64[D]")
+    order = np.lexsort((days, patient_codes))
+    codes = patient_codes[order]
+
+    # First row of each patient's block, per row
+    n = len(order)
+    row = np.arange(n)
+    is_first = np.ones(n, dtype=bool)
+    is_first[1:] = codes[1:] != codes[:-1]
+    block_start = np.maximum.accumulate(np.where(is_first, row, 0))
+
+    detections = []
+
+    # Fall-risk spikes: today vs the previous baseline_days observations
+    fall_risk = fact_patient_day["fall_risk_score"].to_numpy(dtype=float)[order]
+    base_start = np.maximum(row - baseline_days, block_start)
+    mean, std, count = _window_stats(_prefix_sums(fall_risk), base_start, row)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z_score = (fall_risk - mean) / std
+    flagged = (count >= min_baseline_days) & (std > 0) & (z_score >= spike_z)
+    detections.append(("fall_risk_spike", flagged, fall_risk, mean, std, z_score))
+
+    # Walk-score declines: recent window mean vs the baseline before it
+    walk_score = fact_patient_day["walk_score"].to_numpy(dtype=float)[order]
+    prefix = _prefix_sums(walk_score)
+    recent_start = np.maximum(row + 1 - decline_days, block_start)
+    recent_mean, _, recent_count = _window_stats(prefix, recent_start, row + 1)
+    base_start = np.maximum(recent_start - baseline_days, block_start)
+    mean, std, count = _window_stats(prefix, base_start, recent_start)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z_score = (recent_mean - mean) / std
+    flagged = (
+        (recent_count >= decline_days)
+        & (count >= min_baseline_days)
+        & (std > 0)
+        & (z_score <= -decline_z)
+    )
+    detections.append(("walk_score_decline", flagged, recent_mean, mean, std, z_score))
+
+    rows = fact_patient_day.iloc[order]
+    frames = [
+        pd.DataFrame(
+            {
+                "patient_id": rows["patient_id"].to_numpy()[flagged],
+                "clinic_id": rows["clinic_id"].to_numpy()[flagged],
+                "date": rows["date"].to_numpy()[flagged],
+                "alert_type": alert_type,
+                "value": value[flagged],
+                "baseline_mean": mean[flagged],
+                "baseline_std": std[flagged],
+                "z_score": z_score[flagged],
+            }
+        )
+        for alert_type, flagged, value, mean, std, z_score in detections
+    ]
+    return pd.concat(frames, ignore_index=True)
+
+
+def anomalies_to_alerts(anomalies: pd.DataFrame) -> pd.DataFrame:
+    """
+    Collapse per-day flags into alert-like rows (one per episode).
+
+    An episode is a run of flagged days of the same type for a patient with
+    no unflagged day in between; the alert is created on its first day.
+
+    Returns DataFrame with patient_id, clinic_id, created_ts, alert_type,
+    z_score (of the first day) and days_flagged.
+    """
+    flags = anomalies.sort_values(["alert_type", "patient_id", "date"])
+    days = flags["date"].to_numpy(dtype="datetime64[D]").astype(np.int64)
+    same_series = (
+        flags["alert_type"].to_numpy()[1:] == flags["alert_type"].to_numpy()[:-1]
+    ) & (flags["patient_id"].to_numpy()[1:] == flags["patient_id"].to_numpy()[:-1])
+    new_episode = np.ones(len(flags), dtype=bool)
+    new_episode[1:] = ~(same_series & (days[1:] == days[:-1] + 1))
+    episode = np.cumsum(new_episode) - 1
+
+    alerts = flags[new_episode].rename(columns={"date": "created_ts"})
+    alerts = alerts[["patient_id", "clinic_id", "created_ts", "alert_type", "z_score"]]
+    alerts["days_flagged"] = np.bincount(episode)
+    return alerts.sort_values("created_ts").reset_index(drop=True)
+
+
+def compare_with_alerts(
+    detected: pd.DataFrame,
+    alerts: pd.DataFrame,
+    tolerance_days: int = 1,
+) -> dict:
+    """
+    Match detected alerts with rows of the alerts table.
+
+    A detection matches an alert of the same patient created within
+    tolerance_days of it (any alert type). Rows without a created_ts can't
+    be matched and count as unmatched.
+
+    Returns dict with:
+        - detected_count, alerts_count
+        - matched_detected: detections with a matching alert
+        - matched_alerts: alerts with a matching detection
+        - undated_detected, undated_alerts: rows without a created_ts
+        - detected_match_rate, alert_match_rate: percentages
+    """
+    tolerance = pd.Timedelta(days=tolerance_days)
+    detected_keys = detected[["patient_id", "created_ts"]].assign(
+        created_ts=lambda df: pd.to_datetime(df["created_ts"]).astype("datetime64[ns]"),
+        patient_id=lambda df: df["patient_id"].astype(str),
+    )
+    alert_keys = alerts[["patient_id", "created_ts"]].assign(
+        created_ts=lambda df: pd.to_datetime(df["created_ts"])
+        .dt.normalize()
+        .astype("datetime64[ns]"),
+        patient_id=lambda df: df["patient_id"].astype(str),
+    )
+
+    def matched(left: pd.DataFrame, right: pd.DataFrame) -> int:
+        left = left[left["created_ts"].notna()]
+        right = right[right["created_ts"].notna()]
+        merged = pd.merge_asof(
+            left.sort_values("created_ts"),
+            right.sort_values("created_ts").assign(match=True),
+            on="created_ts",
+            by="patient_id",
+            tolerance=tolerance,
+            direction="nearest",
+        )
+        return int(merged["match"].eq(True).sum())
+
+    matched_detected = matched(detected_keys, alert_keys)
+    matched_alerts = matched(alert_keys, detected_keys)
+
+    return {
+        "detected_count": len(detected_keys),
+        "alerts_count": len(alert_keys),
+        "matched_detected": matched_detected,
+        "matched_alerts": matched_alerts,
+        "undated_detected": int(detected_keys["created_ts"].isna().sum()),
+        "undated_alerts": int(alert_keys["created_ts"].isna().sum()),
+        "detected_match_rate": (
+            matched_detected / len(detected_keys) * 100 if len(detected_keys) else 0
+        ),
+        "alert_match_rate": (
+            matched_alerts / len(alert_keys) * 100 if len(alert_keys) else 0
+        ),
+    }
@@ -0,0 +1,117 @@
+"""Billing-threshold sensitivity curves for RTM analysis.
+
+Instead of re-scanning per-patient active days once per threshold, the
+active-day counts are turned into a histogram (np.bincount) and a reverse
+cumulative sum. Entry t of the result is the number of patients with at least
+t active days, for every t in 0..max_threshold, in one O(n) pass.
+"""
+
+import numpy as np
+import pandas as pd
+from config import DATE_START, DATE_END
+from .context import period_activity
+
+DEFAULT_MAX_THRESHOLD = 31
+
+
+def count_reaching_thresholds(
+    active_days,
+    max_threshold: int = DEFAULT_MAX_THRESHOLD,
+    groups=None,
+    n_groups: int = None,
+) -> np.ndarray:
+    """
+    Count patients with at least t active days for every t in 0..max_threshold.
+
+    Args:
+        active_days: active-day count per patient (non-negative integers)
+        max_threshold: highest threshold to report
+        groups: optional integer group code per patient (0..n_groups-1)
+        n_groups: number of groups (default: max group code + 1)
+
+    Returns:
+        array of length max_threshold + 1, or (n_groups, max_threshold + 1)
+        when groups are given
+    """
+    days = np.minimum(np.asarray(active_days, dtype=np.int64), max_threshold)
+    width = max_threshold + 1
+
+    if groups is None:
+        histogram = np.bincount(days, minlength=width)
+    else:
+        groups = np.asarray(groups, dtype=np.int64)
+        n_groups = int(groups.max()) + 1 if n_groups is None else n_groups
+        histogram = np.bincount(
+            groups * width + days, minlength=n_groups * width
+        ).reshape(n_groups, width)
+
+    # Reverse cumulative sum: patients with >= t active days
+    return np.flip(np.cumsum(np.flip(histogram, axis=-1), axis=-1), axis=-1)
+
+
+def get_billable_counts_by_threshold(
+    fact_patient_day: pd.DataFrame,
+    start_date: str = DATE_START,
+    end_date: str = DATE_END,
+    max_threshold: int = DEFAULT_MAX_THRESHOLD,
+    by: str = None,
+) -> pd.DataFrame:
+    """
+    Get billable patient counts for every threshold 0..max_threshold.
+
+    Args:
+        fact_patient_day: DataFrame with patient_id, date, is_active_day
+        start_date, end_date: billing period
+        max_threshold: highest threshold to report
+        by: None, "clinic_id" or "month" (calendar month of the date)
+
+    Returns DataFrame with one row per (group,) threshold:
+        - clinic_id / month: group (only when by is given)
+        - threshold: minimum active days
+        - billable_count: patients with at least `threshold` active days
+        - total_patients: patients with data in the period (and group)
+        - billable_rate: percentage billable
+    """
+    period = period_activity(fact_patient_day, start_date, end_date)
+
+    if by is None:
+        keys = []
+    elif by == "month":
+        keys = [period["date"].dt.to_period("M").rename("month")]
+    else:
+        keys = [period[by]]
+
+    # One grouped pass: active days per (group, patient)
+    patient_days = period.groupby(
+        keys + [period["patient_id"]], observed=True, sort=True
+    )["is_active_day"].sum()
+
+    if by is None:
+        counts = count_reaching_thresholds(patient_days.to_numpy(), max_threshold)[None]
+        group_values = [None]
+    else:
+        group_codes, group_values = pd.factorize(
+            patient_days.index.get_level_values(0), sort=True
+        )
+        counts = count_reaching_thresholds(
+            patient_days.to_numpy(), max_threshold, group_codes, len(group_values)
+        )
+
+    n_groups, width = counts.shape
+    result = pd.DataFrame(
+        {
+            "threshold": np.tile(np.arange(width), n_groups),
+            "billable_count": counts.ravel(),
+            "total_patients": np.repeat(counts[:, 0], width),
+        }
+    )
+    if by is not None:
+        result.insert(0, by, np.repeat(np.asarray(group_values), width))
+
+    result["billable_rate"] = np.divide(
+        result["billable_count"] * 100.0,
+        result["total_patients"],
+        out=np.zeros(len(result)),
+        where=result["total_patients"] > 0,
+    )
+    return result
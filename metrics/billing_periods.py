@@ -0,0 +1,143 @@
+"""Per-patient rolling RTM billing periods.
+
+Real RTM billing (and KPI 3) counts active days in consecutive 30-day periods
+anchored on each patient's first_data_date, not in calendar months:
+
+    period 0: first_data_date + 0  .. first_data_date + 29
+    period 1: first_data_date + 30 .. first_data_date + 59
+    ...
+
+A period is billable once it has `threshold` active days; the billable date
+is the day the threshold-th active day happened. All patients' periods are
+computed together with array operations, with no per-patient loop.
+"""
+
+import numpy as np
+import pandas as pd
+from config import ANALYSIS_DATE, BILLING_THRESHOLD
+
+BILLING_PERIOD_DAYS = 30
+
+
+def get_billing_periods(
+    patients: pd.DataFrame,
+    fact_patient_day: pd.DataFrame,
+    period_days: int = BILLING_PERIOD_DAYS,
+    threshold: int = BILLING_THRESHOLD,
+    analysis_date: pd.Timestamp = ANALYSIS_DATE,
+) -> dict:
+    """
+    Split every patient's history into billing periods and count active days.
+
+    Only patients with a first_data_date on or before analysis_date have
+    periods; rows after analysis_date are ignored.
+
+    Returns dict with:
+        - periods_df: one row per patient period with patient_id,
+          period_index, period_start, period_end, days_with_data,
+          active_days, is_complete, is_billable, billable_date
+        - billable_by_month: DataFrame with month and billable_periods
+          (periods by the month of their billable date)
+        - billable_periods: number of billable periods
+        - complete_periods: number of periods that ended by analysis_date
+        - billable_rate: percentage of complete periods that are billable
+        - billable_patients: patients with at least 1 billable period
+    """
+    analysis_day = np.datetime64(pd.Timestamp(analysis_date).normalize(), "D")
+
+    # Patients with an anchor date, and how many periods each has so far
+    anchored = patients[
+        patients["first_data_date"].notna()
+        & (patients["first_data_date"] <= analysis_date)
+    ]
+    if anchored.empty:
+        no_dates = pd.Series(dtype="datetime64[ns]")
+        periods_df = pd.DataFrame(
+            {
+                "patient_id": pd.Series(dtype=patients["patient_id"].dtype),
+                "period_index": pd.Series(dtype=np.int64),
+                "period_start": no_dates,
+                "period_end": no_dates,
+                "days_with_data": pd.Series(dtype=np.int64),
+                "active_days": pd.Series(dtype=np.int64),
+                "is_complete": pd.Series(dtype=bool),
+                "is_billable": pd.Series(dtype=bool),
+                "billable_date": no_dates,
+            }
+        )
+        return {
+            "periods_df": periods_df,
+            "billable_by_month": pd.DataFrame(columns=["month", "billable_periods"]),
+            "billable_periods": 0,
+            "complete_periods": 0,
+            "billable_rate": 0,
+            "billable_patients": 0,
+        }
+    patient_ids = pd.Index(anchored["patient_id"])
+    anchor = anchored["first_data_date"].to_numpy(dtype="datetime64[D]")
+    n_periods = ((analysis_day - anchor).astype(int) // period_days) + 1
+
+    # Flat period table: patient p owns rows first_period[p] .. + n_periods[p]
+    first_period = np.concatenate([[0], np.cumsum(n_periods)[:-1]])
+    period_patient = np.repeat(np.arange(len(patient_ids)), n_periods)
+    period_index = np.arange(n_periods.sum()) - first_period[period_patient]
+    period_start = anchor[period_patient] + period_index * period_days
+    period_end = period_start + (period_days - 1)
+
+    # Assign each patient-day row to its period
+    codes = patient_ids.get_indexer(fact_patient_day["patient_id"])
+    row_dates = fact_patient_day["date"].to_numpy(dtype="datetime64[D]")
+    offsets = (row_dates - anchor[codes]).astype(int)
+    valid = (codes >= 0) & (offsets >= 0) & (row_dates <= analysis_day)
+    row_period = first_period[codes[valid]] + offsets[valid] // period_days
+    row_active = fact_patient_day["is_active_day"].to_numpy()[valid] == 1
+
+    n_total = len(period_patient)
+    days_with_data = np.bincount(row_period, minlength=n_total)
+    active_days = np.bincount(row_period[row_active], minlength=n_total)
+
+    # Billable date: the threshold-th active day of each period
+    active_period = row_period[row_active]
+    active_dates = row_dates[valid][row_active]
+    order = np.lexsort((active_dates, active_period))
+    active_period, active_dates = active_period[order], active_dates[order]
+    group_start = np.searchsorted(active_period, active_period, side="left")
+    nth_active = np.arange(len(active_period)) - group_start + 1
+    reached = nth_active == threshold
+    billable_date = np.full(n_total, np.datetime64("NaT"), dtype="datetime64[D]")
+    billable_date[active_period[reached]] = active_dates[reached]
+
+    periods_df = pd.DataFrame(
+        {
+            "patient_id": patient_ids[period_patient],
+            "period_index": period_index,
+            "period_start": period_start.astype("datetime64[ns]"),
+            "period_end": period_end.astype("datetime64[ns]"),
+            "days_with_data": days_with_data,
+            "active_days": active_days,
+            "is_complete": period_end <= analysis_day,
+            "is_billable": active_days >= threshold,
+            "billable_date": billable_date.astype("datetime64[ns]"),
+        }
+    )
+
+    billable = periods_df[periods_df["is_billable"]]
+    billable_by_month = (
+        billable.groupby(billable["billable_date"].dt.to_period("M").rename("month"))
+        .size()
+        .reset_index(name="billable_periods")
+    )
+
+    complete_periods = int(periods_df["is_complete"].sum())
+    complete_billable = int((periods_df["is_complete"] & periods_df["is_billable"]).sum())
+
+    return {
+        "periods_df": periods_df,
+        "billable_by_month": billable_by_month,
+        "billable_periods": len(billable),
+        "complete_periods": complete_periods,
+        "billable_rate": (
+            complete_billable / complete_periods * 100 if complete_periods > 0 else 0
+        ),
+        "billable_patients": billable["patient_id"].nunique(),
+    }
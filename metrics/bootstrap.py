@@ -0,0 +1,169 @@
+"""Bootstrap confidence intervals for clinic active rates.
+
+Patients, not patient-days, are the resampling unit: each clinic's
+patients are redrawn with replacement and the clinic rate is recomputed as
+sum(active days) / sum(patient-days) over the redrawn patients. Days of
+the same patient are correlated, so resampling days would give intervals
+that are too narrow.
+
+Replicates are drawn in batches (one integer matrix per clinic and batch)
+over per-patient (active, total) counts, and batches are spread over
+worker processes with independent SeedSequence streams, so a run is
+reproducible for a given seed and worker count.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from config import DATE_START, DATE_END
+from .context import period_activity
+
+N_REPLICATES = 2000
+CONFIDENCE = 0.95
+
+# Cap on patients x replicates drawn at once (per clinic)
+BATCH_CELLS = 4_000_000
+
+
+def _bootstrap_rates(
+    active: np.ndarray,
+    total: np.ndarray,
+    bounds: np.ndarray,
+    n_replicates: int,
+    seed_sequence: np.random.SeedSequence,
+) -> np.ndarray:
+    """Bootstrap rates, shape (n_replicates, n_clinics)."""
+    rng = np.random.default_rng(seed_sequence)
+    n_clinics = len(bounds) - 1
+    rates = np.empty((n_replicates, n_clinics))
+    for c in range(n_clinics):
+        clinic_active = active[bounds[c] : bounds[c + 1]]
+        clinic_total = total[bounds[c] : bounds[c + 1]]
+        n = len(clinic_active)
+        batch = max(1, BATCH_CELLS // max(n, 1))
+        for start in range(0, n_replicates, batch):
+            stop = min(start + batch, n_replicates)
+            draws = rng.integers(0, n, size=(stop - start, n))
+            active_sum = clinic_active[draws].sum(axis=1)
+            total_sum = clinic_total[draws].sum(axis=1)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                rates[start:stop, c] = active_sum / total_sum
+    return rates
+
+
+def get_patient_day_counts(
+    fact_patient_day: pd.DataFrame,
+    start_date: str = DATE_START,
+    end_date: str = DATE_END,
+) -> pd.DataFrame:
+    """
+    Per-patient active and total days in a period.
+
+    Returns DataFrame with patient_id, clinic_id, active_days, total_days,
+    sorted by clinic_id.
+    """
+    period = period_activity(fact_patient_day, start_date, end_date)
+    counts = (
+        period.groupby(["clinic_id", "patient_id"], observed=True)
+        .agg(
+            active_days=("is_active_day", "sum"),
+            total_days=("is_active_day", "size"),
+        )
+        .reset_index()
+    )
+    return counts[["patient_id", "clinic_id", "active_days", "total_days"]]
+
+
+def get_clinic_bootstrap_cis(
+    fact_patient_day: pd.DataFrame,
+    clinics: pd.DataFrame = None,
+    start_date: str = DATE_START,
+    end_date: str = DATE_END,
+    n_replicates: int = N_REPLICATES,
+    confidence: float = CONFIDENCE,
+    seed: int = None,
+    n_workers: int = None,
+) -> dict:
+    """
+    Bootstrap confidence intervals for active days rate by clinic.
+
+    Args:
+        fact_patient_day: DataFrame with patient_id, clinic_id, date, is_active_day
+        clinics: optional DataFrame with clinic_id, clinic_name
+        n_replicates: bootstrap replicates
+        confidence: interval coverage (percentile intervals)
+        seed: seed for reproducible replicates
+        n_workers: worker processes (default: CPU count, 1 = in-process)
+
+    Returns dict with:
+        - clinic_ci_df: DataFrame with clinic_id, (clinic_name), patients,
+          active_rate, ci_lower, ci_upper (percentages), sorted by active_rate
+        - pairwise_df: DataFrame with clinic_a, clinic_b, difference
+          (a - b, percentage points), ci_lower, ci_upper, significant
+          (interval excludes 0)
+        - replicates: array (n_replicates, n_clinics) of bootstrap rates (%)
+    """
+    counts = get_patient_day_counts(fact_patient_day, start_date, end_date)
+    clinic_ids, clinic_starts = np.unique(
+        counts["clinic_id"].to_numpy(), return_index=True
+    )
+    bounds = np.append(clinic_starts, len(counts))
+    active = counts["active_days"].to_numpy(dtype=np.float64)
+    total = counts["total_days"].to_numpy(dtype=np.float64)
+
+    # Split replicates into one job per worker, each with its own stream
+    n_workers = n_workers or os.cpu_count() or 1
+    n_jobs = max(1, min(n_workers, n_replicates))
+    job_sizes = np.diff(np.linspace(0, n_replicates, n_jobs + 1).astype(int))
+    seeds = np.random.SeedSequence(seed).spawn(n_jobs)
+    args = [(active, total, bounds, int(size), s) for size, s in zip(job_sizes, seeds)]
+
+    if n_jobs == 1:
+        batches = [_bootstrap_rates(*args[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            batches = list(pool.map(_bootstrap_rates, *zip(*args)))
+    replicates = np.vstack(batches) * 100
+
+    alpha = (1 - confidence) / 2
+    active_sums = np.add.reduceat(active, clinic_starts)
+    total_sums = np.add.reduceat(total, clinic_starts)
+    lower, upper = np.nanquantile(replicates, [alpha, 1 - alpha], axis=0)
+    clinic_ci = pd.DataFrame(
+        {
+            "clinic_id": clinic_ids,
+            "patients": np.diff(bounds),
+            "active_rate": active_sums / total_sums * 100,
+            "ci_lower": lower,
+            "ci_upper": upper,
+        }
+    )
+    if clinics is not None:
+        clinic_ci = clinic_ci.merge(
+            clinics[["clinic_id", "clinic_name"]], on="clinic_id", how="left"
+        )
+        clinic_ci.insert(1, "clinic_name", clinic_ci.pop("clinic_name"))
+
+    # Every pair at once: replicate differences for (a, b) with a < b
+    a, b = np.triu_indices(len(clinic_ids), k=1)
+    differences = replicates[:, a] - replicates[:, b]
+    diff_lower, diff_upper = np.nanquantile(differences, [alpha, 1 - alpha], axis=0)
+    pairwise = pd.DataFrame(
+        {
+            "clinic_a": clinic_ids[a],
+            "clinic_b": clinic_ids[b],
+            "difference": clinic_ci["active_rate"].to_numpy()[a]
+            - clinic_ci["active_rate"].to_numpy()[b],
+            "ci_lower": diff_lower,
+            "ci_upper": diff_upper,
+        }
+    )
+    pairwise["significant"] = (pairwise["ci_lower"] > 0) | (pairwise["ci_upper"] < 0)
+
+    return {
+        "clinic_ci_df": clinic_ci.sort_values("active_rate", ascending=False),
+        "pairwise_df": pairwise,
+        "replicates": replicates,
+    }
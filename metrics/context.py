@@ -0,0 +1,140 @@
+"""Run-scoped reuse of shared intermediates for RTM metrics.
+
+Several metrics start from the same derived frames (the DATE_START-DATE_END
+period slice, its active-day rows, active days per patient). Inside a
+``run_context()`` block those intermediates are computed once and handed back
+to every metric that asks for them; outside a block they are simply computed.
+
+Intermediates are keyed by (source object, operation, parameters). Sources are
+held by the context for its lifetime, and must not be mutated in place while
+the context is active.
+
+Example:
+    with run_context():
+        billable = get_billable_patients(fact_patient_day)
+        active = get_active_patients(fact_patient_day)  # reuses the period slice
+"""
+
+import contextvars
+from contextlib import contextmanager
+
+import pandas as pd
+
+_current_context = contextvars.ContextVar("rtm_run_context", default=None)
+
+
+class RunContext:
+    """Cache of intermediates keyed by (source, operation, parameters)."""
+
+    def __init__(self):
+        self._results = {}
+
+    def get_or_compute(self, source, operation: str, params: tuple, compute):
+        """Return the cached result for the key, computing it on first use."""
+        key = (id(source), operation, params)
+        entry = self._results.get(key)
+        # Keep the source alive with its result so its id() can't be reused
+        if entry is not None and entry[0] is source:
+            return entry[1]
+
+        result = compute()
+        self._results[key] = (source, result)
+        return result
+
+    def clear(self) -> None:
+        """Drop all cached intermediates."""
+        self._results.clear()
+
+    def discard(self, source=None, operation: str = None) -> int:
+        """
+        Drop intermediates of a source (by identity) and/or operation, and
+        every intermediate computed from the dropped results.
+
+        Returns:
+            Number of intermediates dropped
+        """
+        dropped = [
+            key
+            for key, (entry_source, _) in self._results.items()
+            if (source is None or entry_source is source)
+            and (operation is None or key[1] == operation)
+        ]
+        pending = [self._results.pop(key)[1] for key in dropped]
+        count = len(dropped)
+        while pending:
+            result = pending.pop()
+            for key in [
+                key
+                for key, (entry_source, _) in self._results.items()
+                if entry_source is result
+            ]:
+                pending.append(self._results.pop(key)[1])
+                count += 1
+        return count
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+
+@contextmanager
+def run_context(context: RunContext = None):
+    """Activate a run context (a new one unless one is passed in)."""
+    context = RunContext() if context is None else context
+    token = _current_context.set(context)
+    try:
+        yield context
+    finally:
+        _current_context.reset(token)
+
+
+def get_run_context():
+    """Return the active RunContext, or None outside a run_context() block."""
+    return _current_context.get()
+
+
+def reuse(source, operation: str, params: tuple, compute):
+    """Return compute() through the active run context, if there is one."""
+    context = _current_context.get()
+    if context is None:
+        return compute()
+    return context.get_or_compute(source, operation, params, compute)
+
+
+# =============================================================================
+# Shared intermediates
+# =============================================================================
+
+
+def period_activity(
+    fact_patient_day: pd.DataFrame, start_date, end_date
+) -> pd.DataFrame:
+    """Rows of fact_patient_day with start_date <= date < end_date."""
+    return reuse(
+        fact_patient_day,
+        "period_activity",
+        (pd.Timestamp(start_date), pd.Timestamp(end_date)),
+        lambda: fact_patient_day[
+            (fact_patient_day["date"] >= start_date)
+            & (fact_patient_day["date"] < end_date)
+        ],
+    )
+
+
+def active_day_rows(activity: pd.DataFrame) -> pd.DataFrame:
+    """Rows of an activity frame where is_active_day == 1."""
+    return reuse(
+        activity,
+        "active_day_rows",
+        (),
+        lambda: activity[activity["is_active_day"] == 1],
+    )
+
+
+def active_days_per_patient(activity: pd.DataFrame) -> pd.Series:
+    """Number of active days per patient_id in an activity frame."""
+    return reuse(
+        activity,
+        "active_days_per_patient",
+        (),
+        lambda: active_day_rows(activity).groupby("patient_id").size(),
+    )
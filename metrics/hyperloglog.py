@@ -0,0 +1,235 @@
+"""HyperLogLog sketches for approximate distinct-patient counts.
+
+A sketch is an array of 2**precision uint8 registers. Sketches built for
+separate buckets (e.g. one per date and clinic) merge with an element-wise
+max, so distinct patients over any union of buckets can be estimated from the
+stored sketches without going back to patient-day rows.
+
+Error bounds:
+    The relative standard error of an estimate is 1.04 / sqrt(2**precision):
+        precision 10 -> 3.3%   (1 KB per sketch)
+        precision 12 -> 1.6%   (4 KB per sketch)
+        precision 14 -> 0.81%  (16 KB per sketch, default)
+    About 95% of estimates fall within 2 standard errors of the true count.
+    Small counts (below ~2.5 * 2**precision) use linear counting and are
+    close to exact.
+
+Memory:
+    Registers are dense, so every bucket costs 2**precision bytes however few
+    patients it holds: date x clinic sketches for a year of 50 clinics take
+    365 * 50 * 16 KB = ~290 MB at the default precision. Prefer coarser
+    buckets (by=["date"]) or a lower precision when buckets are many and small.
+"""
+
+import numpy as np
+import pandas as pd
+from .context import reuse
+
+DEFAULT_PRECISION = 14
+
+
+def relative_error(precision: int = DEFAULT_PRECISION) -> float:
+    """Relative standard error of a sketch with the given precision."""
+    return 1.04 / np.sqrt(2**precision)
+
+
+def hash_ids(values) -> np.ndarray:
+    """64-bit hashes of ID values (categoricals hash like their values)."""
+    return pd.util.hash_pandas_object(pd.Series(values), index=False).to_numpy()
+
+
+def _leading_zeros(x: np.ndarray) -> np.ndarray:
+    """Count leading zero bits of uint64 values (64 for x == 0)."""
+    x = x.copy()
+    zeros = np.zeros(len(x), dtype=np.uint8)
+    for shift in (32, 16, 8, 4, 2, 1):
+        empty_top = (x >> np.uint64(64 - shift)) == 0
+        zeros[empty_top] += shift
+        x[empty_top] <<= np.uint64(shift)
+    zeros[x == 0] = 64
+    return zeros
+
+
+def build_registers(
+    hashes: np.ndarray,
+    groups: np.ndarray = None,
+    n_groups: int = 1,
+    precision: int = DEFAULT_PRECISION,
+) -> np.ndarray:
+    """
+    Build one HyperLogLog sketch per group from 64-bit hashes.
+
+    Args:
+        hashes: uint64 hashes of the items (see hash_ids)
+        groups: integer group code per item in [0, n_groups) (default: one group)
+        n_groups: number of groups
+        precision: number of index bits (sketch has 2**precision registers)
+
+    Returns:
+        uint8 array of shape (n_groups, 2**precision)
+    """
+    m = 2**precision
+    hashes = np.asarray(hashes, dtype=np.uint64)
+    groups = np.zeros(len(hashes), dtype=np.int64) if groups is None else groups
+
+    index = (hashes >> np.uint64(64 - precision)).astype(np.int64)
+    remainder = hashes << np.uint64(precision)
+    rank = np.minimum(_leading_zeros(remainder), 64 - precision) + 1
+
+    registers = np.zeros(n_groups * m, dtype=np.uint8)
+    np.maximum.at(registers, np.asarray(groups, dtype=np.int64) * m + index, rank)
+    return registers.reshape(n_groups, m)
+
+
+def merge_registers(registers: np.ndarray) -> np.ndarray:
+    """Merge a stack of sketches (n, m) into one sketch (m,)."""
+    return np.asarray(registers).max(axis=0)
+
+
+def estimate_cardinality(registers: np.ndarray) -> np.ndarray:
+    """
+    Estimate distinct counts from sketches.
+
+    Args:
+        registers: one sketch (m,) or a stack of sketches (n, m)
+
+    Returns:
+        float estimate for one sketch, array of estimates for a stack
+    """
+    registers = np.asarray(registers)
+    m = registers.shape[-1]
+    alpha = 0.7213 / (1 + 1.079 / m)
+
+    raw = alpha * m * m / np.exp2(-registers.astype(float)).sum(axis=-1)
+    empty = (registers == 0).sum(axis=-1)
+
+    # Linear counting for the small range
+    with np.errstate(divide="ignore"):
+        linear = m * np.log(m / np.maximum(empty, 1))
+    return np.where((raw <= 2.5 * m) & (empty > 0), linear, raw)
+
+
+def approx_nunique(values, precision: int = DEFAULT_PRECISION) -> int:
+    """Approximate number of distinct values (HyperLogLog)."""
+    if len(values) == 0:
+        return 0
+    registers = build_registers(hash_ids(values), precision=precision)
+    return int(round(float(estimate_cardinality(registers[0]))))
+
+
+def approx_nunique_by_group(
+    values, groups, precision: int = DEFAULT_PRECISION
+) -> pd.Series:
+    """Approximate number of distinct values per group (HyperLogLog)."""
+    codes, uniques = pd.factorize(pd.Series(groups), sort=True)
+    known = codes >= 0
+    registers = build_registers(
+        hash_ids(values)[known], codes[known], len(uniques), precision
+    )
+    estimates = np.round(estimate_cardinality(registers)).astype(int)
+    return pd.Series(estimates, index=uniques)
+
+
+def build_patient_sketches(
+    fact_patient_day: pd.DataFrame,
+    by: list = None,
+    active_only: bool = True,
+    precision: int = DEFAULT_PRECISION,
+) -> dict:
+    """
+    Build distinct-patient sketches per bucket (default: per date and clinic).
+
+    Args:
+        fact_patient_day: DataFrame with patient_id, date, clinic_id, is_active_day
+        by: bucket columns (default ["date", "clinic_id"])
+        active_only: only count patients on their active days
+        precision: sketch precision (see module docstring for error bounds)
+
+    Returns dict with:
+        - keys: DataFrame with one row per bucket (the `by` columns)
+        - registers: uint8 array (n_buckets, 2**precision), row i = keys row i
+        - precision: sketch precision
+    """
+    by = ["date", "clinic_id"] if by is None else list(by)
+    rows = fact_patient_day
+    if active_only:
+        rows = rows[rows["is_active_day"] == 1]
+
+    keys = rows[by].drop_duplicates().sort_values(by).reset_index(drop=True)
+    bucket = pd.MultiIndex.from_frame(keys).get_indexer(pd.MultiIndex.from_frame(rows[by]))
+
+    registers = build_registers(
+        hash_ids(rows["patient_id"]), bucket, len(keys), precision
+    )
+    return {"keys": keys, "registers": registers, "precision": precision}
+
+
+def count_distinct_patients(
+    sketches: dict,
+    start_date: str = None,
+    end_date: str = None,
+    clinic_ids: list = None,
+) -> dict:
+    """
+    Estimate distinct patients over a union of buckets by merging sketches.
+
+    Args:
+        sketches: result of build_patient_sketches
+        start_date: keep buckets with date >= start_date (if bucketed by date)
+        end_date: keep buckets with date < end_date (if bucketed by date)
+        clinic_ids: keep buckets of these clinics (if bucketed by clinic)
+
+    Returns dict with:
+        - distinct_patients: estimated distinct patients
+        - relative_error: relative standard error of the estimate
+        - buckets: number of merged buckets
+    """
+    keys = sketches["keys"]
+    selected = np.ones(len(keys), dtype=bool)
+    if start_date is not None:
+        selected &= (keys["date"] >= start_date).to_numpy()
+    if end_date is not None:
+        selected &= (keys["date"] < end_date).to_numpy()
+    if clinic_ids is not None:
+        selected &= keys["clinic_id"].isin(clinic_ids).to_numpy()
+
+    if not selected.any():
+        estimate = 0
+    else:
+        merged = merge_registers(sketches["registers"][selected])
+        estimate = int(round(float(estimate_cardinality(merged))))
+
+    return {
+        "distinct_patients": estimate,
+        "relative_error": relative_error(sketches["precision"]),
+        "buckets": int(selected.sum()),
+    }
+
+
+def build_activity_sketches(
+    fact_patient_day: pd.DataFrame, precision: int = DEFAULT_PRECISION
+) -> dict:
+    """
+    Build per-date sketches of active patients and of all patients with
+    data, for approximate period counts (2 * days * 2**precision bytes).
+
+    Returns dict with:
+        - active: build_patient_sketches result over active days
+        - all: build_patient_sketches result over all patient-days
+    """
+    return {
+        "active": build_patient_sketches(fact_patient_day, ["date"], True, precision),
+        "all": build_patient_sketches(fact_patient_day, ["date"], False, precision),
+    }
+
+
+def activity_sketches(
+    fact_patient_day: pd.DataFrame, precision: int = DEFAULT_PRECISION
+) -> dict:
+    """build_activity_sketches, built once per source inside a run context."""
+    return reuse(
+        fact_patient_day,
+        "activity_sketches",
+        (precision,),
+        lambda: build_activity_sketches(fact_patient_day, precision),
+    )
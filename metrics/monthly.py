@@ -0,0 +1,157 @@
+"""Month-grained query routing to the rtm_monthly aggregate table.
+
+rtm_monthly already holds active days per patient and calendar month. A
+period query is split into:
+
+    - whole calendar months that rtm_monthly covers, answered by summing
+      the pre-aggregated rows
+    - everything else (partial months at either end, months missing from
+      rtm_monthly), answered by scanning fact_patient_day for just those
+      date ranges
+
+Active days are additive over disjoint date ranges, so per-patient totals
+from both sources are simply added. A query made of covered whole months
+never touches fact_patient_day.
+
+rtm_monthly schema used for routing:
+    - patient_id
+    - month: "YYYY-MM", a date in the month or a Period
+    - active_days: active days of the patient in the month
+    - days_with_data: patient-days with any record in the month
+
+Patients in a period are those with at least one patient-day, so only
+rtm_monthly rows with days_with_data > 0 count; without a days_with_data
+column rtm_monthly can't tell, and the whole period is scanned instead
+(with a warning, since the query then gets no benefit from rtm_monthly).
+
+Results are only as good as rtm_monthly; see metrics.reconciliation for
+checking it against the raw patient-days.
+"""
+
+import warnings
+
+import pandas as pd
+from config import BILLING_THRESHOLD, DATE_END, DATE_START
+from .context import active_days_per_patient, period_activity
+
+
+def month_labels(months: pd.Series) -> pd.Series:
+    """Normalize a month column ("YYYY-MM", dates or periods) to "YYYY-MM"."""
+    if pd.api.types.is_datetime64_any_dtype(months):
+        return months.dt.strftime("%Y-%m")
+    return months.astype(str).str[:7]
+
+
+def split_period(start_date, end_date, covered_months) -> tuple:
+    """
+    Split [start_date, end_date) into covered whole months and raw ranges.
+
+    Args:
+        covered_months: month labels ("YYYY-MM") available in the aggregate
+
+    Returns:
+        (list of month labels, list of (start, end) Timestamp ranges to scan)
+    """
+    start = pd.Timestamp(start_date).normalize()
+    end = pd.Timestamp(end_date).normalize()
+    covered = set(covered_months)
+
+    months, raw_ranges = [], []
+    cursor = start
+    month_start = start if start.day == 1 else start + pd.offsets.MonthBegin(1)
+    while month_start + pd.offsets.MonthBegin(1) <= end:
+        month_end = month_start + pd.offsets.MonthBegin(1)
+        if month_start.strftime("%Y-%m") in covered:
+            if cursor < month_start:
+                raw_ranges.append((cursor, month_start))
+            months.append(month_start.strftime("%Y-%m"))
+            cursor = month_end
+        month_start = month_end
+    if cursor < end:
+        raw_ranges.append((cursor, end))
+    return months, raw_ranges
+
+
+def get_period_active_days(
+    fact_patient_day: pd.DataFrame,
+    rtm_monthly: pd.DataFrame,
+    start_date: str = DATE_START,
+    end_date: str = DATE_END,
+) -> dict:
+    """
+    Active days per patient in [start_date, end_date), routed per month.
+
+    Args:
+        fact_patient_day: DataFrame with patient_id, date, is_active_day
+        rtm_monthly: DataFrame with patient_id, month, active_days and
+            days_with_data (without days_with_data every month is scanned
+            from fact_patient_day and a warning is issued)
+        start_date, end_date: period to count
+
+    Returns dict with:
+        - active_days: Series of active days per patient (patients with data
+          in the period, including 0)
+        - aggregate_months: months answered from rtm_monthly (none if it
+          has no days_with_data column)
+        - raw_ranges: (start, end) ranges scanned in fact_patient_day
+    """
+    labels = month_labels(rtm_monthly["month"])
+    if "days_with_data" in rtm_monthly.columns:
+        covered = labels.unique()
+    else:
+        warnings.warn(
+            "rtm_monthly has no days_with_data column; scanning fact_patient_day "
+            "for the whole period",
+            stacklevel=2,
+        )
+        covered = []
+    months, raw_ranges = split_period(start_date, end_date, covered)
+
+    in_months = labels.isin(months).to_numpy()
+    monthly = rtm_monthly[in_months]
+    monthly = monthly[monthly["days_with_data"] > 0] if len(months) else monthly
+    parts = [monthly.groupby("patient_id")["active_days"].sum()]
+
+    for range_start, range_end in raw_ranges:
+        period = period_activity(fact_patient_day, range_start, range_end)
+        seen = pd.Series(0, index=pd.Index(period["patient_id"].unique()))
+        parts.append(seen.add(active_days_per_patient(period), fill_value=0))
+
+    active_days = pd.concat(parts).groupby(level=0).sum().astype(int)
+    return {
+        "active_days": active_days,
+        "aggregate_months": months,
+        "raw_ranges": raw_ranges,
+    }
+
+
+def get_billable_patients_routed(
+    fact_patient_day: pd.DataFrame,
+    rtm_monthly: pd.DataFrame,
+    start_date: str = DATE_START,
+    end_date: str = DATE_END,
+    threshold: int = BILLING_THRESHOLD,
+) -> dict:
+    """
+    Get billable patients (16+ active days in period) using rtm_monthly for
+    the whole months it covers.
+
+    Returns the same dict as metrics.overall.get_billable_patients, plus:
+        - aggregate_months: months answered from rtm_monthly
+        - raw_ranges: (start, end) ranges scanned in fact_patient_day
+    """
+    routed = get_period_active_days(fact_patient_day, rtm_monthly, start_date, end_date)
+    active_days = routed["active_days"]
+    billable = active_days[active_days >= threshold]
+    total_patients = len(active_days)
+
+    return {
+        "billable_count": len(billable),
+        "total_patients": total_patients,
+        "billable_rate": (
+            len(billable) / total_patients * 100 if total_patients > 0 else 0
+        ),
+        "billable_patient_ids": billable.index.tolist(),
+        "aggregate_months": routed["aggregate_months"],
+        "raw_ranges": routed["raw_ranges"],
+    }
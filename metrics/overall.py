@@ -9,6 +9,9 @@ from config import (
     DATE_START,
     DATE_END,
 )
+from .context import period_activity, active_days_per_patient
+from .hyperloglog import activity_sketches, count_distinct_patients
+from .monthly import get_billable_patients_routed
 
 
 def get_patient_count(patients: pd.DataFrame) -> int:
@@ -21,33 +24,36 @@ def get_billable_patients(
     start_date: str = DATE_START,
     end_date: str = DATE_END,
     threshold: int = BILLING_THRESHOLD,
+    rtm_monthly: pd.DataFrame = None,
 ) -> dict:
     """
     Get billable patients (16+ active days in period).
 
+    With rtm_monthly, whole calendar months it covers are answered from the
+    pre-aggregated table and only the rest of the period is scanned (see
+    metrics.monthly).
+
     Returns dict with:
         - billable_count: number of billable patients
         - total_patients: total patients in period
         - billable_rate: percentage billable
         - billable_patient_ids: list of billable patient IDs
     """
+    if rtm_monthly is not None:
+        return get_billable_patients_routed(
+            fact_patient_day, rtm_monthly, start_date, end_date, threshold
+        )
+
     # Filter to date range
-    period_activity = fact_patient_day[
-        (fact_patient_day["date"] >= start_date)
-        & (fact_patient_day["date"] < end_date)
-    ]
+    period = period_activity(fact_patient_day, start_date, end_date)
 
     # Count active days per patient
-    patient_active_days = (
-        period_activity[period_activity["is_active_day"] == 1]
-        .groupby("patient_id")
-        .size()
-    )
+    patient_active_days = active_days_per_patient(period)
 
     # Find billable patients (threshold+ active days)
     billable_patients = patient_active_days[patient_active_days >= threshold]
     billable_count = len(billable_patients)
-    total_patients = period_activity["patient_id"].nunique()
+    total_patients = period["patient_id"].nunique()
 
     billable_rate = (billable_count / total_patients * 100) if total_patients > 0 else 0
 
@@ -63,25 +69,40 @@ def get_active_patients(
     fact_patient_day: pd.DataFrame,
     start_date: str = DATE_START,
     end_date: str = DATE_END,
+    approximate: bool = False,
+    sketches: dict = None,
 ) -> dict:
     """
     Get active patients (at least 1 active day in period).
 
+    With approximate=True, both counts are HyperLogLog estimates
+    (~0.8% relative standard error) from merging the per-date sketches of
+    the period (see metrics.hyperloglog.build_activity_sketches);
+    pass pre-built sketches to skip building them from fact_patient_day.
+
     Returns dict with:
         - active_count: number of active patients
         - total_patients: total patients in period
         - active_rate: percentage active
     """
-    # Filter to date range
-    period_activity = fact_patient_day[
-        (fact_patient_day["date"] >= start_date)
-        & (fact_patient_day["date"] < end_date)
-    ]
-
-    active_patients = period_activity[period_activity["is_active_day"] == 1][
-        "patient_id"
-    ].nunique()
-    total_patients = period_activity["patient_id"].nunique()
+    if approximate:
+        sketches = sketches or activity_sketches(fact_patient_day)
+        total_patients = count_distinct_patients(
+            sketches["all"], start_date, end_date
+        )["distinct_patients"]
+        active_patients = min(
+            count_distinct_patients(sketches["active"], start_date, end_date)[
+                "distinct_patients"
+            ],
+            total_patients,
+        )
+    else:
+        # Filter to date range
+        period = period_activity(fact_patient_day, start_date, end_date)
+
+        # Patients with at least one active day
+        active_patients = len(active_days_per_patient(period))
+        total_patients = period["patient_id"].nunique()
 
     active_rate = (active_patients / total_patients * 100) if total_patients > 0 else 0
 
@@ -0,0 +1,293 @@
+"""Provider-level caseload metrics for RTM analysis.
+
+Every metric here is computed by integer-coding patients and providers once,
+counting per patient with np.bincount, and rolling the per-patient counts up
+to providers with a second bincount. There is no per-provider loop, so the
+provider dimension costs about the same for 10 or 10,000 providers.
+
+Patients whose provider_id is not in the providers table are left out of the
+provider rollups.
+"""
+
+import numpy as np
+import pandas as pd
+from config import BILLING_THRESHOLD, DATE_START, DATE_END
+from .context import period_activity
+
+
+def _encode_patients(patients: pd.DataFrame, providers: pd.DataFrame) -> tuple:
+    """
+    Integer-code patients and providers.
+
+    Returns:
+        patient_ids: Index of patient IDs (position = patient code)
+        patient_provider: provider code per patient code (-1 = unknown provider)
+        provider_ids: Index of provider IDs (position = provider code)
+    """
+    provider_ids = pd.Index(providers["provider_id"].drop_duplicates())
+    patient_ids = pd.Index(patients["patient_id"])
+    patient_provider = provider_ids.get_indexer(patients["provider_id"])
+    return patient_ids, patient_provider, provider_ids
+
+
+def _sum_by_provider(
+    values: np.ndarray, patient_provider: np.ndarray, n_providers: int
+) -> np.ndarray:
+    """Sum a per-patient array up to providers."""
+    known = patient_provider >= 0
+    return np.bincount(
+        patient_provider[known], weights=values[known], minlength=n_providers
+    )
+
+
+def _rate(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """Percentage with 0 where the denominator is 0."""
+    return np.divide(
+        numerator * 100.0,
+        denominator,
+        out=np.zeros(len(numerator), dtype=float),
+        where=denominator > 0,
+    )
+
+
+def _with_provider_info(result: pd.DataFrame, providers: pd.DataFrame) -> pd.DataFrame:
+    """Attach the providers table columns to a per-provider result."""
+    info = providers.drop_duplicates("provider_id")
+    return info.merge(result, on="provider_id", how="right")
+
+
+def _period_days_per_patient(
+    fact_patient_day: pd.DataFrame,
+    patient_ids: pd.Index,
+    start_date: str,
+    end_date: str,
+) -> tuple:
+    """Total and active patient-days per patient code within the period."""
+    period = period_activity(fact_patient_day, start_date, end_date)
+    codes = patient_ids.get_indexer(period["patient_id"])
+    known = codes >= 0
+    n_patients = len(patient_ids)
+
+    total_days = np.bincount(codes[known], minlength=n_patients)
+    active_days = np.bincount(
+        codes[known],
+        weights=period["is_active_day"].to_numpy()[known],
+        minlength=n_patients,
+    ).astype(int)
+    return total_days, active_days
+
+
+def get_active_rate_by_provider(
+    fact_patient_day: pd.DataFrame,
+    patients: pd.DataFrame,
+    providers: pd.DataFrame,
+    start_date: str = DATE_START,
+    end_date: str = DATE_END,
+) -> pd.DataFrame:
+    """
+    Get active days rate and active patients per provider.
+
+    Returns DataFrame with provider columns plus:
+        - patients: patients with data in the period
+        - active_patients: patients with at least 1 active day
+        - total_days: total patient-days
+        - active_days: number of active days
+        - active_rate: percentage of patient-days that are active
+        - active_patient_rate: percentage of patients that are active
+    """
+    patient_ids, patient_provider, provider_ids = _encode_patients(patients, providers)
+    total_days, active_days = _period_days_per_patient(
+        fact_patient_day, patient_ids, start_date, end_date
+    )
+    n_providers = len(provider_ids)
+
+    result = pd.DataFrame(
+        {
+            "provider_id": provider_ids,
+            "patients": _sum_by_provider(total_days > 0, patient_provider, n_providers),
+            "active_patients": _sum_by_provider(
+                active_days > 0, patient_provider, n_providers
+            ),
+            "total_days": _sum_by_provider(total_days, patient_provider, n_providers),
+            "active_days": _sum_by_provider(active_days, patient_provider, n_providers),
+        }
+    )
+    count_cols = ["patients", "active_patients", "total_days", "active_days"]
+    result[count_cols] = result[count_cols].astype(int)
+    result["active_rate"] = _rate(result["active_days"], result["total_days"])
+    result["active_patient_rate"] = _rate(result["active_patients"], result["patients"])
+
+    return _with_provider_info(result, providers)
+
+
+def get_billable_patients_by_provider(
+    fact_patient_day: pd.DataFrame,
+    patients: pd.DataFrame,
+    providers: pd.DataFrame,
+    start_date: str = DATE_START,
+    end_date: str = DATE_END,
+    threshold: int = BILLING_THRESHOLD,
+) -> pd.DataFrame:
+    """
+    Get billable patients (threshold+ active days in period) per provider.
+
+    Returns DataFrame with provider columns plus:
+        - billable_count: number of billable patients
+        - total_patients: patients with data in the period
+        - billable_rate: percentage billable
+    """
+    patient_ids, patient_provider, provider_ids = _encode_patients(patients, providers)
+    total_days, active_days = _period_days_per_patient(
+        fact_patient_day, patient_ids, start_date, end_date
+    )
+    n_providers = len(provider_ids)
+
+    result = pd.DataFrame(
+        {
+            "provider_id": provider_ids,
+            "billable_count": _sum_by_provider(
+                active_days >= threshold, patient_provider, n_providers
+            ).astype(int),
+            "total_patients": _sum_by_provider(
+                total_days > 0, patient_provider, n_providers
+            ).astype(int),
+        }
+    )
+    result["billable_rate"] = _rate(result["billable_count"], result["total_patients"])
+
+    return _with_provider_info(result, providers)
+
+
+def get_patient_funnel_by_provider(
+    patients: pd.DataFrame,
+    fact_patient_day: pd.DataFrame,
+    providers: pd.DataFrame,
+    billing_compliance_threshold: int = BILLING_THRESHOLD,
+) -> pd.DataFrame:
+    """
+    Get the enrollment-to-compliance funnel per provider.
+
+    Uses the same stage definitions as get_patient_funnel.
+
+    Returns DataFrame with provider columns plus:
+        - enrolled, installed, first_data, compliant: patients per stage
+        - compliant_rate: percentage of enrolled patients that are 16/30 compliant
+    """
+    patient_ids, patient_provider, provider_ids = _encode_patients(patients, providers)
+    n_providers = len(provider_ids)
+
+    enrollment = patients["enrollment_date"].to_numpy(dtype="datetime64[ns]")
+    days_to_first_data = (
+        patients["first_data_date"] - patients["enrollment_date"]
+    ).dt.days.to_numpy()
+
+    # 16/30 compliance: active days in the first 30 days from enrollment
+    codes = patient_ids.get_indexer(fact_patient_day["patient_id"])
+    known = codes >= 0
+    row_dates = fact_patient_day["date"].to_numpy(dtype="datetime64[ns]")[known]
+    days_since_enrollment = (row_dates - enrollment[codes[known]]).astype(
+        "timedelta64[D]"
+    ).astype(float)
+    in_first_30 = (
+        (days_since_enrollment >= 0)
+        & (days_since_enrollment < 30)
+        & (fact_patient_day["is_active_day"].to_numpy()[known] == 1)
+    )
+    active_days_first_30 = np.bincount(
+        codes[known][in_first_30], minlength=len(patient_ids)
+    )
+
+    stages = {
+        "enrolled": patients["enrollment_date"].notna().to_numpy(),
+        "installed": patients["install_date"].notna().to_numpy(),
+        "first_data": (days_to_first_data >= 0) & (days_to_first_data <= 7),
+        "compliant": active_days_first_30 >= billing_compliance_threshold,
+    }
+
+    result = pd.DataFrame({"provider_id": provider_ids})
+    for stage, reached in stages.items():
+        result[stage] = _sum_by_provider(reached, patient_provider, n_providers).astype(
+            int
+        )
+    result["compliant_rate"] = _rate(result["compliant"], result["enrolled"])
+
+    return _with_provider_info(result, providers)
+
+
+def get_alert_load_by_provider(
+    alerts: pd.DataFrame,
+    patients: pd.DataFrame,
+    providers: pd.DataFrame,
+    start_date: str = DATE_START,
+    end_date: str = DATE_END,
+) -> pd.DataFrame:
+    """
+    Get alerts created in the period per provider (via the alert's patient).
+
+    Returns DataFrame with provider columns plus:
+        - alert_count: alerts created in the period
+        - alerted_patients: patients with at least 1 alert
+    """
+    patient_ids, patient_provider, provider_ids = _encode_patients(patients, providers)
+    n_providers = len(provider_ids)
+
+    created = pd.to_datetime(alerts["created_ts"])
+    in_period = ((created >= start_date) & (created < end_date)).to_numpy()
+    codes = patient_ids.get_indexer(alerts["patient_id"])[in_period]
+    alerts_per_patient = np.bincount(codes[codes >= 0], minlength=len(patient_ids))
+
+    result = pd.DataFrame(
+        {
+            "provider_id": provider_ids,
+            "alert_count": _sum_by_provider(
+                alerts_per_patient, patient_provider, n_providers
+            ).astype(int),
+            "alerted_patients": _sum_by_provider(
+                alerts_per_patient > 0, patient_provider, n_providers
+            ).astype(int),
+        }
+    )
+
+    return _with_provider_info(result, providers)
+
+
+def get_provider_caseload(
+    fact_patient_day: pd.DataFrame,
+    patients: pd.DataFrame,
+    providers: pd.DataFrame,
+    alerts: pd.DataFrame = None,
+    start_date: str = DATE_START,
+    end_date: str = DATE_END,
+    threshold: int = BILLING_THRESHOLD,
+) -> pd.DataFrame:
+    """
+    Get one caseload row per provider: activity, billing, funnel and alerts.
+
+    Combines get_active_rate_by_provider, get_billable_patients_by_provider,
+    get_patient_funnel_by_provider and (if alerts is given)
+    get_alert_load_by_provider.
+
+    Returns DataFrame with provider columns plus all of their metric columns,
+    sorted by active_rate descending.
+    """
+    info_cols = [col for col in providers.columns if col != "provider_id"]
+    metric_frames = [
+        get_billable_patients_by_provider(
+            fact_patient_day, patients, providers, start_date, end_date, threshold
+        ),
+        get_patient_funnel_by_provider(patients, fact_patient_day, providers, threshold),
+    ]
+    if alerts is not None:
+        metric_frames.append(
+            get_alert_load_by_provider(alerts, patients, providers, start_date, end_date)
+        )
+
+    caseload = get_active_rate_by_provider(
+        fact_patient_day, patients, providers, start_date, end_date
+    )
+    for frame in metric_frames:
+        caseload = caseload.merge(
+            frame.drop(columns=info_cols), on="provider_id", how="left"
+        )
+
+    return caseload.sort_values("active_rate", ascending=False)
@@ -0,0 +1,232 @@
+"""Bulk reconciliation of computed monthly billing against rtm_monthly.
+
+Monthly active days and days with data are computed for every patient and
+month in one pass: each patient-day gets an int64 key
+patient_code * n_months + month_index, and the counts come from a single
+np.unique / np.bincount over those keys. rtm_monthly rows are keyed the
+same way and joined with np.searchsorted, so the whole comparison is a few
+array operations no matter how many months are checked.
+
+Only months present in rtm_monthly are compared by default (the current,
+still open month is usually not in it yet). A (patient, month) that appears
+more than once in rtm_monthly is reported as duplicate_in_rtm, with the
+values of its first row.
+"""
+
+import numpy as np
+import pandas as pd
+from config import BILLING_THRESHOLD
+from .monthly import month_labels
+
+# Issue types, most severe first (a row reports the first that applies)
+ISSUES = [
+    "duplicate_in_rtm",
+    "missing_in_rtm",
+    "missing_in_computed",
+    "billable_mismatch",
+    "active_days_mismatch",
+    "days_with_data_mismatch",
+]
+
+
+def _month_label(index: np.ndarray) -> np.ndarray:
+    """Months since year 0 as "YYYY-MM" labels."""
+    return np.char.add(
+        np.char.add((index // 12).astype(str), "-"),
+        np.char.zfill((index % 12 + 1).astype(str), 2),
+    )
+
+
+def compute_monthly_active_days(
+    fact_patient_day: pd.DataFrame,
+    threshold: int = BILLING_THRESHOLD,
+) -> pd.DataFrame:
+    """
+    Active days and days with data per patient and calendar month.
+
+    Returns DataFrame with patient_id, month ("YYYY-MM"), active_days,
+    days_with_data, is_billable (active_days >= threshold).
+    """
+    codes, patient_ids = pd.factorize(fact_patient_day["patient_id"])
+    month = (
+        fact_patient_day["date"].to_numpy(dtype="datetime64[M]").astype(np.int64)
+        + 1970 * 12
+    )
+    first_month = month.min()
+    n_months = month.max() - first_month + 1
+    keys = codes.astype(np.int64) * n_months + (month - first_month)
+
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    active = fact_patient_day["is_active_day"].to_numpy() == 1
+    active_days = np.bincount(inverse, weights=active, minlength=len(unique_keys))
+    days_with_data = np.bincount(inverse, minlength=len(unique_keys))
+
+    result = pd.DataFrame(
+        {
+            "patient_id": np.asarray(patient_ids)[unique_keys // n_months],
+            "month": _month_label(unique_keys % n_months + first_month),
+            "active_days": active_days.astype(int),
+            "days_with_data": days_with_data,
+        }
+    )
+    result["is_billable"] = (result["active_days"] >= threshold).astype(int)
+    return result
+
+
+def reconcile_rtm_monthly(
+    fact_patient_day: pd.DataFrame,
+    rtm_monthly: pd.DataFrame,
+    threshold: int = BILLING_THRESHOLD,
+    months: list = None,
+) -> dict:
+    """
+    Compare computed monthly active days and billable flags with rtm_monthly.
+
+    Args:
+        fact_patient_day: DataFrame with patient_id, date, is_active_day
+        rtm_monthly: DataFrame with patient_id, month, active_days
+            (days_with_data, is_billable and clinic_id are used if present)
+        threshold: active days needed to be billable
+        months: months ("YYYY-MM") to check (default: months in rtm_monthly)
+
+    Returns dict with:
+        - summary: dict with rows_compared, matched_rows, and a count per issue
+        - diff_df: one row per mismatching (patient, month) with computed_ and
+          rtm_ values, rtm_rows (rows in rtm_monthly) and the issue (see ISSUES)
+        - by_month_df: DataFrame with month, rows, mismatches per month
+    """
+    computed = compute_monthly_active_days(fact_patient_day, threshold)
+    rtm = rtm_monthly.assign(month=month_labels(rtm_monthly["month"]))
+    months = sorted(rtm["month"].unique()) if months is None else sorted(months)
+    computed = computed[computed["month"].isin(months)]
+    rtm = rtm[rtm["month"].isin(months)]
+
+    # Integer keys shared by both sides
+    patient_index = pd.Index(
+        pd.unique(
+            np.concatenate(
+                [computed["patient_id"].to_numpy(), rtm["patient_id"].to_numpy()]
+            )
+        )
+    )
+    month_ids = {m: i for i, m in enumerate(months)}
+    n_months = len(months)
+
+    def keys(frame: pd.DataFrame) -> np.ndarray:
+        return patient_index.get_indexer(frame["patient_id"]).astype(
+            np.int64
+        ) * n_months + frame["month"].map(month_ids).to_numpy(dtype=np.int64)
+
+    computed_keys = keys(computed)
+    rtm_keys, rtm_first, rtm_counts = np.unique(
+        keys(rtm), return_index=True, return_counts=True
+    )
+    rtm = rtm.iloc[rtm_first]
+    all_keys = np.union1d(computed_keys, rtm_keys)
+    n = len(all_keys)
+
+    def aligned(frame_keys: np.ndarray, values, fill) -> tuple:
+        out = np.full(n, fill, dtype=float)
+        present = np.zeros(n, dtype=bool)
+        position = np.searchsorted(all_keys, frame_keys)
+        out[position] = values
+        present[position] = True
+        return out, present
+
+    c_active, in_computed = aligned(
+        computed_keys, computed["active_days"].to_numpy(), np.nan
+    )
+    c_days, _ = aligned(computed_keys, computed["days_with_data"].to_numpy(), np.nan)
+    r_active, in_rtm = aligned(rtm_keys, rtm["active_days"].to_numpy(), np.nan)
+    r_days = (
+        aligned(rtm_keys, rtm["days_with_data"].to_numpy(), np.nan)[0]
+        if "days_with_data" in rtm.columns
+        else np.full(n, np.nan)
+    )
+    r_billable = (
+        aligned(rtm_keys, rtm["is_billable"].to_numpy(), np.nan)[0]
+        if "is_billable" in rtm.columns
+        else (r_active >= threshold).astype(float)
+    )
+    c_billable = np.where(in_computed, c_active >= threshold, np.nan)
+    rtm_rows, _ = aligned(rtm_keys, rtm_counts, 0)
+
+    # rtm rows without any data are not missing from the computed side
+    rtm_has_data = in_rtm & ((np.nan_to_num(r_days, nan=1) > 0) | (r_active > 0))
+    both = in_computed & in_rtm
+    checks = {
+        "duplicate_in_rtm": rtm_rows > 1,
+        "missing_in_rtm": in_computed & ~in_rtm,
+        "missing_in_computed": rtm_has_data & ~in_computed,
+        "billable_mismatch": both & (c_billable != r_billable),
+        "active_days_mismatch": both & (c_active != r_active),
+        "days_with_data_mismatch": both & ~np.isnan(r_days) & (c_days != r_days),
+    }
+
+    issue = np.full(n, "", dtype=object)
+    for name in reversed(ISSUES):
+        issue[checks[name]] = name
+    flagged = issue != ""
+
+    diff = pd.DataFrame(
+        {
+            "patient_id": np.asarray(patient_index)[all_keys // n_months],
+            "month": np.asarray(months)[all_keys % n_months],
+            "computed_active_days": c_active,
+            "rtm_active_days": r_active,
+            "computed_days_with_data": c_days,
+            "rtm_days_with_data": r_days,
+            "computed_billable": c_billable,
+            "rtm_billable": r_billable,
+            "rtm_rows": rtm_rows,
+            "issue": issue,
+        }
+    )[flagged]
+    counts = [col for col in diff.columns if col.startswith(("computed_", "rtm_"))]
+    diff[counts] = diff[counts].astype("Int64")
+    if "clinic_id" in rtm_monthly.columns:
+        clinics = rtm_monthly.drop_duplicates("patient_id").set_index("patient_id")
+        diff.insert(1, "clinic_id", diff["patient_id"].map(clinics["clinic_id"]))
+
+    month_of = all_keys % n_months
+    by_month = pd.DataFrame(
+        {
+            "month": months,
+            "rows": np.bincount(month_of, minlength=n_months),
+            "mismatches": np.bincount(month_of[flagged], minlength=n_months),
+        }
+    )
+
+    summary = {"rows_compared": n, "matched_rows": int(n - flagged.sum())}
+    summary.update({name: int((issue == name).sum()) for name in ISSUES})
+
+    return {
+        "summary": summary,
+        "diff_df": diff.reset_index(drop=True),
+        "by_month_df": by_month,
+    }
+
+
+def print_reconciliation(report: dict, max_rows: int = 20) -> None:
+    """Print a compact reconciliation report."""
+    summary = report["summary"]
+    print("\nRTM MONTHLY RECONCILIATION")
+    print("-" * 50)
+    print(f"Rows compared: {summary['rows_compared']:,}")
+    print(f"Matched rows:  {summary['matched_rows']:,}")
+    for name in ISSUES:
+        if summary[name]:
+            print(f"   {name}: {summary[name]:,}")
+
+    by_month = report["by_month_df"]
+    by_month = by_month[by_month["mismatches"] > 0]
+    if len(by_month):
+        print("\nMismatches by month:")
+        for _, row in by_month.iterrows():
+            print(f"   {row['month']}: {row['mismatches']:,} / {row['rows']:,}")
+
+    diff = report["diff_df"]
+    if len(diff):
+        print(f"\nFirst {min(max_rows, len(diff))} of {len(diff):,} mismatching rows:")
+        print(diff.head(max_rows).to_string(index=False))
+    print("-" * 50)
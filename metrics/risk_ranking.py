@@ -0,0 +1,176 @@
+"""Top-K patient risk ranking for RTM care teams.
+
+Risk signals are read from the per-patient feature table
+(storage.patient_features, with add_window_features applied), each scaled
+to 0-1, and combined into one weighted score per patient:
+
+    - fall_risk: highest fall_risk_score in the lookback window / 100
+    - inactivity: days since last active day, capped at INACTIVITY_CAP_DAYS
+      (never active = 1)
+    - billing_gap: active days still missing to reach BILLING_THRESHOLD in
+      the last 30 days, as a share of the threshold
+
+Signals are configurable: pass weights for the built-in ones, or extra
+signal functions (features -> array of 0-1 values).
+
+Top K per clinic or provider is found with np.argpartition on each group's
+slice, so only the K selected rows are ever sorted.
+"""
+
+import numpy as np
+import pandas as pd
+from config import ANALYSIS_DATE, BILLING_THRESHOLD
+
+DEFAULT_K = 20
+INACTIVITY_CAP_DAYS = 30
+
+
+def _fall_risk(features: pd.DataFrame) -> np.ndarray:
+    values = features["max_fall_risk_recent"].to_numpy(dtype=float)
+    return np.nan_to_num(np.clip(values, 0, 100) / 100)
+
+
+def _inactivity(features: pd.DataFrame) -> np.ndarray:
+    days = features["days_since_last_active"].to_numpy(dtype=float)
+    days = np.where(np.isnan(days), INACTIVITY_CAP_DAYS, days)
+    return np.clip(days, 0, INACTIVITY_CAP_DAYS) / INACTIVITY_CAP_DAYS
+
+
+def _billing_gap(features: pd.DataFrame) -> np.ndarray:
+    active = features["active_days_30"].to_numpy(dtype=float)
+    return np.clip(BILLING_THRESHOLD - active, 0, BILLING_THRESHOLD) / BILLING_THRESHOLD
+
+
+SIGNALS = {
+    "fall_risk": _fall_risk,
+    "inactivity": _inactivity,
+    "billing_gap": _billing_gap,
+}
+
+DEFAULT_WEIGHTS = {"fall_risk": 1.0, "inactivity": 1.0, "billing_gap": 1.0}
+
+
+def compute_risk_scores(
+    features: pd.DataFrame,
+    weights: dict = None,
+    signals: dict = None,
+) -> pd.DataFrame:
+    """
+    Compute risk signals and the combined score for every patient.
+
+    Args:
+        features: patient feature table with window columns
+        weights: {signal name: weight} (default: DEFAULT_WEIGHTS); signals
+            with weight 0 or missing are left out
+        signals: extra {name: function(features) -> 0-1 array}
+
+    Returns DataFrame aligned with features: one column per used signal
+    plus risk_score (weighted sum of the signals).
+    """
+    weights = DEFAULT_WEIGHTS if weights is None else weights
+    available = {**SIGNALS, **(signals or {})}
+    unknown = [name for name in weights if name not in available]
+    if unknown:
+        raise ValueError(f"Unknown risk signal(s): {', '.join(unknown)}")
+
+    scores = pd.DataFrame(index=features.index)
+    total = np.zeros(len(features))
+    for name, weight in weights.items():
+        if not weight:
+            continue
+        values = np.asarray(available[name](features), dtype=float)
+        scores[name] = values
+        total += weight * values
+    scores["risk_score"] = total
+    return scores
+
+
+def top_k_by_group(scores: np.ndarray, groups: np.ndarray, k: int) -> np.ndarray:
+    """
+    Row positions of the k highest scores per group, ordered by group and
+    descending score.
+
+    Rows are bucketed by group code once; each bucket is cut to k rows with
+    np.argpartition and only those k are sorted.
+    """
+    codes, _ = pd.factorize(groups, sort=True)
+    order = np.argsort(codes, kind="stable")
+    bounds = np.concatenate([[0], np.cumsum(np.bincount(codes[codes >= 0]))])
+    order = order[len(codes) - bounds[-1] :]  # drop rows without a group
+
+    selected = []
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        rows = order[start:stop]
+        if len(rows) > k:
+            rows = rows[np.argpartition(-scores[rows], k - 1)[:k]]
+        selected.append(rows[np.argsort(-scores[rows], kind="stable")])
+    return np.concatenate(selected) if selected else np.array([], dtype=np.intp)
+
+
+def rank_patients(
+    features: pd.DataFrame,
+    k: int = DEFAULT_K,
+    by: str = "clinic_id",
+    weights: dict = None,
+    signals: dict = None,
+) -> pd.DataFrame:
+    """
+    Get the top-K riskiest patients per clinic or provider.
+
+    Args:
+        features: patient feature table with window columns
+        k: patients per group
+        by: "clinic_id", "provider_id" or None (one overall list)
+        weights, signals: see compute_risk_scores
+
+    Returns DataFrame with (by), rank (1 = highest risk), patient_id,
+    risk_score, the signal columns, max_fall_risk_recent,
+    days_since_last_active and active_days_30.
+    """
+    scores = compute_risk_scores(features, weights, signals)
+    groups = (
+        features[by].astype(object).to_numpy()
+        if by
+        else np.zeros(len(features), dtype=int)
+    )
+    rows = top_k_by_group(scores["risk_score"].to_numpy(), groups, k)
+
+    detail = ["max_fall_risk_recent", "days_since_last_active", "active_days_30"]
+    ranking = pd.concat(
+        [
+            features[["patient_id"] + ([by] if by else [])].iloc[rows],
+            scores.iloc[rows],
+            features[detail].iloc[rows],
+        ],
+        axis=1,
+    ).reset_index(drop=True)
+
+    group_values = pd.Series(groups[rows])
+    ranking.insert(
+        0, "rank", group_values.groupby(group_values, sort=False).cumcount() + 1
+    )
+    if by:
+        ranking.insert(0, by, ranking.pop(by))
+    return ranking
+
+
+def get_risk_ranking(
+    patients: pd.DataFrame,
+    fact_patient_day: pd.DataFrame,
+    k: int = DEFAULT_K,
+    by: str = "clinic_id",
+    weights: dict = None,
+    analysis_date: pd.Timestamp = ANALYSIS_DATE,
+) -> pd.DataFrame:
+    """
+    Build the patient feature table and rank patients (see rank_patients).
+
+    For daily refreshes keep the feature table up to date with
+    update_patient_features() and call rank_patients() on it directly.
+    """
+    from storage.patient_features import add_window_features, build_patient_features
+
+    features = add_window_features(
+        build_patient_features(patients, fact_patient_day, analysis_date)
+    )
+    return rank_patients(features, k, by, weights)
@@ -0,0 +1,167 @@
+"""Stratified patient sampling and scaled-up estimates for RTM analysis.
+
+Patients are sampled per clinic (stratum) without replacement, and every
+table is cut down to the sampled patients' whole histories, so per-patient
+metrics computed on the sample are exact for those patients.
+
+Population counts and rates are then estimated with the standard
+stratified estimators:
+
+    total:  Y = sum_h N_h * mean_h(y)
+            Var(Y) = sum_h N_h^2 * (1 - n_h / N_h) * s_h^2 / n_h
+    ratio:  R = Y / X, with the variance of the residual total Y - R * X
+            (linearization) divided by X^2
+
+Confidence intervals use the normal approximation.
+"""
+
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+CONFIDENCE = 0.95
+
+# Stratum of patients with no value in the strata column
+UNASSIGNED_STRATUM = "unassigned"
+
+
+def stratified_patient_sample(
+    patients: pd.DataFrame,
+    fraction: float,
+    strata: str = "clinic_id",
+    seed: int = None,
+) -> dict:
+    """
+    Draw a patient sample stratified by clinic.
+
+    Every stratum gets round(fraction * N_h) patients, but at least 2 (or
+    all of them if smaller) so its variance can be estimated. Patients with
+    no stratum value form their own UNASSIGNED_STRATUM stratum.
+
+    Returns dict with:
+        - patient_ids: Index of sampled patient IDs
+        - sample_df: DataFrame with patient_id, stratum of sampled patients
+        - strata_df: DataFrame with stratum, population, sampled
+        - fraction: requested sampling fraction
+    """
+    if not 0 < fraction <= 1:
+        raise ValueError(f"fraction must be in (0, 1], got {fraction}")
+
+    rng = np.random.default_rng(seed)
+    stratum = patients[strata].astype(object).fillna(UNASSIGNED_STRATUM).to_numpy()
+    codes, labels = pd.factorize(stratum)
+    population = np.bincount(codes, minlength=len(labels))
+    sampled = np.minimum(
+        np.maximum(np.round(population * fraction).astype(int), 2), population
+    )
+
+    # Random order within each stratum, keep the first n_h
+    order = np.lexsort((rng.random(len(codes)), codes))
+    starts = np.concatenate([[0], np.cumsum(population)[:-1]])
+    rank = np.empty(len(codes), dtype=int)
+    rank[order] = np.arange(len(codes)) - starts[codes[order]]
+    keep = rank < sampled[codes]
+
+    sample = pd.DataFrame(
+        {
+            "patient_id": patients["patient_id"].to_numpy()[keep],
+            "stratum": stratum[keep],
+        }
+    )
+    return {
+        "patient_ids": pd.Index(sample["patient_id"]),
+        "sample_df": sample,
+        "strata_df": pd.DataFrame(
+            {"stratum": labels, "population": population, "sampled": sampled}
+        ),
+        "fraction": fraction,
+    }
+
+
+def sample_tables(tables: dict, design: dict) -> dict:
+    """Cut every table with a patient_id column down to the sampled patients."""
+    sampled = {}
+    for name, table in tables.items():
+        if "patient_id" in table.columns:
+            table = table[table["patient_id"].isin(design["patient_ids"])]
+        sampled[name] = table
+    return sampled
+
+
+def _interval(estimate: float, variance: float, confidence: float) -> dict:
+    """Estimate with standard error and a normal confidence interval."""
+    std_error = float(np.sqrt(max(variance, 0.0)))
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    return {
+        "estimate": float(estimate),
+        "std_error": std_error,
+        "ci_lower": float(estimate - z * std_error),
+        "ci_upper": float(estimate + z * std_error),
+    }
+
+
+def _stratum_totals(values: pd.Series, design: dict) -> tuple:
+    """Estimated total and its variance, from per-patient values."""
+    sample = design["sample_df"]
+    y = (
+        values.reindex(sample["patient_id"]).fillna(0).to_numpy(dtype=float)
+        if len(values)
+        else np.zeros(len(sample))
+    )
+    strata = design["strata_df"]
+    codes = pd.Index(strata["stratum"]).get_indexer(sample["stratum"])
+    population = strata["population"].to_numpy(dtype=float)
+    n = strata["sampled"].to_numpy(dtype=float)
+
+    sums = np.bincount(codes, weights=y, minlength=len(strata))
+    squares = np.bincount(codes, weights=y * y, minlength=len(strata))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = np.where(n > 0, sums / n, 0.0)
+        s2 = np.where(n > 1, (squares - n * mean * mean) / (n - 1), 0.0)
+        variance = np.where(n > 0, population**2 * (1 - n / population) * s2 / n, 0.0)
+    return float((population * mean).sum()), float(np.maximum(variance, 0).sum())
+
+
+def estimate_total(
+    values: pd.Series, design: dict, confidence: float = CONFIDENCE
+) -> dict:
+    """
+    Estimate a population total from per-patient values on the sample.
+
+    Args:
+        values: per-patient values indexed by patient_id (missing = 0), e.g.
+            a 0/1 indicator to estimate a patient count
+        design: result of stratified_patient_sample()
+
+    Returns dict with estimate, std_error, ci_lower, ci_upper.
+    """
+    total, variance = _stratum_totals(values, design)
+    return _interval(total, variance, confidence)
+
+
+def estimate_ratio(
+    numerator: pd.Series,
+    denominator: pd.Series,
+    design: dict,
+    confidence: float = CONFIDENCE,
+) -> dict:
+    """
+    Estimate a population ratio of two per-patient totals (e.g. active days /
+    patient-days, billable patients / patients in period).
+
+    Returns dict with estimate, std_error, ci_lower, ci_upper (as a ratio,
+    not a percentage).
+    """
+    y_total, _ = _stratum_totals(numerator, design)
+    x_total, _ = _stratum_totals(denominator, design)
+    if x_total == 0:
+        return _interval(0.0, 0.0, confidence)
+    ratio = y_total / x_total
+
+    index = numerator.index.union(denominator.index)
+    residual = numerator.reindex(index, fill_value=0) - ratio * denominator.reindex(
+        index, fill_value=0
+    )
+    _, variance = _stratum_totals(residual, design)
+    return _interval(ratio, variance / x_total**2, confidence)
@@ -0,0 +1,130 @@
+"""Run-length streak analytics for RTM analysis.
+
+Active days are sorted by (patient, date) once; a new run starts wherever
+the patient changes or the date does not follow the previous active day.
+Run lengths, gaps between runs and per-patient maxima then come from
+cumulative sums, bincounts and ufunc.at reductions over those arrays, with
+no per-patient grouping or iteration.
+
+Days without a row in fact_patient_day count as inactive.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def _histogram(
+    clinic_codes: np.ndarray, lengths: np.ndarray, clinics, name: str
+) -> pd.DataFrame:
+    """Count streaks per (clinic, length)."""
+    counts = (
+        pd.DataFrame({"clinic_id": np.asarray(clinics)[clinic_codes], name: lengths})
+        .value_counts(["clinic_id", name], dropna=False)
+        .sort_index()
+        .reset_index(name="streaks")
+    )
+    return counts
+
+
+def get_activity_streaks(
+    fact_patient_day: pd.DataFrame,
+    analysis_date: pd.Timestamp = None,
+) -> dict:
+    """
+    Get active streaks and inactive gaps for every patient.
+
+    Args:
+        fact_patient_day: DataFrame with patient_id, clinic_id, date, is_active_day
+        analysis_date: as-of date for "current" streaks (default: last date in
+            the data); rows after it are ignored
+
+    Returns dict with:
+        - patient_streaks_df: one row per patient with patient_id, clinic_id,
+          current_active_streak, longest_active_streak,
+          current_inactive_gap, longest_inactive_gap, active_streaks
+        - active_streak_histogram: DataFrame with clinic_id, streak_length, streaks
+        - inactive_gap_histogram: DataFrame with clinic_id, gap_length, streaks
+          (gaps between two active streaks)
+    """
+    if analysis_date is None:
+        analysis_date = fact_patient_day["date"].max()
+    as_of = np.datetime64(pd.Timestamp(analysis_date).normalize(), "D").astype(np.int64)
+
+    rows = fact_patient_day[fact_patient_day["date"] <= analysis_date]
+    patient_codes, patient_ids = pd.factorize(rows["patient_id"])
+    n_patients = len(patient_ids)
+    days = rows["date"].to_numpy(dtype="datetime64[D]").astype(np.int64)
+
+    # Clinic and first observed day per patient
+    # A missing clinic_id gets its own code (NaN) instead of the -1 sentinel
+    clinic_codes, clinics = pd.factorize(rows["clinic_id"], use_na_sentinel=False)
+    patient_clinic = np.zeros(n_patients, dtype=np.int64)
+    patient_clinic[patient_codes] = clinic_codes
+    first_seen = np.full(n_patients, np.iinfo(np.int64).max)
+    np.minimum.at(first_seen, patient_codes, days)
+
+    # Active days sorted by patient, then date (duplicates removed)
+    active = rows["is_active_day"].to_numpy() == 1
+    keys = np.unique(
+        patient_codes[active].astype(np.int64) * (1 << 32) + (days[active] - days.min())
+    )
+    codes = keys >> 32
+    active_days = (keys & ((1 << 32) - 1)) + days.min()
+
+    # Runs of consecutive active days
+    new_run = np.ones(len(codes), dtype=bool)
+    new_run[1:] = (codes[1:] != codes[:-1]) | (active_days[1:] != active_days[:-1] + 1)
+    run_id = np.cumsum(new_run) - 1
+    run_length = np.bincount(run_id)
+    run_patient = codes[new_run]
+    run_start = active_days[new_run]
+    run_end = run_start + run_length - 1
+
+    # Gaps between consecutive runs of the same patient
+    same_patient = run_patient[1:] == run_patient[:-1]
+    between_gaps = (run_start[1:] - run_end[:-1] - 1)[same_patient]
+    between_patient = run_patient[1:][same_patient]
+
+    # Per-patient summaries
+    active_streaks = np.bincount(run_patient, minlength=n_patients)
+    longest_active = np.zeros(n_patients, dtype=np.int64)
+    np.maximum.at(longest_active, run_patient, run_length)
+
+    is_last_run = np.append(run_patient[1:] != run_patient[:-1], True)
+    last_end = np.full(n_patients, np.iinfo(np.int64).min)
+    last_end[run_patient[is_last_run]] = run_end[is_last_run]
+    last_length = np.zeros(n_patients, dtype=np.int64)
+    last_length[run_patient[is_last_run]] = run_length[is_last_run]
+    is_first_run = np.insert(run_patient[1:] != run_patient[:-1], 0, True)
+    first_start = np.full(n_patients, as_of + 1)
+    first_start[run_patient[is_first_run]] = run_start[is_first_run]
+
+    ever_active = active_streaks > 0
+    current_gap = np.where(ever_active, as_of - last_end, as_of - first_seen + 1)
+    current_streak = np.where(ever_active & (last_end == as_of), last_length, 0)
+
+    leading_gap = first_start - first_seen
+    longest_gap = np.maximum(current_gap, leading_gap)
+    np.maximum.at(longest_gap, between_patient, between_gaps)
+
+    patient_streaks = pd.DataFrame(
+        {
+            "patient_id": patient_ids,
+            "clinic_id": np.asarray(clinics)[patient_clinic],
+            "current_active_streak": current_streak,
+            "longest_active_streak": longest_active,
+            "current_inactive_gap": current_gap,
+            "longest_inactive_gap": longest_gap,
+            "active_streaks": active_streaks,
+        }
+    )
+
+    return {
+        "patient_streaks_df": patient_streaks,
+        "active_streak_histogram": _histogram(
+            patient_clinic[run_patient], run_length, clinics, "streak_length"
+        ),
+        "inactive_gap_histogram": _histogram(
+            patient_clinic[between_patient], between_gaps, clinics, "gap_length"
+        ),
+    }
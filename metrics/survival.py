@@ -0,0 +1,204 @@
+"""Engagement survival analysis (time to drop-out) for RTM analysis.
+
+Drop-out follows KPI 4: a patient drops out at the start of their first
+streak of at least K consecutive inactive days. Time is counted in days
+since first_data_date (day 0).
+
+Patients who haven't had a full K-day inactive streak by the as-of date are
+right-censored: the last streak start that could have been confirmed is
+day T - K + 1, where T is the last observed day, so they are known to have
+survived until then. Patients who were never active are a funnel issue, not
+a drop-out (KPI 4 edge case), and are left out.
+
+Everything is computed with array operations over the active patient-days
+(gaps between consecutive active days), and Kaplan-Meier curves come from a
+single grouped pass, so there are no per-patient or per-group Python loops.
+"""
+
+import numpy as np
+import pandas as pd
+from config import ANALYSIS_DATE, DROPOFF_INACTIVE_DAYS
+
+
+def get_time_to_dropout(
+    patients: pd.DataFrame,
+    fact_patient_day: pd.DataFrame,
+    inactive_days: int = DROPOFF_INACTIVE_DAYS,
+    analysis_date: pd.Timestamp = ANALYSIS_DATE,
+) -> pd.DataFrame:
+    """
+    Get time to drop-out (or censoring) per patient.
+
+    Args:
+        patients: DataFrame with patient_id, first_data_date, enrollment_date
+        fact_patient_day: DataFrame with patient_id, date, is_active_day
+        inactive_days: K, length of the inactive streak that counts as drop-out
+        analysis_date: as-of date for right-censoring
+
+    Returns DataFrame with one row per patient that had an active day:
+        - patient_id, clinic_id (if in patients), enrollment_cohort (month)
+        - duration: days from first_data_date to drop-out, or to censoring
+        - dropped_out: True if the drop-out was observed, False if censored
+    """
+    as_of_day = np.datetime64(pd.Timestamp(analysis_date).normalize(), "D")
+
+    anchored = patients[
+        patients["first_data_date"].notna()
+        & (patients["first_data_date"] <= analysis_date)
+    ]
+    patient_ids = pd.Index(anchored["patient_id"])
+    anchor = anchored["first_data_date"].to_numpy(dtype="datetime64[D]")
+    last_day = (as_of_day - anchor).astype(int)
+
+    # Active day offsets since first data, sorted per patient
+    active = fact_patient_day[fact_patient_day["is_active_day"] == 1]
+    codes = patient_ids.get_indexer(active["patient_id"])
+    row_dates = active["date"].to_numpy(dtype="datetime64[D]")
+    known = codes >= 0
+    codes = codes[known]
+    offsets = (row_dates[known] - anchor[codes]).astype(int)
+    observed = (offsets >= 0) & (offsets <= last_day[codes])
+    codes, offsets = codes[observed], offsets[observed]
+    order = np.lexsort((offsets, codes))
+    codes, offsets = codes[order], offsets[order]
+
+    # Inactive gap after each active day (trailing gap runs to the last day)
+    is_last = np.append(codes[1:] != codes[:-1], True)
+    next_offset = np.append(offsets[1:], 0)
+    gap = np.where(is_last, last_day[codes] - offsets, next_offset - offsets - 1)
+    streak_start = np.where(gap >= inactive_days, offsets + 1, np.iinfo(np.int64).max)
+
+    # Leading gap before the first active day
+    n_patients = len(patient_ids)
+    first_active = np.full(n_patients, -1)
+    is_first = np.insert(codes[1:] != codes[:-1], 0, True)
+    first_active[codes[is_first]] = offsets[is_first]
+
+    dropout_day = np.full(n_patients, np.iinfo(np.int64).max)
+    np.minimum.at(dropout_day, codes, streak_start)
+    dropout_day = np.where(first_active >= inactive_days, 0, dropout_day)
+
+    ever_active = first_active >= 0
+    dropped_out = dropout_day != np.iinfo(np.int64).max
+    censor_day = np.maximum(last_day - inactive_days + 1, 0)
+
+    result = pd.DataFrame(
+        {
+            "patient_id": patient_ids,
+            "duration": np.where(dropped_out, dropout_day, censor_day),
+            "dropped_out": dropped_out,
+        }
+    )
+    if "clinic_id" in anchored.columns:
+        result.insert(1, "clinic_id", anchored["clinic_id"].to_numpy())
+    result.insert(
+        2 if "clinic_id" in anchored.columns else 1,
+        "enrollment_cohort",
+        pd.to_datetime(anchored["enrollment_date"]).dt.to_period("M").to_numpy(),
+    )
+
+    return result[ever_active].reset_index(drop=True)
+
+
+def kaplan_meier(
+    durations: pd.DataFrame,
+    by: str = None,
+    confidence_z: float = 1.96,
+) -> pd.DataFrame:
+    """
+    Kaplan-Meier survival curves, optionally per group.
+
+    Args:
+        durations: DataFrame with duration, dropped_out (and the `by` column)
+        by: optional group column (e.g. "clinic_id", "enrollment_cohort")
+        confidence_z: z-value for the Greenwood confidence band
+
+    Returns DataFrame with one row per (group,) distinct duration:
+        - time: days since first data
+        - at_risk: patients still at risk at time
+        - dropouts: drop-outs observed at time
+        - censored: patients censored at time
+        - survival: estimated probability of still being engaged after time
+        - ci_lower, ci_upper: Greenwood confidence band
+    """
+    keys = [by, "duration"] if by else ["duration"]
+    events = (
+        durations.groupby(keys, observed=True, sort=True)
+        .agg(dropouts=("dropped_out", "sum"), leaving=("dropped_out", "size"))
+        .reset_index()
+        .rename(columns={"duration": "time"})
+    )
+    events["dropouts"] = events["dropouts"].astype(int)
+    events["censored"] = events["leaving"] - events["dropouts"]
+
+    group = events[by] if by else pd.Series(0, index=events.index)
+    grouped = events["leaving"].groupby(group, observed=True, sort=False)
+    events["at_risk"] = grouped.transform("sum") - grouped.cumsum() + events["leaving"]
+
+    n, d = events["at_risk"].to_numpy(float), events["dropouts"].to_numpy(float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log_step = np.log1p(-d / n)
+        greenwood_step = d / (n * (n - d))
+    events["survival"] = np.exp(
+        pd.Series(log_step).groupby(group.to_numpy(), sort=False).cumsum().to_numpy()
+    )
+    variance_sum = (
+        pd.Series(greenwood_step).groupby(group.to_numpy(), sort=False).cumsum().to_numpy()
+    )
+    std_error = events["survival"].to_numpy() * np.sqrt(variance_sum)
+    events["ci_lower"] = np.clip(events["survival"] - confidence_z * std_error, 0, 1)
+    events["ci_upper"] = np.clip(events["survival"] + confidence_z * std_error, 0, 1)
+
+    columns = ([by] if by else []) + [
+        "time",
+        "at_risk",
+        "dropouts",
+        "censored",
+        "survival",
+        "ci_lower",
+        "ci_upper",
+    ]
+    return events[columns]
+
+
+def median_survival_time(curves: pd.DataFrame, by: str = None) -> pd.Series:
+    """First time survival drops to 50% or below (NaN if it never does)."""
+    below = curves[curves["survival"] <= 0.5]
+    if not by:
+        return pd.Series({"all": below["time"].min() if len(below) else np.nan})
+    medians = below.groupby(by, observed=True)["time"].min()
+    return medians.reindex(curves[by].unique())
+
+
+def get_engagement_survival(
+    patients: pd.DataFrame,
+    fact_patient_day: pd.DataFrame,
+    by: str = None,
+    inactive_days: int = DROPOFF_INACTIVE_DAYS,
+    analysis_date: pd.Timestamp = ANALYSIS_DATE,
+) -> dict:
+    """
+    Get engagement survival curves (time to drop-out).
+
+    Args:
+        by: None, "clinic_id" or "enrollment_cohort"
+
+    Returns dict with:
+        - durations_df: per-patient durations (see get_time_to_dropout)
+        - curves_df: Kaplan-Meier curves (see kaplan_meier)
+        - median_days: median time to drop-out per group
+        - dropout_rate: percentage of patients with an observed drop-out
+    """
+    durations = get_time_to_dropout(
+        patients, fact_patient_day, inactive_days, analysis_date
+    )
+    curves = kaplan_meier(durations, by)
+
+    return {
+        "durations_df": durations,
+        "curves_df": curves,
+        "median_days": median_survival_time(curves, by),
+        "dropout_rate": (
+            durations["dropped_out"].mean() * 100 if len(durations) > 0 else 0
+        ),
+    }
@@ -0,0 +1,183 @@
+"""Active-day threshold what-if sweep (KPI 1).
+
+KPI 1 defines an active day as
+    background_data_minutes >= minutes_threshold OR steps_count >= steps_threshold
+with 10 minutes / 300 steps as the current thresholds. This module recomputes
+active days, billable counts and 16/30 compliance for a whole grid of
+thresholds without re-running the metrics per grid point.
+
+How it works:
+    Each row is ranked once against the sorted minute and step thresholds
+    (np.searchsorted). A row is inactive at grid point (a, b) exactly when
+    its minute rank <= a and its step rank <= b, so a 2-D histogram of the
+    ranks plus a cumulative sum over both axes gives the inactive (and
+    therefore active) day counts at every grid point at once. Patient counts
+    (billable, compliant) use only the occupied (patient, rank cell) pairs,
+    so memory never grows with patients x grid size.
+"""
+
+import numpy as np
+import pandas as pd
+from config import BILLING_THRESHOLD, DATE_START, DATE_END
+from .context import period_activity
+
+DEFAULT_MINUTE_THRESHOLDS = (5, 10, 15, 20, 30)
+DEFAULT_STEP_THRESHOLDS = (100, 200, 300, 500, 1000)
+
+
+def _active_day_counts(
+    patient_codes: np.ndarray,
+    minute_rank: np.ndarray,
+    step_rank: np.ndarray,
+    n_patients: int,
+    n_minutes: int,
+    n_steps: int,
+    threshold: int,
+) -> tuple:
+    """
+    Active days, and patients with at least threshold active days, for every
+    threshold pair.
+
+    Returns:
+        (active_days, patients_reaching): int arrays of shape (n_minutes, n_steps)
+    """
+    # Histogram of (minute rank, step rank) cells; ranks run 0..n
+    shape = (n_minutes + 1, n_steps + 1)
+    cell = minute_rank * shape[1] + step_rank
+    histogram = np.bincount(cell, minlength=shape[0] * shape[1]).reshape(shape)
+
+    # inactive[a, b] = rows with minute_rank <= a and step_rank <= b
+    inactive = histogram.cumsum(axis=0).cumsum(axis=1)[:n_minutes, :n_steps]
+    active_days = len(cell) - inactive
+
+    # Sparse per-patient histogram: only the occupied (patient, cell) pairs
+    n_cells = shape[0] * shape[1]
+    keys, counts = np.unique(
+        patient_codes.astype(np.int64) * n_cells + cell, return_counts=True
+    )
+    key_patient = keys // n_cells
+    key_minute, key_step = np.divmod(keys % n_cells, shape[1])
+    total = np.bincount(key_patient, weights=counts, minlength=n_patients)
+
+    patients_reaching = np.zeros((n_minutes, n_steps), dtype=np.int64)
+    for a in range(n_minutes):
+        for b in range(n_steps):
+            is_inactive = (key_minute <= a) & (key_step <= b)
+            patient_inactive = np.bincount(
+                key_patient[is_inactive],
+                weights=counts[is_inactive],
+                minlength=n_patients,
+            )
+            patients_reaching[a, b] = np.sum(total - patient_inactive >= threshold)
+    return active_days, patients_reaching
+
+
+def sweep_active_day_thresholds(
+    fact_patient_day: pd.DataFrame,
+    patients: pd.DataFrame,
+    minute_thresholds: tuple = DEFAULT_MINUTE_THRESHOLDS,
+    step_thresholds: tuple = DEFAULT_STEP_THRESHOLDS,
+    start_date: str = DATE_START,
+    end_date: str = DATE_END,
+    billing_threshold: int = BILLING_THRESHOLD,
+) -> pd.DataFrame:
+    """
+    Recompute active-day metrics for every (minutes, steps) threshold pair.
+
+    Missing minutes/steps are treated as 0 (KPI 1 edge case).
+
+    Args:
+        fact_patient_day: DataFrame with patient_id, date,
+            background_data_minutes, steps_count
+        patients: DataFrame with patient_id and enrollment_date
+        minute_thresholds: background_data_minutes thresholds to try
+        step_thresholds: steps_count thresholds to try
+        start_date, end_date: billing period for active days and billable counts
+        billing_threshold: active days required to bill / be 16/30 compliant
+
+    Returns DataFrame with one row per threshold pair:
+        - minutes_threshold, steps_threshold
+        - total_patient_days, active_days, active_days_rate: within the period
+        - billable_count, total_patients, billable_rate: within the period
+        - compliant_count, compliant_rate: 16/30 compliance from enrollment
+          (same definition as get_patient_funnel), rate of enrolled patients
+    """
+    minute_thresholds = np.unique(minute_thresholds)
+    step_thresholds = np.unique(step_thresholds)
+    n_minutes, n_steps = len(minute_thresholds), len(step_thresholds)
+
+    patient_ids = pd.Index(patients["patient_id"])
+    n_patients = len(patient_ids)
+
+    def rank_rows(rows: pd.DataFrame) -> tuple:
+        codes = patient_ids.get_indexer(rows["patient_id"])
+        known = codes >= 0
+        minutes = rows["background_data_minutes"].fillna(0).to_numpy()[known]
+        steps = rows["steps_count"].fillna(0).to_numpy()[known]
+        minute_rank = np.searchsorted(minute_thresholds, minutes, side="right")
+        step_rank = np.searchsorted(step_thresholds, steps, side="right")
+        return codes[known], minute_rank, step_rank
+
+    # Billing period: active days and billable patients
+    period = period_activity(fact_patient_day, start_date, end_date)
+    codes, minute_rank, step_rank = rank_rows(period)
+    active_days, billable_count = _active_day_counts(
+        codes, minute_rank, step_rank, n_patients, n_minutes, n_steps, billing_threshold
+    )
+    period_patients = np.bincount(codes, minlength=n_patients) > 0
+
+    # First 30 days from enrollment: 16/30 compliance
+    enrollment = patients["enrollment_date"].to_numpy(dtype="datetime64[ns]")
+    all_codes = patient_ids.get_indexer(fact_patient_day["patient_id"])
+    row_dates = fact_patient_day["date"].to_numpy(dtype="datetime64[ns]")
+    days_since_enrollment = (row_dates - enrollment[all_codes]) / np.timedelta64(1, "D")
+    in_first_30 = (
+        (all_codes >= 0) & (days_since_enrollment >= 0) & (days_since_enrollment < 30)
+    )
+    codes, minute_rank, step_rank = rank_rows(fact_patient_day[in_first_30])
+    _, compliant_count = _active_day_counts(
+        codes, minute_rank, step_rank, n_patients, n_minutes, n_steps, billing_threshold
+    )
+    enrolled_count = int(patients["enrollment_date"].notna().sum())
+
+    total_patient_days = len(period)
+    total_patients = int(period_patients.sum())
+
+    grid_minutes, grid_steps = np.meshgrid(
+        minute_thresholds, step_thresholds, indexing="ij"
+    )
+    result = pd.DataFrame(
+        {
+            "minutes_threshold": grid_minutes.ravel(),
+            "steps_threshold": grid_steps.ravel(),
+            "total_patient_days": total_patient_days,
+            "active_days": active_days.ravel(),
+            "billable_count": billable_count.ravel(),
+            "total_patients": total_patients,
+            "compliant_count": compliant_count.ravel(),
+        }
+    )
+    result["active_days_rate"] = (
+        result["active_days"] / total_patient_days * 100 if total_patient_days > 0 else 0
+    )
+    result["billable_rate"] = (
+        result["billable_count"] / total_patients * 100 if total_patients > 0 else 0
+    )
+    result["compliant_rate"] = (
+        result["compliant_count"] / enrolled_count * 100 if enrolled_count > 0 else 0
+    )
+
+    return result[
+        [
+            "minutes_threshold",
+            "steps_threshold",
+            "total_patient_days",
+            "active_days",
+            "active_days_rate",
+            "billable_count",
+            "total_patients",
+            "billable_rate",
+            "compliant_count",
+            "compliant_rate",
+        ]
+    ]
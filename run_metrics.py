@@ -1,51 +1,67 @@
-"""Main runner for RTM metrics analysis."""
+"""Main runner for RTM metrics analysis.
+
+Usage:
+    python run_metrics.py                          # full report with plots
+    python run_metrics.py --no-plots               # numbers only (no matplotlib)
+    python run_metrics.py overall funnel           # selected sections only
+    python run_metrics.py dropoff --no-plots
+    python run_metrics.py --sample 0.1             # approximate report with CIs
+
+Metric modules and the plotting stack are imported inside each section, so a
+quick numbers-only run only loads pandas and the modules it needs.
+"""
+
+import argparse
+import os
 
 import pandas as pd
-from config import DATA_DIR, load_tables
-from metrics import (
-    get_patient_count,
-    get_billable_patients,
-    get_active_patients,
-    get_high_fall_risk_patients,
-    get_active_users_biweekly,
-    get_enrollments_biweekly,
-    calculate_period_changes,
-    get_total_active_rate,
-    get_active_rate_by_clinic,
-    get_patient_active_distribution,
-    get_active_rate_by_day_since_enrollment,
-    get_patient_funnel,
-    print_funnel,
-)
-from visualizations import (
-    plot_active_days_distribution,
-    plot_active_rate_by_day_since_enrollment,
-    plot_patient_funnel,
-)
-
-
-def main():
-    # Load cleaned data
-    tables = load_tables(DATA_DIR)
+from config import COLUMN_STORE_DIR, DATA_DIR, DATE_END, DATE_START
+from metrics.context import run_context
+from storage.tables import load_report_tables
 
-    # Unpack tables
-    patients = tables["patients"]
-    fact_patient_day = tables["fact_patient_day"]
-    clinics = tables["clinics"]
+SECTIONS = ["overall", "kpis", "active-days", "funnel", "dropoff"]
+DEFAULT_SECTIONS = ["overall", "kpis", "active-days", "funnel"]
 
-    # Convert date columns to datetime
-    fact_patient_day["date"] = pd.to_datetime(fact_patient_day["date"])
-    patients["enrollment_date"] = pd.to_datetime(patients["enrollment_date"])
-    patients["install_date"] = pd.to_datetime(patients["install_date"])
-    patients["first_data_date"] = pd.to_datetime(patients["first_data_date"])
 
-    # =========================================================================
-    # OVERALL METRICS REPORT
-    # =========================================================================
+def print_header(title: str) -> None:
+    """Print a section header."""
     print("\n" + "=" * 60)
-    print("OVERALL METRICS REPORT")
+    print(title)
     print("=" * 60)
 
+
+def print_period_changes(df: pd.DataFrame, value_col: str) -> None:
+    """Print period-over-period changes for a bi-weekly metric."""
+    from metrics.kpis import calculate_period_changes
+
+    if len(df) <= 1:
+        return
+
+    changes = calculate_period_changes(df, value_col)
+    print("\n   Period-over-Period Changes:")
+    for _, row in changes.iterrows():
+        if pd.notna(row["change"]):
+            change = int(row["change"])
+            sign = "+" if change > 0 else ""
+            print(
+                f"   Period {row['bi_week']}: {sign}{change} ({sign}{row['pct_change']:.1f}%)"
+            )
+
+
+def run_overall(tables: dict, plots: bool = True, show_plots: bool = True) -> None:
+    """OVERALL METRICS REPORT section."""
+    from metrics.overall import (
+        get_patient_count,
+        get_billable_patients,
+        get_active_patients,
+        get_high_fall_risk_patients,
+    )
+
+    patients = tables["patients"]
+    fact_patient_day = tables["fact_patient_day"]
+
+    print_header("OVERALL METRICS REPORT")
+
     # 1. Overall patients count
     patient_count = get_patient_count(patients)
     print(f"\n1. Overall Patients Count: {patient_count:,}")
@@ -74,59 +90,41 @@ def main():
         f"   - High Risk Rate: {(fall_risk['high_risk_count'] / patient_count * 100):.2f}%"
     )
 
-    # =========================================================================
-    # BI-WEEKLY KPI TRENDS
-    # =========================================================================
-    print("\n" + "=" * 60)
-    print("BI-WEEKLY KPI TRENDS (2-Week Periods)")
-    print("=" * 60)
+
+def run_kpis(tables: dict, plots: bool = True, show_plots: bool = True) -> None:
+    """BI-WEEKLY KPI TRENDS section."""
+    from metrics.kpis import get_active_users_biweekly, get_enrollments_biweekly
+
+    print_header("BI-WEEKLY KPI TRENDS (2-Week Periods)")
 
     # 1. Active users per bi-week
-    active_users_biweekly = get_active_users_biweekly(fact_patient_day)
+    active_users_biweekly = get_active_users_biweekly(tables["fact_patient_day"])
     print("\n1. Active Users per Bi-Week (8+ active days):")
     for _, row in active_users_biweekly.iterrows():
         print(f"   Period {row['bi_week']}: {row['active_users']:,} users")
-
-    # Period changes
-    if len(active_users_biweekly) > 1:
-        active_users_changes = calculate_period_changes(
-            active_users_biweekly, "active_users"
-        )
-        print("\n   Period-over-Period Changes:")
-        for _, row in active_users_changes.iterrows():
-            if pd.notna(row["change"]):
-                change = int(row["change"])
-                sign = "+" if change > 0 else ""
-                print(
-                    f"   Period {row['bi_week']}: {sign}{change} ({sign}{row['pct_change']:.1f}%)"
-                )
+    print_period_changes(active_users_biweekly, "active_users")
 
     # 2. New patient enrollments
-    enrollments_biweekly = get_enrollments_biweekly(patients)
+    enrollments_biweekly = get_enrollments_biweekly(tables["patients"])
     print("\n2. New Patient Enrollments per Bi-Week:")
     for _, row in enrollments_biweekly.iterrows():
         print(f"   Period {row['bi_week']}: {row['new_patients']:,} patients")
+    print_period_changes(enrollments_biweekly, "new_patients")
 
-    # Period changes
-    if len(enrollments_biweekly) > 1:
-        enrollments_changes = calculate_period_changes(
-            enrollments_biweekly, "new_patients"
-        )
-        print("\n   Period-over-Period Changes:")
-        for _, row in enrollments_changes.iterrows():
-            if pd.notna(row["change"]):
-                change = int(row["change"])
-                sign = "+" if change > 0 else ""
-                print(
-                    f"   Period {row['bi_week']}: {sign}{change} ({sign}{row['pct_change']:.1f}%)"
-                )
 
-    # =========================================================================
-    # ACTIVE DAYS METRICS
-    # =========================================================================
-    print("\n" + "=" * 60)
-    print("ACTIVE DAYS METRICS (December 2025)")
-    print("=" * 60)
+def run_active_days(tables: dict, plots: bool = True, show_plots: bool = True) -> None:
+    """ACTIVE DAYS METRICS section."""
+    from metrics.active_days import (
+        get_total_active_rate,
+        get_active_rate_by_clinic,
+        get_patient_active_distribution,
+        get_active_rate_by_day_since_enrollment,
+    )
+
+    patients = tables["patients"]
+    fact_patient_day = tables["fact_patient_day"]
+
+    print_header("ACTIVE DAYS METRICS (December 2025)")
 
     # 1. Total active days rate
     active_rate = get_total_active_rate(fact_patient_day)
@@ -136,7 +134,7 @@ def main():
     print(f"   - Active Days Rate: {active_rate['active_days_rate']:.2f}%")
 
     # 2. Active days rate by clinic
-    clinic_rates = get_active_rate_by_clinic(fact_patient_day, clinics)
+    clinic_rates = get_active_rate_by_clinic(fact_patient_day, tables["clinics"])
     print("\n2. Active Days Rate by Clinic:")
     for _, row in clinic_rates.iterrows():
         print(
@@ -152,37 +150,261 @@ def main():
     print(f"   - Min Active Days: {distribution['min']}")
     print(f"   - Max Active Days: {distribution['max']}")
 
-    # Create distribution plot
-    output_path = plot_active_days_distribution(distribution["distribution_df"])
-    print(f"\n   Graph saved to: {output_path}")
+    if plots:
+        from visualizations.distributions import plot_active_days_distribution
 
-    # 4. Patient active rate by day since enrollment disterbution
+        output_path = plot_active_days_distribution(
+            distribution["distribution_df"], show_plot=show_plots
+        )
+        print(f"\n   Graph saved to: {output_path}")
 
-    # Get data
+    # 4. Patient active rate by day since enrollment disterbution
     result = get_active_rate_by_day_since_enrollment(patients, fact_patient_day)
-
-    # Print summary
     print("\nActive Rate by Day Since Enrollment:")
     print(f"  Mean Active Rate: {result['summary']['mean_active_rate']:.1f}%")
     print(f"  Median Active Rate: {result['summary']['median_active_rate']:.1f}%")
 
-    # Plot
-    output_path = plot_active_rate_by_day_since_enrollment(result["distribution_df"])
-    print(f"  Graph saved to: {output_path}")
+    if plots:
+        from visualizations.distributions import (
+            plot_active_rate_by_day_since_enrollment,
+        )
 
-    # =========================================================================
-    # PATIENT FUNNEL
-    # =========================================================================
-    print("\n" + "=" * 60)
-    print("PATIENT FUNNEL (Enrollment to Compliance)")
-    print("=" * 60)
+        output_path = plot_active_rate_by_day_since_enrollment(
+            result["distribution_df"], show_plot=show_plots
+        )
+        print(f"  Graph saved to: {output_path}")
 
-    funnel_result = get_patient_funnel(patients, fact_patient_day)
+
+def run_funnel(tables: dict, plots: bool = True, show_plots: bool = True) -> None:
+    """PATIENT FUNNEL section."""
+    from metrics.onboarding_funnel import get_patient_funnel, print_funnel
+
+    print_header("PATIENT FUNNEL (Enrollment to Compliance)")
+
+    funnel_result = get_patient_funnel(tables["patients"], tables["fact_patient_day"])
     print_funnel(funnel_result)
 
-    # Create funnel visualization
-    funnel_path = plot_patient_funnel(funnel_result["funnel_df"])
-    print(f"\n   Graph saved to: {funnel_path}")
+    if plots:
+        from visualizations.onboarding_funnel import plot_patient_funnel
+
+        funnel_path = plot_patient_funnel(
+            funnel_result["funnel_df"], show_plot=show_plots
+        )
+        print(f"\n   Graph saved to: {funnel_path}")
+
+
+def run_dropoff(tables: dict, plots: bool = True, show_plots: bool = True) -> None:
+    """30-DAY RETENTION (drop-off) section."""
+    from analyze_30day_dropoff import (
+        get_active_days_in_first_30,
+        get_retention_by_active_days,
+    )
+
+    print_header("30-DAY RETENTION ANALYSIS")
+
+    patient_active_days = get_active_days_in_first_30(
+        tables["patients"], tables["fact_patient_day"]
+    )
+    print(f"\nTotal patients analyzed: {len(patient_active_days):,}")
+    print(
+        f"Mean active days in first 30: {patient_active_days['active_days_in_first_30'].mean():.1f}"
+    )
+
+    retention_df = get_retention_by_active_days(patient_active_days)
+    print("\nKey retention milestones:")
+    for m in [1, 5, 10, 16, 20, 25, 30]:
+        row = retention_df[retention_df["active_days_threshold"] == m].iloc[0]
+        print(
+            f"  {m:2d}+ active days: {int(row['users_reached']):,} users ({row['pct_reached']:.1f}%)"
+        )
+
+    if plots:
+        from analyze_30day_dropoff import plot_30day_retention
+
+        output_path = plot_30day_retention(retention_df, show_plot=show_plots)
+        print(f"\n   Graph saved to: {output_path}")
+
+
+def print_estimate(label: str, estimate: dict, percent: bool = False) -> None:
+    """Print a scaled-up estimate with its confidence interval."""
+    if percent:
+        values = [estimate[k] * 100 for k in ("estimate", "ci_lower", "ci_upper")]
+        print(
+            f"   - {label}: {values[0]:.2f}% (95% CI {values[1]:.2f}-{values[2]:.2f}%)"
+        )
+    else:
+        values = [estimate[k] for k in ("estimate", "ci_lower", "ci_upper")]
+        print(
+            f"   - {label}: ~{values[0]:,.0f} (95% CI {values[1]:,.0f}-{values[2]:,.0f})"
+        )
+
+
+def run_sampled(data_dir: str, fraction: float, seed: int = None) -> None:
+    """
+    SAMPLED REPORT: key metrics on a clinic-stratified patient sample.
+
+    Patients are sampled from patients.csv first; only the sampled patients'
+    rows are then loaded (fact_patient_day from the column store when the
+    default data directory is used).
+    """
+    from metrics.active_days import (
+        get_active_rate_by_clinic,
+        get_patient_active_distribution,
+    )
+    from metrics.context import period_activity
+    from metrics.overall import get_billable_patients, get_high_fall_risk_patients
+    from metrics.sampling import (
+        estimate_ratio,
+        estimate_total,
+        stratified_patient_sample,
+    )
+
+    patients = pd.read_csv(os.path.join(data_dir, "patients.csv"))
+    design = stratified_patient_sample(patients, fraction, seed=seed)
+    # The column store is written from the default data directory's tables
+    tables = load_report_tables(
+        data_dir,
+        patient_ids=design["patient_ids"],
+        column_store_dir=COLUMN_STORE_DIR if data_dir == DATA_DIR else None,
+    )
+    fact_patient_day = tables["fact_patient_day"]
+
+    print_header(f"SAMPLED REPORT ({fraction:.0%} of patients, stratified by clinic)")
+    print(
+        f"\nSampled {len(design['patient_ids']):,} of "
+        f"{int(design['strata_df']['population'].sum()):,} patients"
+    )
+
+    # 1. Billable patients december 2025
+    december = get_patient_active_distribution(
+        fact_patient_day, "2025-12-01", "2026-01-01"
+    )["distribution_df"].set_index("patient_id")["active_days"]
+    billable = get_billable_patients(fact_patient_day, "2025-12-01", "2026-01-01")
+    is_billable = pd.Series(1, index=billable["billable_patient_ids"])
+    in_period = pd.Series(1, index=december.index)
+    print("\n1. Patients Billable in Last Month (December 2025):")
+    print_estimate("Billable Patients", estimate_total(is_billable, design))
+    print_estimate("Patients in Period", estimate_total(in_period, design))
+    print_estimate(
+        "Billable Rate", estimate_ratio(is_billable, in_period, design), percent=True
+    )
+
+    # 2. Active patients and active days rate
+    active_days = get_patient_active_distribution(fact_patient_day)["distribution_df"]
+    active_days = active_days.set_index("patient_id")["active_days"]
+    patient_days = period_activity(fact_patient_day, DATE_START, DATE_END)
+    patient_days = patient_days.groupby("patient_id").size()
+    print("\n2. Active Patients in Last 30 days:")
+    print_estimate(
+        "Active Patients", estimate_total((active_days > 0).astype(int), design)
+    )
+    print_estimate(
+        "Active Days Rate",
+        estimate_ratio(active_days, patient_days, design),
+        percent=True,
+    )
+
+    # 3. High fall risk patients
+    fall_risk = get_high_fall_risk_patients(fact_patient_day)
+    is_high_risk = pd.Series(1, index=fall_risk["high_risk_patient_ids"])
+    print("\n3. Patients with Fall Risk Score >= 70 (Last 7 Days):")
+    print_estimate("High Fall Risk Patients", estimate_total(is_high_risk, design))
+
+    # 4. Active days rate by clinic (clinics are the strata)
+    clinic_rates = get_active_rate_by_clinic(fact_patient_day, tables["clinics"])
+    patient_clinic = design["sample_df"].set_index("patient_id")["stratum"]
+    print("\n4. Active Days Rate by Clinic:")
+    for _, row in clinic_rates.iterrows():
+        in_clinic = patient_clinic[patient_clinic == row["clinic_id"]].index
+        estimate = estimate_ratio(
+            active_days.reindex(in_clinic).dropna(),
+            patient_days.reindex(in_clinic).dropna(),
+            design,
+        )
+        print_estimate(row["clinic_name"], estimate, percent=True)
+
+
+SECTION_RUNNERS = {
+    "overall": run_overall,
+    "kpis": run_kpis,
+    "active-days": run_active_days,
+    "funnel": run_funnel,
+    "dropoff": run_dropoff,
+}
+
+
+def parse_args(argv: list = None) -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Run the RTM metrics report.")
+    parser.add_argument(
+        "sections",
+        nargs="*",
+        metavar="SECTION",
+        help=f"sections to run, any of: {', '.join(SECTIONS)} "
+        f"(default: {' '.join(DEFAULT_SECTIONS)})",
+    )
+    parser.add_argument(
+        "--no-plots",
+        action="store_true",
+        help="skip all charts (matplotlib is never imported)",
+    )
+    parser.add_argument(
+        "--no-show",
+        action="store_true",
+        help="save charts without opening a window",
+    )
+    parser.add_argument(
+        "--data-dir",
+        default=DATA_DIR,
+        help=f"directory with the cleaned CSV tables (default: {DATA_DIR})",
+    )
+    parser.add_argument(
+        "--sample",
+        type=float,
+        metavar="FRACTION",
+        help="fast approximate report on a clinic-stratified patient sample "
+        "(e.g. 0.1); counts are scaled up with 95%% confidence intervals",
+    )
+    parser.add_argument(
+        "--seed", type=int, default=None, help="random seed for --sample"
+    )
+    args = parser.parse_args(argv)
+
+    if args.sample is not None and not 0 < args.sample <= 1:
+        parser.error("--sample must be a fraction in (0, 1]")
+    if args.sample is not None and args.sections:
+        parser.error("--sample runs its own set of metrics; drop the section names")
+
+    unknown = [section for section in args.sections if section not in SECTIONS]
+    if unknown:
+        parser.error(
+            f"unknown section(s): {', '.join(unknown)} (choose from {', '.join(SECTIONS)})"
+        )
+
+    return args
+
+
+def main(argv: list = None):
+    args = parse_args(argv)
+    sections = args.sections or DEFAULT_SECTIONS
+
+    if args.sample is not None:
+        run_sampled(args.data_dir, args.sample, args.seed)
+        print("\n" + "=" * 60)
+        print("REPORT COMPLETE")
+        print("=" * 60)
+        return
+
+    # Load cleaned data
+    tables = load_report_tables(args.data_dir)
+
+    # Sections share period slices and per-patient counts within this run
+    with run_context():
+        for section in SECTIONS:
+            if section in sections:
+                SECTION_RUNNERS[section](
+                    tables, plots=not args.no_plots, show_plots=not args.no_show
+                )
 
     print("\n" + "=" * 60)
     print("REPORT COMPLETE")
@@ -0,0 +1,304 @@
+"""Notebook-friendly session over one RTM data directory.
+
+Usage:
+    from session import RTMSession
+
+    rtm = RTMSession()                      # nothing is loaded yet
+    rtm.billable_patients()                 # loads tables, slices the period
+    rtm.active_patients()                   # reuses the same period slice
+    rtm.patient_active_distribution()       # ...and the per-patient counts
+    rtm.invalidate("tables")                # re-read the CSVs on next access
+
+Tables and derived frames are cached properties: computed on first access
+and kept until invalidate() drops them. Metric methods call the existing
+metric functions inside the session's own RunContext, which lives as long
+as the session, so intermediates shared between metrics (period slices,
+active-day rows, active days per patient) are computed once per session
+rather than once per call.
+"""
+
+from functools import cached_property
+
+import pandas as pd
+
+from config import ANALYSIS_DATE, DATA_DIR, DATE_END, DATE_START
+from metrics.context import (
+    RunContext,
+    active_day_rows,
+    active_days_per_patient,
+    period_activity,
+    run_context,
+)
+from storage.tables import load_report_tables
+
+# Cached table properties (read from "tables")
+TABLES = ["fact_patient_day", "patients", "clinics", "providers", "alerts"]
+
+# Cached properties that depend only on the loaded tables
+DERIVED = TABLES + [
+    "period",
+    "period_active_rows",
+    "period_active_days",
+    "patient_features",
+]
+
+
+class RTMSession:
+    """Lazily loaded tables, memoized derived frames and metric methods."""
+
+    def __init__(
+        self,
+        data_dir: str = DATA_DIR,
+        start_date: str = DATE_START,
+        end_date: str = DATE_END,
+        analysis_date: pd.Timestamp = ANALYSIS_DATE,
+    ):
+        self.data_dir = data_dir
+        self.start_date = start_date
+        self.end_date = end_date
+        self.analysis_date = analysis_date
+        self.context = RunContext()
+
+    def __repr__(self) -> str:
+        loaded = [name for name in ["tables"] + DERIVED if name in self.__dict__]
+        return (
+            f"RTMSession({self.data_dir!r}, {self.start_date} to {self.end_date}, "
+            f"cached: {', '.join(loaded) or 'nothing'})"
+        )
+
+    # =========================================================================
+    # Tables and derived frames
+    # =========================================================================
+
+    @cached_property
+    def tables(self) -> dict:
+        """All cleaned tables, with the report's date columns converted."""
+        return load_report_tables(self.data_dir)
+
+    @cached_property
+    def fact_patient_day(self) -> pd.DataFrame:
+        return self.tables["fact_patient_day"]
+
+    @cached_property
+    def patients(self) -> pd.DataFrame:
+        return self.tables["patients"]
+
+    @cached_property
+    def clinics(self) -> pd.DataFrame:
+        return self.tables.get("clinics")
+
+    @cached_property
+    def providers(self) -> pd.DataFrame:
+        return self.tables.get("providers")
+
+    @cached_property
+    def alerts(self) -> pd.DataFrame:
+        return self.tables.get("alerts")
+
+    @cached_property
+    def period(self) -> pd.DataFrame:
+        """fact_patient_day rows with start_date <= date < end_date."""
+        with run_context(self.context):
+            return period_activity(
+                self.fact_patient_day, self.start_date, self.end_date
+            )
+
+    @cached_property
+    def period_active_rows(self) -> pd.DataFrame:
+        """Active-day rows of the period."""
+        with run_context(self.context):
+            return active_day_rows(self.period)
+
+    @cached_property
+    def period_active_days(self) -> pd.Series:
+        """Active days per patient in the period (patients with >= 1 only)."""
+        with run_context(self.context):
+            return active_days_per_patient(self.period)
+
+    @cached_property
+    def patient_features(self) -> pd.DataFrame:
+        """Per-patient feature table as of analysis_date, with window columns."""
+        from storage.patient_features import (
+            add_window_features,
+            build_patient_features,
+        )
+
+        features = build_patient_features(
+            self.patients, self.fact_patient_day, self.analysis_date
+        )
+        return add_window_features(features)
+
+    def invalidate(self, *names: str) -> None:
+        """
+        Drop cached properties so they are recomputed on next access.
+
+        With no names everything is dropped. Dropping "tables" (or a table)
+        re-reads all tables and also drops every derived frame and the shared
+        intermediates. Dropping "period" also drops the period slices kept in
+        the run context.
+        """
+        if not names or any(name in ["tables"] + TABLES for name in names):
+            names = ["tables"] + DERIVED
+            self.context.clear()
+        elif "period" in names:
+            names = list(names) + ["period_active_rows", "period_active_days"]
+            self.context.discard(operation="period_activity")
+        for name in names:
+            self.__dict__.pop(name, None)
+
+    def set_period(self, start_date: str, end_date: str) -> None:
+        """Change the default period and drop the frames derived from it."""
+        self.start_date, self.end_date = start_date, end_date
+        self.invalidate("period")
+
+    def _run(self, func, *args, **kwargs):
+        """Call a metric function inside the session's run context."""
+        with run_context(self.context):
+            return func(*args, **kwargs)
+
+    def _period(self, start_date, end_date) -> tuple:
+        return (start_date or self.start_date, end_date or self.end_date)
+
+    # =========================================================================
+    # Metrics
+    # =========================================================================
+
+    def patient_count(self) -> int:
+        from metrics.overall import get_patient_count
+
+        return get_patient_count(self.patients)
+
+    def billable_patients(self, start_date=None, end_date=None, **kwargs) -> dict:
+        from metrics.overall import get_billable_patients
+
+        return self._run(
+            get_billable_patients,
+            self.fact_patient_day,
+            *self._period(start_date, end_date),
+            **kwargs,
+        )
+
+    def active_patients(self, start_date=None, end_date=None, **kwargs) -> dict:
+        from metrics.overall import get_active_patients
+
+        return self._run(
+            get_active_patients,
+            self.fact_patient_day,
+            *self._period(start_date, end_date),
+            **kwargs,
+        )
+
+    def high_fall_risk_patients(self, **kwargs) -> dict:
+        from metrics.overall import get_high_fall_risk_patients
+
+        kwargs.setdefault("analysis_date", self.analysis_date)
+        return self._run(get_high_fall_risk_patients, self.fact_patient_day, **kwargs)
+
+    def total_active_rate(self, start_date=None, end_date=None) -> dict:
+        from metrics.active_days import get_total_active_rate
+
+        return self._run(
+            get_total_active_rate,
+            self.fact_patient_day,
+            *self._period(start_date, end_date),
+        )
+
+    def active_rate_by_clinic(self, start_date=None, end_date=None) -> pd.DataFrame:
+        from metrics.active_days import get_active_rate_by_clinic
+
+        return self._run(
+            get_active_rate_by_clinic,
+            self.fact_patient_day,
+            self.clinics,
+            *self._period(start_date, end_date),
+        )
+
+    def patient_active_distribution(
+        self, start_date=None, end_date=None, **kwargs
+    ) -> dict:
+        from metrics.active_days import get_patient_active_distribution
+
+        return self._run(
+            get_patient_active_distribution,
+            self.fact_patient_day,
+            *self._period(start_date, end_date),
+            **kwargs,
+        )
+
+    def active_rate_by_day_since_enrollment(self, **kwargs) -> dict:
+        from metrics.active_days import get_active_rate_by_day_since_enrollment
+
+        return self._run(
+            get_active_rate_by_day_since_enrollment,
+            self.patients,
+            self.fact_patient_day,
+            **kwargs,
+        )
+
+    def active_users_biweekly(self, **kwargs) -> pd.DataFrame:
+        from metrics.kpis import get_active_users_biweekly
+
+        return self._run(get_active_users_biweekly, self.fact_patient_day, **kwargs)
+
+    def enrollments_biweekly(self) -> pd.DataFrame:
+        from metrics.kpis import get_enrollments_biweekly
+
+        return self._run(get_enrollments_biweekly, self.patients)
+
+    def patient_funnel(self, **kwargs) -> dict:
+        from metrics.onboarding_funnel import get_patient_funnel
+
+        return self._run(
+            get_patient_funnel, self.patients, self.fact_patient_day, **kwargs
+        )
+
+    def provider_caseload(self, start_date=None, end_date=None, **kwargs):
+        from metrics.providers import get_provider_caseload
+
+        return self._run(
+            get_provider_caseload,
+            self.fact_patient_day,
+            self.patients,
+            self.providers,
+            self.alerts,
+            *self._period(start_date, end_date),
+            **kwargs,
+        )
+
+    def engagement_survival(self, by: str = None, **kwargs) -> dict:
+        from metrics.survival import get_engagement_survival
+
+        kwargs.setdefault("analysis_date", self.analysis_date)
+        return self._run(
+            get_engagement_survival,
+            self.patients,
+            self.fact_patient_day,
+            by,
+            **kwargs,
+        )
+
+    def activity_streaks(self, **kwargs) -> dict:
+        from metrics.streaks import get_activity_streaks
+
+        return self._run(get_activity_streaks, self.fact_patient_day, **kwargs)
+
+    def anomalies(self, **kwargs) -> pd.DataFrame:
+        from metrics.anomalies import detect_anomalies
+
+        return self._run(detect_anomalies, self.fact_patient_day, **kwargs)
+
+    def clinic_bootstrap_cis(self, start_date=None, end_date=None, **kwargs) -> dict:
+        from metrics.bootstrap import get_clinic_bootstrap_cis
+
+        return self._run(
+            get_clinic_bootstrap_cis,
+            self.fact_patient_day,
+            self.clinics,
+            *self._period(start_date, end_date),
+            **kwargs,
+        )
+
+    def risk_ranking(self, k: int = 20, by: str = "clinic_id", **kwargs):
+        from metrics.risk_ranking import rank_patients
+
+        return rank_patients(self.patient_features, k, by, **kwargs)
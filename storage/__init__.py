@@ -0,0 +1,28 @@
+"""Storage module for RTM analysis."""
+
+from .column_store import (
+    write_column_store,
+    open_column_store,
+    load_fact_patient_day,
+)
+from .patient_features import (
+    build_patient_features,
+    update_patient_features,
+    refresh_patients,
+    apply_ingestion_delta,
+    add_window_features,
+    save_patient_features,
+    load_patient_features,
+)
+from .ingestion import (
+    ingest_raw_data,
+    detect_changes,
+    print_changes,
+    filter_patients,
+)
+from .partitions import (
+    write_partitioned_dataset,
+    load_partitioned,
+    select_partitions,
+)
+from .tables import load_report_tables
@@ -0,0 +1,178 @@
+"""Memory-mapped NumPy column store for RTM tables.
+
+Each column is saved as its own ``.npy`` file:
+    - ID columns (patient_id, clinic_id, ...) are dictionary-encoded as
+      integer codes, with the dictionary kept in ``dictionaries.json``
+    - date columns are stored as epoch-day integers
+    - numeric columns are stored as-is
+
+Opening a store maps the files with ``np.memmap`` (via ``np.load``), so many
+processes reading the same store share the same page-cache pages instead of
+each holding a private copy of ``fact_patient_day``.
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from config import COLUMN_STORE_DIR
+
+META_FILENAME = "meta.json"
+DICTIONARIES_FILENAME = "dictionaries.json"
+
+FACT_ID_COLUMNS = ["patient_id", "clinic_id"]
+FACT_DATE_COLUMNS = ["date"]
+
+EPOCH = pd.Timestamp("1970-01-01")
+
+
+def _codes_dtype(n_categories: int) -> np.dtype:
+    """Smallest signed integer dtype pandas uses for categorical codes."""
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_categories < np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+def write_column_store(
+    frame: pd.DataFrame,
+    store_dir: str,
+    id_columns: list = None,
+    date_columns: list = None,
+    dictionaries: dict = None,
+) -> str:
+    """
+    Write a DataFrame as a column store (one .npy file per column).
+
+    Args:
+        frame: DataFrame to store
+        store_dir: directory to write the store into
+        id_columns: columns to dictionary-encode (default: ID columns of fact_patient_day)
+        date_columns: columns to store as epoch-day integers (default: ["date"])
+        dictionaries: optional fixed dictionaries {column: list of values}, used
+            when several stores must share the same codes
+
+    frame.attrs (JSON-serializable values) are kept in meta.json and restored
+    by open_column_store.
+
+    Returns:
+        Path to the store directory
+    """
+    id_columns = FACT_ID_COLUMNS if id_columns is None else id_columns
+    date_columns = FACT_DATE_COLUMNS if date_columns is None else date_columns
+    dictionaries = dict(dictionaries or {})
+
+    os.makedirs(store_dir, exist_ok=True)
+
+    columns = {}
+    for col in frame.columns:
+        values = frame[col]
+
+        if col in id_columns:
+            # Dictionary-encode IDs: codes on disk, values in dictionaries.json
+            if col in dictionaries:
+                categories = pd.Index(dictionaries[col])
+                codes = categories.get_indexer(values)
+            else:
+                codes, categories = pd.factorize(values, sort=True)
+            array = codes.astype(_codes_dtype(len(categories)))
+            dictionaries[col] = categories.tolist()
+            encoding = "dictionary"
+        elif col in date_columns:
+            # Dates as days since 1970-01-01 (missing dates -> INT32 min)
+            dates = pd.to_datetime(values)
+            days = (dates - EPOCH).dt.days
+            array = days.fillna(np.iinfo(np.int32).min).to_numpy(dtype=np.int32)
+            encoding = "epoch_day"
+        else:
+            array = values.to_numpy()
+            if array.dtype == object:
+                raise TypeError(
+                    f"Column '{col}' is not numeric; add it to id_columns to store it"
+                )
+            encoding = "plain"
+
+        np.save(os.path.join(store_dir, f"{col}.npy"), array)
+        columns[col] = {"encoding": encoding, "dtype": str(array.dtype)}
+
+    with open(os.path.join(store_dir, DICTIONARIES_FILENAME), "w") as f:
+        json.dump({col: dictionaries[col] for col in id_columns if col in dictionaries}, f)
+
+    with open(os.path.join(store_dir, META_FILENAME), "w") as f:
+        json.dump(
+            {"n_rows": len(frame), "columns": columns, "attrs": frame.attrs},
+            f,
+            indent=2,
+            default=str,
+        )
+
+    return store_dir
+
+
+def read_store_meta(store_dir: str) -> dict:
+    """Read the metadata and dictionaries of a column store."""
+    with open(os.path.join(store_dir, META_FILENAME)) as f:
+        meta = json.load(f)
+    with open(os.path.join(store_dir, DICTIONARIES_FILENAME)) as f:
+        meta["dictionaries"] = json.load(f)
+    return meta
+
+
+def open_column_store(
+    store_dir: str,
+    columns: list = None,
+    decode_dates: bool = True,
+    rows: np.ndarray = None,
+) -> pd.DataFrame:
+    """
+    Open a column store as a DataFrame backed by memory-mapped arrays.
+
+    ID columns come back as categoricals whose codes point straight at the
+    mapped file, numeric columns are the mapped arrays themselves, so opening
+    the store costs almost nothing and pages are shared between processes.
+    Date columns are decoded to datetime64 (one copy) unless decode_dates=False,
+    in which case the raw epoch-day integers are returned.
+
+    Args:
+        store_dir: directory written by write_column_store
+        columns: subset of columns to open (default: all)
+        decode_dates: whether to convert epoch days to datetime64
+        rows: row positions to read (default: all rows, memory-mapped);
+            selected rows are copied into memory
+
+    Returns:
+        DataFrame with the same columns and dtypes the metrics expect
+    """
+    meta = read_store_meta(store_dir)
+    columns = list(meta["columns"]) if columns is None else columns
+
+    data = {}
+    for col in columns:
+        array = np.load(os.path.join(store_dir, f"{col}.npy"), mmap_mode="r")
+        if rows is not None:
+            array = array[rows]
+        encoding = meta["columns"][col]["encoding"]
+
+        if encoding == "dictionary":
+            categories = pd.Index(meta["dictionaries"][col])
+            data[col] = pd.Categorical.from_codes(array, categories=categories)
+        elif encoding == "epoch_day" and decode_dates:
+            dates = (array.astype(np.int64) * 86400).astype("datetime64[s]")
+            dates[array == np.iinfo(np.int32).min] = np.datetime64("NaT")
+            data[col] = dates.astype("datetime64[ns]")
+        else:
+            data[col] = array
+
+    frame = pd.DataFrame(data, copy=False)
+    frame.attrs.update(meta.get("attrs", {}))
+    return frame
+
+
+def load_fact_patient_day(
+    store_dir: str = COLUMN_STORE_DIR,
+    columns: list = None,
+) -> pd.DataFrame:
+    """Open the fact_patient_day column store (see open_column_store)."""
+    return open_column_store(os.path.join(store_dir, "fact_patient_day"), columns)
@@ -0,0 +1,184 @@
+"""Change detection and delta ingestion for raw data drops.
+
+Each table is split into partitions (by day for dated tables, by clinic for
+the others) and every partition gets a content hash. The hashes are kept in a
+manifest; on the next drop only partitions that were added, changed or
+removed are reported, together with their rows and the affected patient IDs,
+so downstream steps can recompute just those patients.
+
+Partition hashes are order-independent: re-exporting the same rows in a
+different order does not count as a change.
+"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from config import INGESTION_MANIFEST_PATH, load_tables
+
+# Partition column and granularity per table ("D" = day, None = raw value)
+PARTITION_KEYS = {
+    "fact_patient_day": ("date", "D"),
+    "alerts": ("created_ts", "D"),
+    "assessment_assignments": ("assigned_ts", "D"),
+    "rtm_monthly": ("month", None),
+    "patients": ("clinic_id", None),
+    "providers": ("clinic_id", None),
+    "clinics": ("clinic_id", None),
+}
+
+MISSING_PARTITION = "__missing__"
+
+
+def partition_labels(table: pd.DataFrame, column: str, freq: str = None) -> pd.Series:
+    """Partition label per row (date period as string, or the raw value)."""
+    values = table[column]
+    if freq is not None:
+        labels = pd.to_datetime(values, errors="coerce").dt.to_period(freq).astype(str)
+        labels = labels.where(values.notna(), MISSING_PARTITION)
+    else:
+        labels = values.astype(str).where(values.notna(), MISSING_PARTITION)
+    return labels.rename("partition")
+
+
+def hash_partitions(table: pd.DataFrame, labels: pd.Series) -> dict:
+    """
+    Content hash per partition.
+
+    Row hashes are sorted within each partition before digesting, so the
+    result doesn't depend on row order.
+
+    Returns:
+        dict mapping partition label to hex digest
+    """
+    row_hashes = pd.util.hash_pandas_object(table, index=False).to_numpy()
+    codes, uniques = pd.factorize(labels)
+    order = np.lexsort((row_hashes, codes))
+    sorted_codes = codes[order]
+    sorted_hashes = row_hashes[order]
+    bounds = np.searchsorted(sorted_codes, np.arange(len(uniques) + 1))
+
+    columns = repr(list(table.columns)).encode()
+    digests = {}
+    for i, label in enumerate(uniques):
+        digest = hashlib.sha1(columns)
+        digest.update(sorted_hashes[bounds[i] : bounds[i + 1]].tobytes())
+        digests[str(label)] = digest.hexdigest()
+    return digests
+
+
+def load_manifest(manifest_path: str = INGESTION_MANIFEST_PATH) -> dict:
+    """Load the partition manifest ({} if there is none yet)."""
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path) as f:
+        return json.load(f)
+
+
+def save_manifest(manifest: dict, manifest_path: str = INGESTION_MANIFEST_PATH) -> None:
+    """Write the partition manifest."""
+    os.makedirs(os.path.dirname(manifest_path) or ".", exist_ok=True)
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+
+def detect_changes(tables: dict, manifest: dict) -> dict:
+    """
+    Compare tables against a manifest, partition by partition.
+
+    Tables without a partition key are hashed as a single partition.
+
+    Returns dict with:
+        - tables: {table name: {"added", "changed", "removed": partition lists,
+          "rows": DataFrame of rows in added/changed partitions}}; rows of
+          a changed partition include the ones that were there before
+          (storage.patient_features.apply_ingestion_delta accounts for this)
+        - affected_patient_ids: sorted patient IDs in added/changed rows
+        - manifest: the new manifest to save once the delta is processed
+    """
+    changes = {}
+    new_manifest = {}
+    affected = set()
+
+    for name, table in tables.items():
+        column, freq = PARTITION_KEYS.get(name, (None, None))
+        if column is None or column not in table.columns:
+            labels = pd.Series("all", index=table.index, name="partition")
+        else:
+            labels = partition_labels(table, column, freq)
+
+        digests = hash_partitions(table, labels)
+        previous = manifest.get(name, {}).get("partitions", {})
+
+        added = sorted(label for label in digests if label not in previous)
+        changed = sorted(
+            label
+            for label in digests
+            if label in previous and previous[label] != digests[label]
+        )
+        removed = sorted(label for label in previous if label not in digests)
+
+        rows = table[labels.isin(added + changed).to_numpy()]
+        if "patient_id" in rows.columns:
+            affected.update(rows["patient_id"].dropna().unique().tolist())
+
+        changes[name] = {
+            "added": added,
+            "changed": changed,
+            "removed": removed,
+            "rows": rows,
+        }
+        new_manifest[name] = {"key": column, "partitions": digests}
+
+    return {
+        "tables": changes,
+        "affected_patient_ids": sorted(affected),
+        "manifest": new_manifest,
+    }
+
+
+def ingest_raw_data(
+    raw_dir: str = "data/raw",
+    manifest_path: str = INGESTION_MANIFEST_PATH,
+    commit: bool = True,
+) -> dict:
+    """
+    Load a raw data drop and report what changed since the last ingestion.
+
+    Args:
+        raw_dir: directory with the raw CSV tables
+        manifest_path: where partition hashes are kept between runs
+        commit: save the new manifest (set False to only inspect the delta)
+
+    Returns the detect_changes() dict plus:
+        - all_tables: the full loaded tables
+    """
+    tables = load_tables(raw_dir)
+    delta = detect_changes(tables, load_manifest(manifest_path))
+    if commit:
+        save_manifest(delta["manifest"], manifest_path)
+    delta["all_tables"] = tables
+    return delta
+
+
+def print_changes(delta: dict) -> None:
+    """Print a short per-table summary of a delta."""
+    print("\nDATA DROP CHANGES")
+    print("-" * 50)
+    for name, change in delta["tables"].items():
+        print(
+            f"{name:<25} +{len(change['added'])} added, "
+            f"~{len(change['changed'])} changed, "
+            f"-{len(change['removed'])} removed partitions "
+            f"({len(change['rows']):,} rows)"
+        )
+    print("-" * 50)
+    print(f"Affected patients: {len(delta['affected_patient_ids']):,}")
+
+
+def filter_patients(table: pd.DataFrame, patient_ids) -> pd.DataFrame:
+    """Rows of a table that belong to the given patients."""
+    return table[table["patient_id"].isin(patient_ids)]
@@ -0,0 +1,236 @@
+"""Month/clinic partitioned archive for fact_patient_day.
+
+Layout:
+    <dataset_dir>/manifest.json
+    <dataset_dir>/month=YYYY-MM/clinic_id=<id>/   (one column store each)
+
+All partitions share one set of dictionaries (kept in the manifest), so ID
+codes mean the same thing everywhere and partitions are concatenated as
+plain integer arrays before a single categorical is built. The manifest
+also keeps each partition's row count and date range, which is all the
+loader needs to skip partitions that cannot match a date or clinic
+predicate, so loading the last 30 days reads the same few partitions no
+matter how much history is archived.
+
+Writing replaces only the partitions present in the frame; new IDs are
+appended to the dictionaries, so existing partitions stay valid. A full
+rewrite (replace=True) drops every existing partition first, so rows that
+are no longer in the frame can't survive in a partition it doesn't touch.
+"""
+
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from config import PARTITIONED_STORE_DIR
+from .column_store import EPOCH, FACT_ID_COLUMNS, write_column_store
+
+MANIFEST_FILENAME = "manifest.json"
+
+MISSING_DAY = np.iinfo(np.int32).min
+
+
+def load_partition_manifest(dataset_dir: str = PARTITIONED_STORE_DIR) -> dict:
+    """Read a dataset manifest (empty manifest if the dataset doesn't exist)."""
+    path = os.path.join(dataset_dir, MANIFEST_FILENAME)
+    if not os.path.exists(path):
+        return {"partition_by": None, "dictionaries": {}, "partitions": {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_partitioned_dataset(
+    frame: pd.DataFrame,
+    dataset_dir: str = PARTITIONED_STORE_DIR,
+    partition_by: str = "clinic_id",
+    date_column: str = "date",
+    id_columns: list = None,
+    replace: bool = False,
+) -> dict:
+    """
+    Write (or update) a month/clinic partitioned dataset.
+
+    Args:
+        frame: DataFrame to store (typically fact_patient_day)
+        dataset_dir: dataset root directory
+        partition_by: second partition column (after month)
+        date_column: date column that defines the month partition
+        id_columns: columns to dictionary-encode (default: patient_id, clinic_id)
+        replace: drop all existing partitions and the manifest first (use when
+            frame is the whole dataset)
+
+    Partitions present in frame are replaced; all others are kept unless
+    replace is set.
+
+    Returns:
+        The updated manifest
+    """
+    id_columns = FACT_ID_COLUMNS if id_columns is None else id_columns
+    if replace and os.path.isdir(dataset_dir):
+        for name in os.listdir(dataset_dir):
+            if name.startswith("month="):
+                shutil.rmtree(os.path.join(dataset_dir, name))
+        manifest_path = os.path.join(dataset_dir, MANIFEST_FILENAME)
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
+    manifest = load_partition_manifest(dataset_dir)
+    if manifest["partition_by"] not in (None, partition_by):
+        raise ValueError(
+            f"Dataset is partitioned by {manifest['partition_by']!r}, not {partition_by!r}"
+        )
+
+    # Extend the shared dictionaries (existing codes never move)
+    encoded = {}
+    dictionaries = manifest["dictionaries"]
+    for col in id_columns:
+        categories = pd.Index(dictionaries.get(col, []))
+        new_values = pd.Index(frame[col].dropna().unique()).difference(categories)
+        categories = categories.append(new_values.sort_values())
+        dictionaries[col] = categories.tolist()
+        encoded[col] = categories.get_indexer(frame[col]).astype(np.int32)
+
+    days = (pd.to_datetime(frame[date_column]) - EPOCH).dt.days
+    days = days.fillna(MISSING_DAY).to_numpy(dtype=np.int32)
+    months = pd.to_datetime(frame[date_column]).dt.strftime("%Y-%m").fillna("missing")
+
+    stored = frame.assign(**encoded)
+    stored[date_column] = days
+
+    groups = pd.DataFrame(
+        {"month": months.to_numpy(), "key": frame[partition_by].astype(str).to_numpy()}
+    )
+    for (month, key), index in groups.groupby(["month", "key"]).indices.items():
+        name = f"month={month}/{partition_by}={key}"
+        part_dir = os.path.join(dataset_dir, name)
+        if os.path.exists(part_dir):
+            shutil.rmtree(part_dir)
+        part = stored.iloc[index]
+        write_column_store(part, part_dir, id_columns=[], date_columns=[])
+
+        part_days = days[index]
+        known = part_days[part_days != MISSING_DAY]
+        manifest["partitions"][name] = {
+            "month": month,
+            partition_by: key,
+            "n_rows": len(index),
+            "min_day": int(known.min()) if len(known) else None,
+            "max_day": int(known.max()) if len(known) else None,
+        }
+
+    manifest.update(
+        {
+            "partition_by": partition_by,
+            "date_column": date_column,
+            "id_columns": id_columns,
+            "columns": list(frame.columns),
+            "dtypes": {col: str(stored[col].to_numpy().dtype) for col in frame.columns},
+            "dictionaries": dictionaries,
+        }
+    )
+    os.makedirs(dataset_dir, exist_ok=True)
+    with open(os.path.join(dataset_dir, MANIFEST_FILENAME), "w") as f:
+        json.dump(manifest, f)
+    return manifest
+
+
+def select_partitions(
+    manifest: dict,
+    start_date=None,
+    end_date=None,
+    partition_values: list = None,
+) -> list:
+    """Partitions whose date range overlaps [start_date, end_date) and whose
+    partition value is in partition_values (None = any)."""
+    start = None if start_date is None else (pd.Timestamp(start_date) - EPOCH).days
+    end = None if end_date is None else (pd.Timestamp(end_date) - EPOCH).days
+    keys = None if partition_values is None else {str(v) for v in partition_values}
+    partition_by = manifest["partition_by"]
+
+    selected = []
+    for name, info in sorted(manifest["partitions"].items()):
+        if keys is not None and info[partition_by] not in keys:
+            continue
+        if info["min_day"] is None:
+            if start is None and end is None:
+                selected.append(name)
+            continue
+        if start is not None and info["max_day"] < start:
+            continue
+        if end is not None and info["min_day"] >= end:
+            continue
+        selected.append(name)
+    return selected
+
+
+def load_partitioned(
+    dataset_dir: str = PARTITIONED_STORE_DIR,
+    start_date=None,
+    end_date=None,
+    clinic_ids: list = None,
+    columns: list = None,
+) -> pd.DataFrame:
+    """
+    Load rows with start_date <= date < end_date for the given clinics,
+    reading only the partitions that can contain them.
+
+    Args:
+        dataset_dir: dataset written by write_partitioned_dataset
+        start_date, end_date: date predicate (None = unbounded)
+        clinic_ids: partition values to keep (None = all)
+        columns: subset of columns (default: all)
+
+    Returns:
+        DataFrame with the same columns and dtypes as load_fact_patient_day;
+        attrs["partitions_read"] holds the number of partitions opened
+    """
+    manifest = load_partition_manifest(dataset_dir)
+    columns = manifest.get("columns", []) if columns is None else columns
+    date_column = manifest.get("date_column", "date")
+    selected = select_partitions(manifest, start_date, end_date, clinic_ids)
+
+    start = None if start_date is None else (pd.Timestamp(start_date) - EPOCH).days
+    end = None if end_date is None else (pd.Timestamp(end_date) - EPOCH).days
+    read_columns = list(dict.fromkeys(columns + [date_column]))
+
+    pieces = {col: [] for col in read_columns}
+    for name in selected:
+        part_dir = os.path.join(dataset_dir, name)
+        arrays = {
+            col: np.load(os.path.join(part_dir, f"{col}.npy"), mmap_mode="r")
+            for col in read_columns
+        }
+        days = arrays[date_column]
+        keep = np.ones(len(days), dtype=bool)
+        if start is not None:
+            keep &= days >= start
+        if end is not None:
+            keep &= days < end
+        if keep.all():
+            keep = slice(None)
+        for col in read_columns:
+            pieces[col].append(arrays[col][keep])
+
+    dtypes = manifest.get("dtypes", {})
+    data = {}
+    for col in columns:
+        values = (
+            np.concatenate(pieces[col])
+            if pieces[col]
+            else np.array([], dtype=dtypes.get(col, np.int32))
+        )
+        if col in manifest.get("id_columns", []):
+            categories = pd.Index(manifest["dictionaries"][col])
+            data[col] = pd.Categorical.from_codes(values, categories=categories)
+        elif col == date_column:
+            dates = (values.astype(np.int64) * 86400).astype("datetime64[s]")
+            dates[values == MISSING_DAY] = np.datetime64("NaT")
+            data[col] = dates.astype("datetime64[ns]")
+        else:
+            data[col] = values
+
+    frame = pd.DataFrame(data, copy=False)
+    frame.attrs["partitions_read"] = len(selected)
+    return frame
@@ -0,0 +1,399 @@
+"""Materialized per-patient feature table, maintained incrementally.
+
+One compactly typed row per patient, built in a single pass over
+fact_patient_day and patients. Patient-level metrics and cohort filters can
+read this ~100k-row table instead of scanning tens of millions of
+patient-days.
+
+Stored columns:
+    - patient_id, clinic_id, provider_id
+    - enrollment_date, first_data_date, last_data_date, last_active_date
+    - days_to_first_data: first_data_date - enrollment_date in days (NaN if missing)
+    - total_days, total_active_days: patient-days and active days to date
+    - active_days_first_30: active days in the first 30 days from enrollment
+    - funnel_stage: highest onboarding funnel stage reached (FUNNEL_STAGES)
+    - active_mask: bit i set = active on as_of_date - i (last 32 days)
+    - high_fall_risk_mask: bit i set = fall_risk_score >= FALL_RISK_THRESHOLD
+      on as_of_date - i
+    - fall_risk_d0 .. fall_risk_dN: fall_risk_score on as_of_date - i for the
+      FALL_RISK_LOOKBACK_DAYS window (NaN if no data)
+
+The as-of date is kept in ``features.attrs["as_of_date"]``. Window counts
+(active days in the last 7/14/30 days, max recent fall risk, days since last
+active) are derived from the masks with add_window_features().
+
+Incremental updates:
+    update_patient_features() takes only patient-day rows it has not seen
+    before, none of them after the new as-of date (by default the as-of date
+    advances to the latest row). Moving the as-of date forward shifts the masks and fall-risk
+    window; new rows are then folded into the additive counters, last dates
+    and windows. Patients whose past rows changed are rebuilt with
+    refresh_patients(). apply_ingestion_delta() does both for a
+    storage.ingestion delta: rows of newly added day partitions are folded
+    in, patients with rows in changed partitions are rebuilt.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    BILLING_THRESHOLD,
+    FALL_RISK_LOOKBACK_DAYS,
+    FALL_RISK_THRESHOLD,
+)
+from .column_store import write_column_store, open_column_store
+from .ingestion import MISSING_PARTITION, partition_labels
+
+PATIENT_FEATURES_DIR = "data/patient_features"
+
+MASK_DAYS = 32
+FALL_RISK_WINDOW_DAYS = FALL_RISK_LOOKBACK_DAYS + 1
+FALL_RISK_COLUMNS = [f"fall_risk_d{i}" for i in range(FALL_RISK_WINDOW_DAYS)]
+
+FUNNEL_STAGES = {
+    0: "none",
+    1: "enrolled",
+    2: "installed",
+    3: "first_data",
+    4: "compliant",
+}
+
+ID_COLUMNS = ["patient_id", "clinic_id", "provider_id"]
+DATE_COLUMNS = ["enrollment_date", "first_data_date", "last_data_date", "last_active_date"]
+
+
+def _empty_features(patients: pd.DataFrame) -> pd.DataFrame:
+    """Feature rows for patients with no patient-days folded in yet."""
+    n = len(patients)
+    features = pd.DataFrame({"patient_id": patients["patient_id"].to_numpy()})
+    for col in ["clinic_id", "provider_id"]:
+        if col in patients.columns:
+            features[col] = patients[col].to_numpy()
+
+    features["enrollment_date"] = pd.to_datetime(patients["enrollment_date"]).to_numpy()
+    features["first_data_date"] = pd.to_datetime(patients["first_data_date"]).to_numpy()
+    features["last_data_date"] = pd.NaT
+    features["last_active_date"] = pd.NaT
+    features["days_to_first_data"] = np.zeros(n, dtype=np.float32)
+    features["total_days"] = np.zeros(n, dtype=np.int32)
+    features["total_active_days"] = np.zeros(n, dtype=np.int32)
+    features["active_days_first_30"] = np.zeros(n, dtype=np.int16)
+    features["funnel_stage"] = np.zeros(n, dtype=np.int8)
+    features["active_mask"] = np.zeros(n, dtype=np.uint32)
+    features["high_fall_risk_mask"] = np.zeros(n, dtype=np.uint32)
+    for col in FALL_RISK_COLUMNS:
+        features[col] = np.full(n, np.nan, dtype=np.float32)
+    return features
+
+
+def _shift_windows(features: pd.DataFrame, days: int) -> None:
+    """Move the rolling windows forward by `days` days (in place)."""
+    if days <= 0:
+        return
+
+    for col in ["active_mask", "high_fall_risk_mask"]:
+        shifted = features[col].to_numpy().astype(np.uint64) << np.uint64(min(days, 63))
+        features[col] = (shifted & np.uint64(0xFFFFFFFF)).astype(np.uint32)
+
+    window = features[FALL_RISK_COLUMNS].to_numpy()
+    moved = np.full_like(window, np.nan)
+    if days < FALL_RISK_WINDOW_DAYS:
+        moved[:, days:] = window[:, : FALL_RISK_WINDOW_DAYS - days]
+    features[FALL_RISK_COLUMNS] = moved
+
+
+def _refresh_patient_columns(features: pd.DataFrame, patients: pd.DataFrame) -> None:
+    """Recompute the patient-table columns and funnel stage (in place)."""
+    info = patients.set_index("patient_id").reindex(features["patient_id"])
+    enrollment = pd.to_datetime(info["enrollment_date"])
+    install = pd.to_datetime(info["install_date"])
+    first_data = pd.to_datetime(info["first_data_date"])
+
+    features["enrollment_date"] = enrollment.to_numpy()
+    features["first_data_date"] = first_data.to_numpy()
+    days_to_first_data = (first_data - enrollment).dt.days.to_numpy(dtype=float)
+    features["days_to_first_data"] = days_to_first_data.astype(np.float32)
+
+    # Highest funnel stage reached (same stage rules as get_patient_funnel)
+    stage = np.zeros(len(features), dtype=np.int8)
+    stage[enrollment.notna().to_numpy()] = 1
+    stage[(stage == 1) & install.notna().to_numpy()] = 2
+    stage[(stage == 2) & (days_to_first_data >= 0) & (days_to_first_data <= 7)] = 3
+    compliant = features["active_days_first_30"].to_numpy() >= BILLING_THRESHOLD
+    stage[(stage >= 1) & compliant] = 4
+    features["funnel_stage"] = stage
+
+
+def update_patient_features(
+    features: pd.DataFrame,
+    new_patient_days: pd.DataFrame,
+    patients: pd.DataFrame,
+    as_of_date: pd.Timestamp = None,
+) -> pd.DataFrame:
+    """
+    Fold new patient-day rows into the feature table.
+
+    Args:
+        features: current feature table (from build/load), not modified
+        new_patient_days: fact_patient_day rows not yet folded in (rows
+            given twice are counted twice; see apply_ingestion_delta)
+        patients: current patients table (new patients are appended)
+        as_of_date: new as-of date (must not move backwards, and must not be
+            before any new row); default: the latest of the table's as-of
+            date and the new rows' dates
+
+    Returns:
+        Updated feature table
+    """
+    previous = features.attrs.get("as_of_date")
+    row_dates = new_patient_days["date"].to_numpy(dtype="datetime64[D]")
+    latest_row = row_dates.max() if np.any(~np.isnat(row_dates)) else None
+    if as_of_date is None:
+        candidates = [
+            np.datetime64(day, "D") for day in (previous, latest_row) if day is not None
+        ]
+        if not candidates:
+            raise ValueError("as_of_date is required when there are no dated rows")
+        as_of_day = max(candidates)
+    else:
+        as_of_day = np.datetime64(pd.Timestamp(as_of_date).normalize(), "D")
+        if latest_row is not None and latest_row > as_of_day:
+            raise ValueError(
+                f"Rows dated up to {latest_row} are after as_of_date {as_of_day}; "
+                "they would never be folded in"
+            )
+    shift = 0
+    if previous is not None:
+        shift = int((as_of_day - np.datetime64(previous, "D")).astype(int))
+        if shift < 0:
+            raise ValueError(
+                f"as_of_date {as_of_day} is before the table's as-of date {previous}"
+            )
+
+    # Start from a writable copy and append patients we haven't seen
+    features = features.copy()
+    for col in ID_COLUMNS:
+        if col in features.columns and isinstance(features[col].dtype, pd.CategoricalDtype):
+            features[col] = features[col].astype(object)
+    new_patients = patients[~patients["patient_id"].isin(features["patient_id"])]
+    if len(new_patients):
+        features = pd.concat([features, _empty_features(new_patients)], ignore_index=True)
+    _shift_windows(features, shift)
+
+    # Fold in the new rows, one vectorized step per feature
+    patient_ids = pd.Index(features["patient_id"])
+    rows = new_patient_days
+    codes = patient_ids.get_indexer(rows["patient_id"])
+    keep = (codes >= 0) & ~np.isnat(row_dates)
+    codes, row_dates = codes[keep], row_dates[keep]
+    active = rows["is_active_day"].to_numpy()[keep] == 1
+    fall_risk = rows["fall_risk_score"].to_numpy(dtype=float)[keep]
+    n = len(features)
+
+    features["total_days"] += np.bincount(codes, minlength=n).astype(np.int32)
+    features["total_active_days"] += np.bincount(codes[active], minlength=n).astype(
+        np.int32
+    )
+
+    for col, mask in [("last_data_date", slice(None)), ("last_active_date", active)]:
+        latest = np.full(n, np.datetime64("NaT"), dtype="datetime64[D]")
+        latest_int = latest.view(np.int64)
+        np.maximum.at(latest_int, codes[mask], row_dates[mask].view(np.int64))
+        current = features[col].to_numpy(dtype="datetime64[D]")
+        features[col] = np.fmax(current, latest).astype("datetime64[ns]")
+
+    enrollment = features["enrollment_date"].to_numpy(dtype="datetime64[D]")
+    since_enrollment = (row_dates - enrollment[codes]).astype(float)
+    in_first_30 = active & (since_enrollment >= 0) & (since_enrollment < 30)
+    features["active_days_first_30"] += np.bincount(
+        codes[in_first_30], minlength=n
+    ).astype(np.int16)
+
+    age = (as_of_day - row_dates).astype(int)
+    in_mask = age < MASK_DAYS
+    for col, flag in [
+        ("active_mask", active),
+        ("high_fall_risk_mask", fall_risk >= FALL_RISK_THRESHOLD),
+    ]:
+        mask = features[col].to_numpy().copy()
+        hits = in_mask & flag
+        np.bitwise_or.at(mask, codes[hits], (np.uint32(1) << age[hits].astype(np.uint32)))
+        features[col] = mask
+
+    window = features[FALL_RISK_COLUMNS].to_numpy().copy()
+    in_window = age < FALL_RISK_WINDOW_DAYS
+    window[codes[in_window], age[in_window]] = fall_risk[in_window]
+    features[FALL_RISK_COLUMNS] = window
+
+    _refresh_patient_columns(features, patients)
+    features.attrs["as_of_date"] = str(as_of_day)
+    return features
+
+
+def build_patient_features(
+    patients: pd.DataFrame,
+    fact_patient_day: pd.DataFrame,
+    as_of_date: pd.Timestamp = None,
+) -> pd.DataFrame:
+    """
+    Build the feature table from scratch in a single pass.
+
+    With as_of_date, only rows up to that date are used (a point-in-time
+    table); by default the as-of date is the latest date in fact_patient_day.
+    """
+    features = _empty_features(patients)
+    if as_of_date is not None:
+        as_of_date = pd.Timestamp(as_of_date).normalize()
+        fact_patient_day = fact_patient_day[
+            (fact_patient_day["date"] < as_of_date + pd.Timedelta(days=1)).to_numpy()
+        ]
+    return update_patient_features(features, fact_patient_day, patients, as_of_date)
+
+
+def refresh_patients(
+    features: pd.DataFrame,
+    fact_patient_day: pd.DataFrame,
+    patients: pd.DataFrame,
+    patient_ids,
+) -> pd.DataFrame:
+    """
+    Rebuild the rows of some patients from their full history.
+
+    Use this for patients whose past rows changed (e.g. the
+    affected_patient_ids of a data drop); unchanged patients are kept as-is.
+
+    Returns:
+        Updated feature table (same as-of date)
+    """
+    as_of_date = pd.Timestamp(features.attrs["as_of_date"])
+    selected = patients["patient_id"].isin(patient_ids)
+    rebuilt = build_patient_features(
+        patients[selected],
+        fact_patient_day[fact_patient_day["patient_id"].isin(patient_ids)],
+        as_of_date,
+    )
+
+    kept = features[~features["patient_id"].isin(patient_ids)]
+    result = pd.concat(
+        [kept.astype({col: object for col in ID_COLUMNS if col in kept.columns}), rebuilt],
+        ignore_index=True,
+    )
+    result.attrs["as_of_date"] = features.attrs["as_of_date"]
+    return result
+
+
+def apply_ingestion_delta(
+    features: pd.DataFrame,
+    delta: dict,
+    fact_patient_day: pd.DataFrame,
+    patients: pd.DataFrame,
+    as_of_date: pd.Timestamp = None,
+) -> pd.DataFrame:
+    """
+    Bring the feature table up to date with a detect_changes() delta.
+
+    The feature table must match the manifest the delta was computed
+    against. Days in added partitions have never been folded in, so their
+    rows are added; rows of changed partitions were (partly) folded in
+    already, so those patients are rebuilt from their full history instead.
+    Removed day partitions can't be traced to patients and trigger a full
+    rebuild.
+
+    Args:
+        features: current feature table
+        delta: result of storage.ingestion.detect_changes
+        fact_patient_day: full fact_patient_day after the drop
+        patients: full patients table after the drop
+        as_of_date: new as-of date (default: the latest date in
+            fact_patient_day); no added or changed day may be after it
+
+    Returns:
+        Updated feature table
+    """
+    change = delta["tables"]["fact_patient_day"]
+    if as_of_date is None:
+        as_of_date = fact_patient_day["date"].max()
+        if "as_of_date" in features.attrs:
+            as_of_date = max(as_of_date, pd.Timestamp(features.attrs["as_of_date"]))
+    as_of_label = pd.Timestamp(as_of_date).strftime("%Y-%m-%d")
+    late = [
+        label
+        for label in change["added"] + change["changed"]
+        if label != MISSING_PARTITION and label > as_of_label
+    ]
+    if late:
+        raise ValueError(
+            f"{len(late)} changed day(s) after as_of_date {as_of_label} "
+            f"(latest {max(late)}) would not be folded in"
+        )
+    if change["removed"]:
+        return build_patient_features(patients, fact_patient_day, as_of_date)
+
+    labels = partition_labels(fact_patient_day, "date", "D")
+    changed = fact_patient_day[labels.isin(change["changed"]).to_numpy()]
+    refreshed = changed["patient_id"].dropna().unique()
+    added = fact_patient_day[
+        labels.isin(change["added"]).to_numpy()
+        & ~fact_patient_day["patient_id"].isin(refreshed).to_numpy()
+    ]
+
+    features = update_patient_features(features, added, patients, as_of_date)
+    if len(refreshed):
+        features = refresh_patients(features, fact_patient_day, patients, refreshed)
+    return features
+
+
+def _popcount_window(mask: np.ndarray, days: int) -> np.ndarray:
+    """Number of set bits among the lowest `days` bits."""
+    window = mask & np.uint32((1 << days) - 1 if days < 32 else 0xFFFFFFFF)
+    return np.bitwise_count(window).astype(np.int16)
+
+
+def add_window_features(features: pd.DataFrame, windows: tuple = (7, 14, 30)) -> pd.DataFrame:
+    """
+    Add derived window columns to a feature table.
+
+    Adds:
+        - active_days_<N>: active days in the last N days (N <= 32)
+        - max_fall_risk_recent: max fall_risk_score in the lookback window
+        - high_fall_risk_recent: any fall_risk_score >= threshold in the lookback window
+        - days_since_last_active: as_of_date - last_active_date (KPI 4)
+    """
+    result = features.copy()
+    mask = result["active_mask"].to_numpy()
+    for days in windows:
+        result[f"active_days_{days}"] = _popcount_window(mask, days)
+
+    result["max_fall_risk_recent"] = np.nanmax(
+        result[FALL_RISK_COLUMNS].to_numpy(), axis=1, initial=-np.inf
+    )
+    result.loc[np.isinf(result["max_fall_risk_recent"]), "max_fall_risk_recent"] = np.nan
+    result["high_fall_risk_recent"] = (
+        _popcount_window(result["high_fall_risk_mask"].to_numpy(), FALL_RISK_WINDOW_DAYS)
+        > 0
+    )
+
+    as_of = pd.Timestamp(result.attrs["as_of_date"])
+    result["days_since_last_active"] = (as_of - result["last_active_date"]).dt.days
+    return result
+
+
+def save_patient_features(
+    features: pd.DataFrame, store_dir: str = PATIENT_FEATURES_DIR
+) -> str:
+    """Persist the feature table as a column store."""
+    return write_column_store(
+        features,
+        store_dir,
+        id_columns=[col for col in ID_COLUMNS if col in features.columns],
+        date_columns=DATE_COLUMNS,
+    )
+
+
+def load_patient_features(store_dir: str = PATIENT_FEATURES_DIR) -> pd.DataFrame:
+    """Open a persisted feature table (memory-mapped)."""
+    if not os.path.isdir(store_dir):
+        raise FileNotFoundError(f"No patient feature table at {store_dir}")
+    return open_column_store(store_dir)
@@ -0,0 +1,88 @@
+"""Cleaned table loading for the report, the session and the CLI."""
+
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from config import DATA_DIR, load_tables
+from .column_store import open_column_store
+
+# Date columns the metrics expect as datetime64, per table
+REPORT_DATE_COLUMNS = {
+    "fact_patient_day": ["date"],
+    "patients": ["enrollment_date", "install_date", "first_data_date"],
+}
+
+CSV_CHUNK_ROWS = 1_000_000
+
+
+def convert_report_dates(tables: dict) -> dict:
+    """Convert the report's date columns to datetime (in place)."""
+    for name, columns in REPORT_DATE_COLUMNS.items():
+        if name in tables:
+            for col in columns:
+                tables[name][col] = pd.to_datetime(tables[name][col])
+    return tables
+
+
+def _read_patient_rows(path: Path, patient_ids: pd.Index) -> pd.DataFrame:
+    """Rows of a CSV that belong to the given patients, read in chunks."""
+    chunks = [
+        (
+            chunk[chunk["patient_id"].isin(patient_ids)]
+            if "patient_id" in chunk.columns
+            else chunk
+        )
+        for chunk in pd.read_csv(path, chunksize=CSV_CHUNK_ROWS)
+    ]
+    return pd.concat(chunks, ignore_index=True)
+
+
+def _read_store_patient_rows(store_dir: str, patient_ids: pd.Index) -> pd.DataFrame:
+    """Rows of a column store that belong to the given patients."""
+    codes = open_column_store(store_dir, ["patient_id"])["patient_id"].cat
+    wanted = codes.categories.get_indexer(patient_ids)
+    rows = np.flatnonzero(np.isin(codes.codes, wanted[wanted >= 0]))
+    frame = open_column_store(store_dir, rows=rows)
+    for col in frame.columns:
+        if isinstance(frame[col].dtype, pd.CategoricalDtype):
+            frame[col] = frame[col].astype(frame[col].cat.categories.dtype)
+    return frame
+
+
+def load_report_tables(
+    data_dir: str = DATA_DIR,
+    patient_ids=None,
+    column_store_dir: str = None,
+) -> dict:
+    """
+    Load cleaned tables and convert the date columns used by the report.
+
+    Args:
+        data_dir: directory with the cleaned CSV tables
+        patient_ids: only load rows of these patients (tables without a
+            patient_id column are loaded in full)
+        column_store_dir: with patient_ids, read fact_patient_day from the
+            column store here (if it exists) instead of scanning its CSV
+
+    Returns:
+        dict of table name -> DataFrame
+    """
+    if patient_ids is None:
+        return convert_report_dates(load_tables(data_dir))
+
+    patient_ids = pd.Index(patient_ids)
+    store_dir = (
+        os.path.join(column_store_dir, "fact_patient_day") if column_store_dir else None
+    )
+    tables = {}
+    for path in Path(data_dir).iterdir():
+        if not (path.is_file() and path.suffix == ".csv"):
+            continue
+        if path.stem == "fact_patient_day" and store_dir and os.path.isdir(store_dir):
+            tables[path.stem] = _read_store_patient_rows(store_dir, patient_ids)
+        else:
+            tables[path.stem] = _read_patient_rows(path, patient_ids)
+    return convert_report_dates(tables)
@@ -1,7 +1,27 @@
-"""Visualizations module for RTM analysis."""
+"""Visualizations module for RTM analysis.
 
-from .distributions import (
-    plot_active_days_distribution,
-    plot_active_rate_by_day_since_enrollment,
-)
-from .onboarding_funnel import plot_patient_funnel
+Plot functions are imported lazily, so importing this package does not pull
+in matplotlib until a plot is actually requested.
+"""
+
+import importlib
+
+_LAZY_IMPORTS = {
+    "plot_active_days_distribution": ".distributions",
+    "plot_active_rate_by_day_since_enrollment": ".distributions",
+    "plot_patient_funnel": ".onboarding_funnel",
+    "plot_provider_timelines": ".timelines",
+    "chart_digest": ".chart_cache",
+    "is_chart_current": ".chart_cache",
+}
+
+__all__ = list(_LAZY_IMPORTS)
+
+
+def __getattr__(name):
+    if name not in _LAZY_IMPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module = importlib.import_module(_LAZY_IMPORTS[name], __name__)
+    value = getattr(module, name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,46 @@
+"""Skip-if-unchanged support for chart rendering.
+
+Each plot hashes its input data and parameters and stores the digest next to
+the image (``<image>.sha256``). When the digest matches on the next run the
+existing image is already up to date and matplotlib is not touched.
+"""
+
+import hashlib
+import os
+
+import pandas as pd
+
+DIGEST_SUFFIX = ".sha256"
+
+
+def chart_digest(data: pd.DataFrame, **params) -> str:
+    """
+    Hash a plot's input data and parameters.
+
+    Args:
+        data: DataFrame with the columns the plot draws
+        **params: anything else that changes the image (title, thresholds, ...)
+
+    Returns:
+        Hex digest string
+    """
+    digest = hashlib.sha256()
+    digest.update(repr(list(zip(data.columns, data.dtypes.astype(str)))).encode())
+    digest.update(pd.util.hash_pandas_object(data, index=False).to_numpy().tobytes())
+    digest.update(repr(sorted(params.items())).encode())
+    return digest.hexdigest()
+
+
+def is_chart_current(output_path: str, digest: str) -> bool:
+    """Whether output_path exists and was rendered from the same digest."""
+    digest_path = output_path + DIGEST_SUFFIX
+    if not (os.path.exists(output_path) and os.path.exists(digest_path)):
+        return False
+    with open(digest_path) as f:
+        return f.read().strip() == digest
+
+
+def record_chart_digest(output_path: str, digest: str) -> None:
+    """Store the digest of a freshly rendered chart next to the image."""
+    with open(output_path + DIGEST_SUFFIX, "w") as f:
+        f.write(digest)
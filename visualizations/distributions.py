@@ -4,6 +4,7 @@ import os
 import pandas as pd
 import matplotlib.pyplot as plt
 from config import BILLING_THRESHOLD, OUTPUT_DIR
+from .chart_cache import chart_digest, is_chart_current, record_chart_digest
 
 
 def plot_active_days_distribution(
@@ -11,6 +12,7 @@ def plot_active_days_distribution(
     output_filename: str = "patient_active_days_distribution.png",
     title: str = "Patient Active Days Distribution (December 2025)",
     show_plot: bool = True,
+    force: bool = False,
 ) -> str:
     """
     Create histogram of patient active days distribution.
@@ -20,6 +22,7 @@ def plot_active_days_distribution(
         output_filename: filename for saved plot
         title: plot title
         show_plot: whether to display the plot
+        force: re-render even if the saved chart is up to date
 
     Returns:
         Path to saved plot file
@@ -28,6 +31,16 @@ def plot_active_days_distribution(
     os.makedirs(OUTPUT_DIR, exist_ok=True)
     output_path = os.path.join(OUTPUT_DIR, output_filename)
 
+    # Skip rendering when the saved chart was made from the same data
+    digest = chart_digest(
+        distribution_df[["active_days"]],
+        chart="active_days_distribution",
+        title=title,
+        threshold=BILLING_THRESHOLD,
+    )
+    if not force and not show_plot and is_chart_current(output_path, digest):
+        return output_path
+
     # Create histogram
     plt.figure(figsize=(10, 6))
     plt.hist(
@@ -57,6 +70,7 @@ def plot_active_days_distribution(
 
     # Save plot
     plt.savefig(output_path, dpi=150, bbox_inches="tight")
+    record_chart_digest(output_path, digest)
 
     if show_plot:
         plt.show()
@@ -71,6 +85,7 @@ def plot_active_rate_by_day_since_enrollment(
     output_filename: str = "active_rate_by_day_since_enrollment.png",
     title: str = "Patient Active Rate by Day Since Enrollment",
     show_plot: bool = True,
+    force: bool = False,
 ) -> str:
     """
     Create line chart of active rate by day since enrollment.
@@ -83,6 +98,7 @@ def plot_active_rate_by_day_since_enrollment(
         output_filename: filename for saved plot
         title: plot title
         show_plot: whether to display the plot
+        force: re-render even if the saved chart is up to date
 
     Returns:
         Path to saved plot file
@@ -91,6 +107,15 @@ def plot_active_rate_by_day_since_enrollment(
     os.makedirs(OUTPUT_DIR, exist_ok=True)
     output_path = os.path.join(OUTPUT_DIR, output_filename)
 
+    # Skip rendering when the saved chart was made from the same data
+    digest = chart_digest(
+        distribution_df[["day_since_enrollment", "active_rate"]],
+        chart="active_rate_by_day_since_enrollment",
+        title=title,
+    )
+    if not force and not show_plot and is_chart_current(output_path, digest):
+        return output_path
+
     # Create figure
     fig, ax = plt.subplots(figsize=(12, 6))
 
@@ -138,6 +163,7 @@ def plot_active_rate_by_day_since_enrollment(
 
     # Save plot
     plt.savefig(output_path, dpi=150, bbox_inches="tight")
+    record_chart_digest(output_path, digest)
 
     if show_plot:
         plt.show()
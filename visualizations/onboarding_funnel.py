@@ -5,6 +5,7 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib.patches as mpatches
 from config import OUTPUT_DIR
+from .chart_cache import chart_digest, is_chart_current, record_chart_digest
 
 
 def plot_patient_funnel(
@@ -12,6 +13,7 @@ def plot_patient_funnel(
     output_filename: str = "patient_funnel.png",
     title: str = "Patient Funnel: Enrollment to Compliance",
     show_plot: bool = True,
+    force: bool = False,
 ) -> str:
     """
     Create a line chart visualization of the patient funnel.
@@ -21,6 +23,7 @@ def plot_patient_funnel(
         output_filename: filename for saved plot
         title: plot title
         show_plot: whether to display the plot
+        force: re-render even if the saved chart is up to date
 
     Returns:
         Path to saved plot file
@@ -29,6 +32,15 @@ def plot_patient_funnel(
     os.makedirs(OUTPUT_DIR, exist_ok=True)
     output_path = os.path.join(OUTPUT_DIR, output_filename)
 
+    # Skip rendering when the saved chart was made from the same data
+    digest = chart_digest(
+        funnel_df[["stage", "count", "rate_from_enrolled"]],
+        chart="patient_funnel",
+        title=title,
+    )
+    if not force and not show_plot and is_chart_current(output_path, digest):
+        return output_path
+
     fig, ax = plt.subplots(figsize=(12, 6))
 
     # Extract data
@@ -113,6 +125,7 @@ def plot_patient_funnel(
 
     plt.tight_layout()
     plt.savefig(output_path, dpi=150, bbox_inches="tight")
+    record_chart_digest(output_path, digest)
 
     if show_plot:
         plt.show()
@@ -0,0 +1,224 @@
+"""Per-patient activity timeline sheets for provider review.
+
+Each provider gets a paged sheet with one strip per patient: active days as
+shaded cells, walk score as a blue line and fall risk as a red line (both on
+a 0-100 scale within the strip), with the fall-risk threshold marked.
+
+All strips on a page are drawn into a single axes with three collections
+(a PolyCollection for active days, a LineCollection per score), and the
+same figure and axes are cleared and reused for every page and provider,
+so rendering cost grows with the number of points, not of patients.
+"""
+
+import os
+
+import matplotlib.dates as mdates
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+from matplotlib.backends.backend_pdf import PdfPages
+from matplotlib.collections import LineCollection, PolyCollection
+
+from config import FALL_RISK_THRESHOLD, OUTPUT_DIR
+from .chart_cache import chart_digest, is_chart_current, record_chart_digest
+
+PATIENTS_PER_PAGE = 40
+
+# Vertical layout of a strip (row height is 1)
+STRIP_BOTTOM = 0.1
+STRIP_HEIGHT = 0.8
+
+
+def _strip_y(values: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    """Map 0-100 scores into their patient's strip (row 0 at the top)."""
+    scaled = np.clip(values, 0, 100) / 100
+    return rows + 1 - STRIP_BOTTOM - scaled * STRIP_HEIGHT
+
+
+def _segments(x: np.ndarray, y: np.ndarray, bounds: np.ndarray) -> list:
+    """One polyline per patient from sorted point arrays."""
+    points = np.column_stack([x, y])
+    return np.split(points, bounds[1:-1])
+
+
+def _draw_page(ax, page: pd.DataFrame, labels: list, date_range: tuple) -> None:
+    """Draw one page of strips into the reused axes."""
+    for artist in list(ax.collections):
+        artist.remove()
+
+    rows = page["row"].to_numpy()
+    x = mdates.date2num(page["date"].to_numpy())
+
+    # Active days: one cell per active patient-day
+    active = page["is_active_day"].to_numpy() == 1
+    left, row = x[active] - 0.5, rows[active]
+    cells = np.empty((active.sum(), 4, 2))
+    cells[:, :, 0] = np.column_stack([left, left + 1, left + 1, left])
+    cells[:, :, 1] = np.column_stack(
+        [row + STRIP_BOTTOM, row + STRIP_BOTTOM, row + 0.9, row + 0.9]
+    )
+    ax.add_collection(
+        PolyCollection(cells, facecolors="#55A868", edgecolors="none", alpha=0.35)
+    )
+
+    # Score lines, split at patient boundaries
+    bounds = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1], True])
+    for column, color in (("walk_score", "#4C72B0"), ("fall_risk_score", "#C44E52")):
+        y = _strip_y(page[column].to_numpy(dtype=float), rows)
+        ax.add_collection(
+            LineCollection(_segments(x, y, bounds), colors=color, linewidths=0.8)
+        )
+
+    # Fall-risk threshold per strip
+    n_rows = len(labels)
+    threshold_y = _strip_y(np.full(n_rows, FALL_RISK_THRESHOLD), np.arange(n_rows))
+    start, end = mdates.date2num(np.array(date_range, dtype="datetime64[ns]"))
+    ax.add_collection(
+        LineCollection(
+            [[(start, y), (end, y)] for y in threshold_y],
+            colors="#C44E52",
+            linestyles="dotted",
+            linewidths=0.5,
+        )
+    )
+
+    ax.set_xlim(start - 0.5, end + 0.5)
+    ax.set_ylim(max(n_rows, 1), 0)
+    ax.set_yticks(np.arange(n_rows) + 0.5)
+    ax.set_yticklabels(labels, fontsize=6)
+
+
+def plot_provider_timelines(
+    fact_patient_day: pd.DataFrame,
+    patients: pd.DataFrame,
+    providers: pd.DataFrame = None,
+    provider_ids: list = None,
+    start_date: str = None,
+    end_date: str = None,
+    patients_per_page: int = PATIENTS_PER_PAGE,
+    output_format: str = "pdf",
+    output_subdir: str = "timelines",
+    force: bool = False,
+) -> dict:
+    """
+    Render paged patient timeline sheets, one file set per provider.
+
+    Args:
+        fact_patient_day: DataFrame with patient_id, date, is_active_day,
+            walk_score, fall_risk_score
+        patients: DataFrame with patient_id, provider_id
+        providers: optional DataFrame with provider_id, provider_name (titles)
+        provider_ids: providers to render (default: all with patients)
+        start_date, end_date: date range (default: full range of the data)
+        patients_per_page: strips per page
+        output_format: "pdf" (one multi-page file per provider) or "png"
+            (one image per page)
+        output_subdir: directory under OUTPUT_DIR
+        force: re-render even if the saved sheets are up to date
+
+    Returns:
+        dict mapping provider_id to the list of files written (or kept)
+    """
+    if output_format not in ("pdf", "png"):
+        raise ValueError(f"Unknown output_format: {output_format!r}")
+
+    output_dir = os.path.join(OUTPUT_DIR, output_subdir)
+    os.makedirs(output_dir, exist_ok=True)
+
+    fact = fact_patient_day
+    if start_date is not None:
+        fact = fact[fact["date"] >= start_date]
+    if end_date is not None:
+        fact = fact[fact["date"] <= end_date]
+    date_range = (fact["date"].min(), fact["date"].max())
+
+    # Attach provider and sort once: provider, patient, date
+    columns = ["patient_id", "date", "is_active_day", "walk_score", "fall_risk_score"]
+    data = fact[columns].merge(
+        patients[["patient_id", "provider_id"]], on="patient_id", how="inner"
+    )
+    if provider_ids is not None:
+        data = data[data["provider_id"].isin(provider_ids)]
+    data = data.sort_values(["provider_id", "patient_id", "date"], kind="stable")
+
+    names = {}
+    if providers is not None and "provider_name" in providers.columns:
+        names = dict(zip(providers["provider_id"], providers["provider_name"]))
+
+    fig, ax = plt.subplots(figsize=(11, 8.5))
+    locator = mdates.AutoDateLocator()
+    ax.xaxis.set_major_locator(locator)
+    ax.xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator))
+    ax.grid(axis="x", alpha=0.3)
+    ax.set_xlabel("Date")
+    fig.legend(
+        handles=[
+            plt.Rectangle((0, 0), 1, 1, color="#55A868", alpha=0.35),
+            plt.Line2D([], [], color="#4C72B0"),
+            plt.Line2D([], [], color="#C44E52"),
+        ],
+        labels=["Active day", "Walk score", "Fall risk"],
+        loc="lower center",
+        ncol=3,
+        fontsize=8,
+    )
+    fig.subplots_adjust(left=0.12, right=0.98, top=0.94, bottom=0.1)
+
+    written = {}
+    for provider_id, provider_data in data.groupby("provider_id", sort=False):
+        patient_codes, patient_labels = pd.factorize(provider_data["patient_id"])
+        n_pages = -(-len(patient_labels) // patients_per_page)
+        name = names.get(provider_id, provider_id)
+
+        base = os.path.join(output_dir, f"timelines_{provider_id}")
+        paths = (
+            [base + ".pdf"]
+            if output_format == "pdf"
+            else [f"{base}_p{page + 1}.png" for page in range(n_pages)]
+        )
+
+        # Skip providers whose sheets were rendered from the same data
+        digest = chart_digest(
+            provider_data[columns],
+            chart="provider_timelines",
+            date_range=str(date_range),
+            patients_per_page=patients_per_page,
+            output_format=output_format,
+            name=name,
+        )
+        if not force and all(is_chart_current(path, digest) for path in paths):
+            written[provider_id] = paths
+            continue
+
+        page_of = patient_codes // patients_per_page
+        page_bounds = np.searchsorted(page_of, np.arange(n_pages + 1))
+        pdf = PdfPages(paths[0]) if output_format == "pdf" else None
+        for page in range(n_pages):
+            rows = provider_data.iloc[page_bounds[page] : page_bounds[page + 1]]
+            rows = rows.assign(
+                row=patient_codes[page_bounds[page] : page_bounds[page + 1]]
+                - page * patients_per_page
+            )
+            labels = list(
+                patient_labels[
+                    page * patients_per_page : (page + 1) * patients_per_page
+                ]
+            )
+            _draw_page(ax, rows, labels, date_range)
+            ax.set_title(
+                f"{name}: patient activity timelines (page {page + 1}/{n_pages})",
+                fontsize=12,
+            )
+            if pdf is not None:
+                pdf.savefig(fig)
+            else:
+                fig.savefig(paths[page], dpi=100)
+        if pdf is not None:
+            pdf.close()
+
+        for path in paths:
+            record_chart_digest(path, digest)
+        written[provider_id] = paths
+
+    plt.close(fig)
+    return written